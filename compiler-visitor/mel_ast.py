@@ -1,28 +1,63 @@
 from abc import ABC, abstractmethod
 from contextlib import suppress
-from typing import Optional, Union, Tuple, Callable
+from typing import Optional, Union, Tuple, Callable, Dict, Any
 
 from .sematic_base import TYPE_CONVERTIBILITY, BIN_OP_TYPE_COMPATIBILITY, BinOp, SinOp, \
     TypeDesc, IdentDesc, ScopeType, IdentScope, SemanticException
 
 
+# поля базового класса, которые можно передать в конструктор узла именованными аргументами
+_AST_NODE_SLOTS = frozenset(('loc', ))
+
+
 class AstNode(ABC):
-    """Базовый абстрактый класс узла AST-дерева
+    """Базовый абстрактый класс узла AST-дерева.
+
+       Узлы не имеют __dict__ (все поля перечислены в __slots__ классов), поэтому произвольные
+       атрибуты узлу не присваиваются. Дополнительные данные (например, результаты анализа)
+       хранятся в словаре attrs, который создается только при первой записи через set_attr;
+       в него же попадают неизвестные именованные аргументы конструктора
     """
 
+    __slots__ = ('row', 'col', 'loc', 'node_type', 'node_ident', 'attrs')
+
     init_action: Callable[['AstNode'], None] = None
 
     def __init__(self, row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__()
         self.row = row
         self.col = col
+        self.loc: Optional[int] = None
+        self.attrs: Optional[Dict[str, Any]] = None
         for k, v in props.items():
-            setattr(self, k, v)
+            if k in _AST_NODE_SLOTS:
+                setattr(self, k, v)
+            else:
+                self.set_attr(k, v)
         if AstNode.init_action is not None:
             AstNode.init_action(self)
         self.node_type: Optional[TypeDesc] = None
         self.node_ident: Optional[IdentDesc] = None
 
+    def set_attr(self, name: str, value: Any) -> None:
+        """Сохранение дополнительных данных узла
+        :param name: имя
+        :param value: значение
+        """
+
+        if self.attrs is None:
+            self.attrs = {}
+        self.attrs[name] = value
+
+    def get_attr(self, name: str, default: Any = None) -> Any:
+        """Дополнительные данные узла, сохраненные set_attr
+        :param name: имя
+        :param default: значение, если данных с таким именем нет
+        :return: значение
+        """
+
+        return self.attrs.get(name, default) if self.attrs is not None else default
+
     @abstractmethod
     def __str__(self) -> str:
         pass
@@ -67,6 +102,8 @@ class _GroupNode(AstNode):
     """Класс для группировки других узлов (вспомогательный, в синтаксисе нет соотвествия)
     """
 
+    __slots__ = ('name', '_childs')
+
     def __init__(self, name: str, *childs: AstNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -85,13 +122,15 @@ class ExprNode(AstNode, ABC):
     """Абстракный класс для выражений в AST-дереве
     """
 
-    pass
+    __slots__ = ()
 
 
 class LiteralNode(ExprNode):
     """Класс для представления в AST-дереве литералов (числа, строки, логическое значение)
     """
 
+    __slots__ = ('literal', 'value')
+
     def __init__(self, literal: str,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -110,6 +149,8 @@ class IdentNode(ExprNode):
     """Класс для представления в AST-дереве идентификаторов
     """
 
+    __slots__ = ('name',)
+
     def __init__(self, name: str,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -126,6 +167,8 @@ class TypeNode(IdentNode):
        (при появлении составных типов данных должен быть расширен)
     """
 
+    __slots__ = ('generic', 'type')
+
     def __init__(self, name: str, generic=None,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(name, row=row, col=col, **props)
@@ -146,6 +189,8 @@ class SinOpNode(ExprNode):
     """Класс для представления в AST-дереве бинарных операций
     """
 
+    __slots__ = ('op', 'arg')
+
     def __init__(self, op: SinOp, arg: ExprNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -164,6 +209,8 @@ class SeqNode(ExprNode):
     """Класс для представления в AST-дереве бинарных операций
     """
 
+    __slots__ = ('startArg', 'seqOp', 'endArg', 'stepArg')
+
     def __init__(self, startArg: ExprNode, seqOp: str, endArg: ExprNode,
                  stepArg: ExprNode = None,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
@@ -185,6 +232,8 @@ class BinOpNode(ExprNode):
     """Класс для представления в AST-дереве бинарных операций
     """
 
+    __slots__ = ('op', 'arg1', 'arg2')
+
     def __init__(self, op: BinOp, arg1: ExprNode, arg2: ExprNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -205,6 +254,8 @@ class CallNode(ExprNode):
        (в языке программирования может быть как expression, так и statement)
     """
 
+    __slots__ = ('func', 'params')
+
     def __init__(self, func: IdentNode, *params: ExprNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -224,6 +275,8 @@ class TypeConvertNode(ExprNode):
        (в языке программирования может быть как expression, так и statement)
     """
 
+    __slots__ = ('expr', 'type')
+
     def __init__(self, expr: ExprNode, type_: TypeDesc,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -243,6 +296,8 @@ class StmtNode(ExprNode, ABC):
     """Абстракный класс для деклараций или инструкций в AST-дереве
     """
 
+    __slots__ = ()
+
     def to_str_full(self):
         return self.to_str()
 
@@ -251,6 +306,8 @@ class StmtListNode(StmtNode):
     """Класс для представления в AST-дереве последовательности инструкций
     """
 
+    __slots__ = ('exprs', 'program')
+
     def __init__(self, *exprs: StmtNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -269,6 +326,8 @@ class AssignNode(ExprNode):
     """Класс для представления в AST-дереве оператора присваивания
     """
 
+    __slots__ = ('var', 'val')
+
     def __init__(self, var: IdentNode, val: ExprNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -287,6 +346,8 @@ class VarsNode(StmtNode):
     """Класс для представления в AST-дереве объявления переменнных
     """
 
+    __slots__ = ('type', 'vars')
+
     def __init__(self, type_: TypeNode, *vars_: Union[IdentNode, 'AssignNode'],
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -305,6 +366,8 @@ class VarNode(StmtNode):
     """Класс для представления в AST-дереве объявления переменнных
     """
 
+    __slots__ = ('declare', 'ident', 'type', 'var')
+
     def __init__(self, *params,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -339,6 +402,8 @@ class ReturnNode(StmtNode):
     """Класс для представления в AST-дереве оператора return
     """
 
+    __slots__ = ('val',)
+
     def __init__(self, val: ExprNode = None,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -356,6 +421,8 @@ class IfNode(StmtNode):
     """Класс для представления в AST-дереве условного оператора
     """
 
+    __slots__ = ('cond', 'then_stmt', 'else_stmt')
+
     def __init__(self, cond: ExprNode, then_stmt: StmtNode, else_stmt: Optional[StmtNode] = None,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -375,6 +442,8 @@ class ForNode(StmtNode):
     """Класс для представления в AST-дереве цикла for
     """
 
+    __slots__ = ('init', 'cond', 'body')
+
     def __init__(self, init: IdentNode, cond: ExprNode, body: StmtNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -394,6 +463,8 @@ class WhileNode(StmtNode):
     """Класс для представления в AST-дереве цикла while
     """
 
+    __slots__ = ('condition', 'body')
+
     def __init__(self, condition: ExprNode, body: StmtNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -412,6 +483,8 @@ class DoWhileNode(StmtNode):
     """Класс для представления в AST-дереве цикла while
     """
 
+    __slots__ = ('condition', 'body')
+
     def __init__(self, body: StmtNode, condition: ExprNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -430,6 +503,8 @@ class ParamNode(StmtNode):
     """Класс для представления в AST-дереве объявления параметра функции
     """
 
+    __slots__ = ('type', 'name', 'value')
+
     def __init__(self, name: IdentNode, type_: TypeNode, expr: ExprNode = None,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -452,6 +527,8 @@ class FuncNode(StmtNode):
     """Класс для представления в AST-дереве объявления функции
     """
 
+    __slots__ = ('type', 'name', 'params', 'body')
+
     def __init__(self, type_: TypeNode, name: IdentNode, params: Tuple[ParamNode], body: StmtNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -0,0 +1,361 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from contextlib import suppress
+from typing import Optional, List, Tuple, Union
+
+from . import mel_flat_ast
+from . import mel_parser
+from . import semantic
+from .mel_ast import AstNode, StmtListNode, SideTable, walk
+from .mel_flat_ast import FlatAst
+
+
+# версия компилятора: увеличивается при любом изменении разбора или семантического анализа,
+# меняющем результат компиляции (прежние записи кэша после этого не используются)
+COMPILER_VERSION = '4'
+
+# ограничение кэша программ в памяти (в узлах AST-деревьев и записях таблиц результатов анализа)
+DEFAULT_MAX_NODES = 1000000
+
+# переменная окружения с каталогом кэша по умолчанию (если не задана, кэш по умолчанию не используется)
+CACHE_DIR_ENV = 'MEL_CACHE_DIR'
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+# доля max_size, до которой уменьшается кэш при вытеснении (запас, чтобы каталог не просматривался при каждой записи)
+EVICT_TARGET = 0.75
+
+_MAGIC = b'MELC'
+_VERSION = 1
+# сигнатура, версия, результат (0 - успешно, 1 - ошибка), размер AST-дерева разбора, размер результата;
+# размер заголовка кратен 8, чтобы массивы деревьев оставались выровненными
+_HEADER = struct.Struct('<4sHBxQQ')
+_OK, _ERROR = 0, 1
+_SUFFIX = '.melc'
+
+
+class CacheEntry:
+    """Запись кэша: AST-дерево после разбора и либо AST-дерево после семантического анализа,
+       либо сообщение об ошибке семантического анализа
+    """
+
+    __slots__ = ('parsed', 'checked', 'error')
+
+    def __init__(self, parsed: FlatAst, checked: Optional[FlatAst] = None, error: Optional[str] = None) -> None:
+        self.parsed = parsed
+        self.checked = checked
+        self.error = error
+
+
+class CacheStats:
+    """Статистика обращений к кэшу в текущем сеансе
+    """
+
+    __slots__ = ('hits', 'misses', 'stores', 'evictions')
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def __str__(self) -> str:
+        return 'hits: {}, misses: {}, hit rate: {:.1%}, stores: {}, evictions: {}'.format(
+            self.hits, self.misses, self.hit_rate, self.stores, self.evictions)
+
+
+def cache_key(prog: str) -> str:
+    """Ключ результата компиляции: хэш текста программы, версии компилятора, формата AST-дерева
+       и описания встроенных объектов
+    :param prog: текст программы
+    """
+
+    h = hashlib.sha256()
+    for part in (COMPILER_VERSION, str(mel_flat_ast.FORMAT_VERSION), semantic.BUILT_IN_OBJECTS, prog):
+        data = part.encode('utf-8')
+        h.update(struct.pack('<Q', len(data)))
+        h.update(data)
+    return h.hexdigest()
+
+
+class CompileCache:
+    """Кэш результатов компиляции на диске с адресацией по содержимому: ключ - хэш текста программы,
+       версии компилятора, формата AST-дерева и описания встроенных объектов.
+
+       Каждая запись - отдельный файл, который записывается во временный файл и переименовывается,
+       поэтому кэш можно использовать одновременно из нескольких потоков и процессов: читатель видит
+       либо полную запись, либо ее отсутствие. Размер кэша ограничен; при превышении удаляются записи,
+       к которым дольше всего не обращались (время последнего обращения хранится во времени изменения файла).
+
+       Суммарный размер записей определяется просмотром каталога при первой записи, затем увеличивается
+       на размер каждой записи; каталог просматривается снова, только когда размер превышает ограничение
+       (записи других процессов учитываются при этом просмотре), и записи удаляются с запасом - до EVICT_TARGET
+       от ограничения
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        """
+        :param directory: каталог кэша (создается при необходимости)
+        :param max_size: максимальный суммарный размер записей в байтах
+        """
+
+        if max_size <= 0:
+            raise ValueError('Размер кэша должен быть положительным: {}'.format(max_size))
+        self.directory = directory
+        self.max_size = max_size
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        # суммарный размер записей (None - каталог еще не просматривался)
+        self._size: Optional[int] = None
+
+    key = staticmethod(cache_key)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + _SUFFIX)
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            setattr(self.stats, name, getattr(self.stats, name) + value)
+
+    def get(self, prog: str) -> Optional[CacheEntry]:
+        """Поиск результата компиляции программы
+        :param prog: текст программы
+        :return: запись кэша или None, если записи нет (поврежденная запись также считается отсутствующей)
+        """
+
+        path = self._path(self.key(prog))
+        try:
+            # отображение закрывается сразу после чтения записи (_decode копирует данные деревьев),
+            # чтобы не держать открытым файл, который может быть вытеснен или заменен другим процессом
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                entry = self._decode(data)
+        except (OSError, ValueError):
+            self._count('misses')
+            return None
+        # обращение к записи продлевает ее жизнь при вытеснении
+        with suppress(OSError):
+            os.utime(path)
+        self._count('hits')
+        return entry
+
+    def put(self, prog: str, parsed: Union[AstNode, FlatAst], checked: Union[AstNode, FlatAst, None] = None,
+            error: Optional[str] = None) -> None:
+        """Сохранение результата компиляции программы
+        :param prog: текст программы
+        :param parsed: AST-дерево после разбора
+        :param checked: AST-дерево после семантического анализа (если анализ успешен)
+        :param error: сообщение об ошибке семантического анализа
+        """
+
+        data = self._encode(parsed, checked, error)
+        path = self._path(self.key(prog))
+        tmp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except OSError:
+            # кэш - только ускорение: ошибка записи не должна прерывать компиляцию
+            return
+        finally:
+            with suppress(OSError):
+                os.remove(tmp_path)
+        self._count('stores')
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data) - replaced
+            full = self._size is None or self._size > self.max_size
+        if full:
+            self.evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        with suppress(OSError), os.scandir(self.directory) as dirs:
+            for d in dirs:
+                if not d.is_dir():
+                    continue
+                with suppress(OSError), os.scandir(d.path) as files:
+                    for f in files:
+                        if not f.name.endswith(_SUFFIX):
+                            continue
+                        with suppress(OSError):
+                            st = f.stat()
+                            entries.append((st.st_mtime, st.st_size, f.path))
+        return entries
+
+    def evict(self) -> None:
+        """Удаление записей, к которым дольше всего не обращались, если размер кэша превышает max_size
+           (пока размер не уменьшится до EVICT_TARGET от max_size)
+        """
+
+        entries = self._entries()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        if size > self.max_size:
+            target = self.max_size * EVICT_TARGET
+            entries.sort()
+            for _, entry_size, path in entries:
+                if size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # запись уже удалена другим процессом
+                    pass
+                except OSError:
+                    continue
+                else:
+                    self._count('evictions')
+                size -= entry_size
+        with self._lock:
+            self._size = size
+
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            with suppress(OSError):
+                os.remove(path)
+        with self._lock:
+            self._size = None
+
+    @staticmethod
+    def _encode(parsed: Union[AstNode, FlatAst], checked: Union[AstNode, FlatAst, None],
+                error: Optional[str]) -> bytes:
+        parsed = (parsed if isinstance(parsed, FlatAst) else FlatAst.from_ast(parsed)).to_bytes()
+        if error is not None:
+            status, result = _ERROR, error.encode('utf-8')
+        else:
+            status, result = _OK, (checked if isinstance(checked, FlatAst) else FlatAst.from_ast(checked)).to_bytes()
+        return b''.join((_HEADER.pack(_MAGIC, _VERSION, status, len(parsed), len(result)),
+                         parsed, bytes(-len(parsed) % 8), result))
+
+    @staticmethod
+    def _decode(data: Union[bytes, mmap.mmap]) -> CacheEntry:
+        # данные деревьев копируются: записи не ссылаются на data, и отображение файла можно закрыть
+        with memoryview(data) as data:
+            if len(data) < _HEADER.size:
+                raise ValueError('Запись кэша обрезана')
+            magic, version, status, parsed_size, result_size = _HEADER.unpack_from(data)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError('Неподдерживаемый формат записи кэша')
+            offset = _HEADER.size + parsed_size + -parsed_size % 8
+            if len(data) != offset + result_size:
+                raise ValueError('Запись кэша обрезана')
+            parsed = FlatAst.from_bytes(bytes(data[_HEADER.size:_HEADER.size + parsed_size]))
+            result = bytes(data[offset:])
+        if status == _ERROR:
+            return CacheEntry(parsed, error=result.decode('utf-8'))
+        return CacheEntry(parsed, checked=FlatAst.from_bytes(result))
+
+
+class CompiledProgram:
+    """Скомпилированная программа в кэше в памяти: AST-дерево после разбора (не изменяется)
+       и таблица результатов семантического анализа либо сообщение об ошибке
+    """
+
+    __slots__ = ('tree', 'table', 'error', 'size')
+
+    def __init__(self, tree: StmtListNode, table: Optional[SideTable] = None, error: Optional[str] = None) -> None:
+        self.tree = tree
+        self.table = table
+        self.error = error
+        # приблизительный объем в памяти: узлы дерева и записи таблицы
+        self.size = sum(1 for _ in walk(tree))
+        if table is not None:
+            self.size += len(table.types) + len(table.idents) + len(table.fields)
+
+
+class ProgramCache:
+    """Кэш скомпилированных программ в памяти процесса (для сервиса, многократно компилирующего
+       одни и те же программы): повторная компиляция не выполняет ни разбор, ни семантический анализ.
+
+       Ключ - cache_key текста программы; объем ограничен приблизительным числом узлов, при превышении
+       вытесняются программы, к которым дольше всего не обращались. Семантический анализ выполняется
+       с таблицей результатов (SideTable), поэтому деревья в кэше не изменяются и их можно
+       использовать одновременно из нескольких потоков
+    """
+
+    def __init__(self, max_nodes: int = DEFAULT_MAX_NODES) -> None:
+        """
+        :param max_nodes: максимальный суммарный объем программ (CompiledProgram.size)
+        """
+
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.stats = CacheStats()
+        self._programs: 'OrderedDict[str, CompiledProgram]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._programs)
+
+    def get(self, prog: str) -> Optional[CompiledProgram]:
+        key = cache_key(prog)
+        with self._lock:
+            program = self._programs.get(key)
+            if program is None:
+                self.stats.misses += 1
+                return None
+            self._programs.move_to_end(key)
+            self.stats.hits += 1
+            return program
+
+    def put(self, prog: str, program: CompiledProgram) -> None:
+        if program.size > self.max_nodes:
+            return
+        key = cache_key(prog)
+        with self._lock:
+            old = self._programs.pop(key, None)
+            if old is not None:
+                self.nodes -= old.size
+            self._programs[key] = program
+            self.nodes += program.size
+            self.stats.stores += 1
+            while self.nodes > self.max_nodes:
+                _, evicted = self._programs.popitem(last=False)
+                self.nodes -= evicted.size
+                self.stats.evictions += 1
+
+    def compile(self, prog: str, parser: Optional[mel_parser.Parser] = None) -> CompiledProgram:
+        """Скомпилированная программа из кэша или результат разбора и семантического анализа
+           (ошибки разбора не кэшируются и передаются вызывающему)
+        :param prog: текст программы
+        :param parser: синтаксический анализатор (по умолчанию - анализатор текущего потока)
+        """
+
+        program = self.get(prog)
+        if program is not None:
+            return program
+        parser = parser or mel_parser.default_parser()
+        tree = parser.parse(prog)
+        table = SideTable()
+        try:
+            tree.semantic_check(semantic.prepare_global_scope(parser), table)
+            program = CompiledProgram(tree, table)
+        except semantic.SemanticException as e:
+            program = CompiledProgram(tree, error=e.message)
+        self.put(prog, program)
+        return program
+
+    def clear(self) -> None:
+        with self._lock:
+            self._programs.clear()
+            self.nodes = 0
+
+
+def default_cache() -> Optional[CompileCache]:
+    """Кэш в каталоге из переменной окружения MEL_CACHE_DIR (None, если переменная не задана)
+    """
+
+    directory = os.environ.get(CACHE_DIR_ENV)
+    return CompileCache(directory) if directory else None
@@ -1,28 +1,392 @@
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_right
 from contextlib import suppress
-from typing import Optional, Union, Tuple, Callable
+import copy
+import re
+import threading
+from typing import Optional, Union, Tuple, List, Dict, Any, Iterator, TextIO, Generator, Callable, Sequence
+
+from .semantic import TYPE_CONVERTIBILITY, BIN_OP_RESOLUTION, BinOp, SinOp, BaseType, \
+    TypeDesc, IdentDesc, ScopeType, IdentScope, SemanticException, Diagnostics, ErrorBudgetExceeded
+
+
+# приоритеты бинарных операций (чем больше, тем сильнее связывание) и признак того,
+# что операция на своем уровне может встретиться только один раз (не ассоциативна)
+BIN_OP_PRIORITY = {
+    BinOp.LOGICAL_OR: (1, False), BinOp.BIT_OR: (1, False),
+    BinOp.LOGICAL_AND: (2, False), BinOp.BIT_AND: (2, False),
+    BinOp.EQUALS: (3, True), BinOp.NEQUALS: (3, True),
+    BinOp.GE: (4, True), BinOp.LE: (4, True), BinOp.GT: (4, True), BinOp.LT: (4, True),
+    BinOp.DOTS: (5, True), BinOp.UNTIL: (5, True), BinOp.DOWNTO: (5, True),
+    BinOp.ADD: (6, False), BinOp.SUB: (6, False),
+    BinOp.MUL: (7, False), BinOp.DIV: (7, False), BinOp.MOD: (7, False),
+}
+# уровни операций '..' (until, downTo) и '+' ('-'), у которых особые правила вычисления позиций узлов
+SEQ_PRIORITY = 5
+ADD_PRIORITY = 6
+MAX_PRIORITY = 7
+
+
+class SourceLocations:
+    """Индекс позиций в тексте программы: хранит только смещения начал строк (O(строк) памяти)
+       и переводит позицию символа (loc) в строку и столбец двоичным поиском
+    """
+
+    __slots__ = ('prog', 'line_offset', 'col_offset', 'line_starts')
+
+    def __init__(self, prog: str, line_offset: int = 0, col_offset: int = 0) -> None:
+        """
+        :param prog: текст программы
+        :param line_offset: количество строк перед текстом (если это фрагмент большего текста)
+        :param col_offset: количество символов первой строки перед текстом (если фрагмент начинается не с начала строки)
+        """
+
+        self.prog = prog
+        self.line_offset = line_offset
+        self.col_offset = col_offset
+        self.line_starts = array('q', [0])
+        pos = prog.find('\n')
+        while pos >= 0:
+            self.line_starts.append(pos + 1)
+            pos = prog.find('\n', pos + 1)
+
+    def row_col(self, loc: int) -> Tuple[int, int]:
+        """Строка и столбец (с 1) для позиции символа; столбец, как и раньше, считается
+           по числу символов строки до позиции включительно без учета '\\r'
+        :param loc: позиция символа в тексте программы
+        :return: (строка, столбец)
+        """
+
+        line = bisect_right(self.line_starts, loc) - 1
+        row = self.line_offset + line + 1
+        if loc < len(self.prog) and self.prog[loc] == '\n':
+            return row + 1, 1
+        start = self.line_starts[line]
+        end = min(loc + 1, len(self.prog))
+        col = end - start - self.prog.count('\r', start, end) + 1
+        return row, col + self.col_offset if line == 0 else col
+
+
+class ShiftedLocations:
+    """Представление индекса позиций со сдвигом для узлов одной инструкции верхнего уровня:
+       после правки текста позиции узлов (loc в тексте, из которого они были разобраны)
+       пересчитываются в позиции нового текста заменой base и delta, без обхода узлов
+    """
+
+    __slots__ = ('base', 'delta')
+
+    def __init__(self, base: SourceLocations, delta: int = 0) -> None:
+        self.base = base
+        self.delta = delta
+
+    def row_col(self, loc: int) -> Tuple[int, int]:
+        return self.base.row_col(loc + self.delta)
+
+
+# escape-последовательности строковых литералов (как в Kotlin)
+_ESCAPES = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r', '\'': '\'', '"': '"', '\\': '\\', '$': '$'}
+_ESCAPE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|(.))', re.DOTALL)
+
+
+def _unescape(m: re.Match) -> str:
+    code, char = m.groups()
+    if code is not None:
+        return chr(int(code, 16))
+    # неизвестная последовательность сохраняется как есть
+    return _ESCAPES.get(char, m.group())
+
+
+def decode_literal(literal: str) -> Any:
+    """Значение литерала (целое или вещественное число, строка, логическое значение) по его тексту
+    :param literal: текст литерала в том виде, как он записан в программе
+    :return: значение литерала
+    """
+
+    if literal == 'true':
+        return True
+    if literal == 'false':
+        return False
+    if literal[:1] == '"':
+        if len(literal) < 2 or literal[-1] != '"':
+            raise ValueError('Некорректный строковый литерал {}'.format(literal))
+        value = literal[1:-1]
+        return _ESCAPE.sub(_unescape, value) if '\\' in value else value
+    if '.' in literal or 'e' in literal or 'E' in literal:
+        return float(literal)
+    return int(literal)
+
+
+class ConstantPool:
+    """Пул констант программы: каждое значение литерала хранится один раз,
+       узлы литералов ссылаются на него по индексу
+    """
 
-from .semantic import TYPE_CONVERTIBILITY, BIN_OP_TYPE_COMPATIBILITY, BinOp, SinOp, \
-    TypeDesc, IdentDesc, ScopeType, IdentScope, SemanticException
+    __slots__ = ('values', '_by_literal', '_by_value')
+
+    def __init__(self) -> None:
+        self.values: List[Any] = []
+        # индексы по тексту литерала (повторный литерал не декодируется) и по значению
+        self._by_literal: Dict[str, int] = {}
+        self._by_value: Dict[Tuple[type, Any], int] = {}
+
+    def add(self, literal: str) -> int:
+        """Индекс значения литерала в пуле (значение добавляется, если его еще нет)
+        :param literal: текст литерала
+        :return: индекс значения
+        """
+
+        index = self._by_literal.get(literal)
+        if index is None:
+            value = decode_literal(literal)
+            # тип в ключе, т.к. 1 == 1.0 == True; repr для вещественных различает 0.0 и -0.0
+            key = (type(value), repr(value) if isinstance(value, float) else value)
+            index = self._by_value.get(key)
+            if index is None:
+                index = len(self.values)
+                self.values.append(value)
+                self._by_value[key] = index
+            self._by_literal[literal] = index
+        return index
+
+    def __getitem__(self, index: int) -> Any:
+        return self.values[index]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+# общий пул для литералов, созданных без пула программы (например, условие true цикла for без условия,
+# подставляемое при анализе): в нем немного различных значений, поэтому он не растет с числом узлов
+_SHARED_CONSTANTS = ConstantPool()
+_SHARED_CONSTANTS_LOCK = threading.Lock()
+
+
+class NodeAnnotations:
+    """Запись результатов семантического анализа (типы и идентификаторы узлов, замены дочерних узлов
+       при неявных преобразованиях типов) непосредственно в узлы AST-дерева (как и раньше)
+    """
+
+    __slots__ = ()
+
+    def type(self, node: 'AstNode') -> Optional[TypeDesc]:
+        return node.node_type
+
+    def set_type(self, node: 'AstNode', type_: Optional[TypeDesc]) -> None:
+        node.node_type = type_
+
+    def ident(self, node: 'AstNode') -> Optional[IdentDesc]:
+        return node.node_ident
+
+    def set_ident(self, node: 'AstNode', ident: Optional[IdentDesc]) -> None:
+        node.node_ident = ident
+
+    def field(self, node: 'AstNode', name: str) -> Any:
+        """Значение поля узла с учетом замен, сделанных при анализе
+        :param node: узел
+        :param name: имя поля
+        """
+
+        return getattr(node, name)
+
+    def set_field(self, node: 'AstNode', name: str, value: Any) -> None:
+        setattr(node, name, value)
+
+
+# запись результатов анализа в узлы (по умолчанию)
+IN_PLACE = NodeAnnotations()
+
+
+class SideTable(NodeAnnotations):
+    """Таблица результатов семантического анализа по id узлов: AST-дерево при анализе не изменяется,
+       поэтому одно дерево можно проверять многократно (например, с разными встроенными объектами)
+       или одновременно в нескольких потоках - у каждой проверки своя таблица.
+
+       Неявные преобразования хранятся как замены полей узлов (новыми узлами TypeConvertNode,
+       которые принадлежат таблице); проверенное дерево можно получить в виде представлений узлов (view)
+    """
+
+    __slots__ = ('types', 'idents', 'fields', '_nodes')
+
+    def __init__(self) -> None:
+        self.types: Dict[int, TypeDesc] = {}
+        self.idents: Dict[int, IdentDesc] = {}
+        self.fields: Dict[int, Dict[str, Any]] = {}
+        # узлы, для которых есть записи (пока жива таблица, их id не могут достаться другим объектам)
+        self._nodes: Dict[int, 'AstNode'] = {}
+
+    def type(self, node: 'AstNode') -> Optional[TypeDesc]:
+        return self.types.get(id(node))
+
+    def set_type(self, node: 'AstNode', type_: Optional[TypeDesc]) -> None:
+        self._nodes[id(node)] = node
+        self.types[id(node)] = type_
+
+    def ident(self, node: 'AstNode') -> Optional[IdentDesc]:
+        return self.idents.get(id(node))
+
+    def set_ident(self, node: 'AstNode', ident: Optional[IdentDesc]) -> None:
+        self._nodes[id(node)] = node
+        self.idents[id(node)] = ident
+
+    def field(self, node: 'AstNode', name: str) -> Any:
+        fields = self.fields.get(id(node))
+        if fields is not None and name in fields:
+            return fields[name]
+        return getattr(node, name)
+
+    def set_field(self, node: 'AstNode', name: str, value: Any) -> None:
+        self._nodes[id(node)] = node
+        self.fields.setdefault(id(node), {})[name] = value
+
+    def view(self, node: 'AstNode') -> 'AstNode':
+        """Узел в проверенном дереве: неглубокая копия узла с записанными в таблице типом,
+           идентификатором и полями (сам узел не изменяется)
+        :param node: узел исходного дерева (или узел, созданный при анализе)
+        """
+
+        key = id(node)
+        node_type, node_ident, fields = self.types.get(key), self.idents.get(key), self.fields.get(key)
+        if node_type is None and node_ident is None and fields is None and \
+                node.node_type is None and node.node_ident is None:
+            return node
+        node = copy.copy(node)
+        node.node_type, node.node_ident = node_type, node_ident
+        if fields is not None:
+            for name, value in fields.items():
+                setattr(node, name, value)
+        return node
+
+    def iter_tree(self, root: 'AstNode') -> Iterator[str]:
+        return root.iter_tree(self.view)
+
+    def write_tree(self, root: 'AstNode', out: TextIO) -> None:
+        root.write_tree(out, self.view)
+
+    def tree(self, root: 'AstNode') -> Tuple[str, ...]:
+        return tuple(self.iter_tree(root))
+
+
+def _child_field(slot: Any) -> property:
+    """Свойство для поля узла, от которого зависят дочерние узлы: чтение - напрямую из слота,
+       присваивание дополнительно сбрасывает сохраненный кортеж дочерних узлов
+    :param slot: дескриптор слота
+    """
+
+    def set_field(node: 'AstNode', value: Any) -> None:
+        slot.__set__(node, value)
+        node._childs_cache = None
+
+    return property(slot.__get__, set_field)
+
+
+def _cached_childs(build: Callable[['AstNode'], Tuple['AstNode', ...]]) -> property:
+    """Свойство childs, которое строит кортеж дочерних узлов при первом обращении и сохраняет его
+       в слоте _childs_cache до присваивания одного из полей _CHILD_FIELDS
+    :param build: функция построения кортежа дочерних узлов
+    """
+
+    def childs(node: 'AstNode') -> Tuple['AstNode', ...]:
+        cached = node._childs_cache
+        if cached is None:
+            cached = node._childs_cache = build(node)
+        return cached
+
+    return property(childs)
+
+
+# поля базового класса, которые можно передать в конструктор узла именованными аргументами
+_AST_NODE_SLOTS = frozenset(('loc', 'locations'))
 
 
 class AstNode(ABC):
-    """Базовый абстрактый класс узла AST-дерева
+    """Базовый абстрактый класс узла AST-дерева.
+
+       Узлы не имеют __dict__ (все поля перечислены в __slots__ классов), поэтому произвольные
+       атрибуты узлу не присваиваются. Дополнительные данные (например, результаты анализа)
+       хранятся в словаре attrs, который создается только при первой записи через set_attr;
+       в него же попадают неизвестные именованные аргументы конструктора
     """
 
-    init_action: Callable[['AstNode'], None] = None
+    __slots__ = ('loc', '_row', '_col', 'locations', 'node_type', 'node_ident', 'attrs')
+
+    # поля класса, от которых зависит сохраненный кортеж дочерних узлов (слот _childs_cache, который
+    # объявляют классы с этими полями): childs строится при первом обращении, присваивание поля
+    # сбрасывает кортеж, и он строится заново при следующем обращении к childs
+    _CHILD_FIELDS: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        fields = cls.__dict__.get('_CHILD_FIELDS', ())
+        for name in fields:
+            setattr(cls, name, _child_field(cls.__dict__[name]))
+        if fields and 'childs' in cls.__dict__:
+            cls.childs = _cached_childs(cls.__dict__['childs'].fget)
 
     def __init__(self, row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__()
-        self.row = row
-        self.col = col
+        self._row = row
+        self._col = col
+        self.loc: Optional[int] = None
+        self.locations: Optional[Union[SourceLocations, ShiftedLocations]] = None
+        self.attrs: Optional[Dict[str, Any]] = None
+        if self._CHILD_FIELDS:
+            self._childs_cache: Optional[Tuple[AstNode, ...]] = None
         for k, v in props.items():
-            setattr(self, k, v)
-        if AstNode.init_action is not None:
-            AstNode.init_action(self)
+            if k in _AST_NODE_SLOTS:
+                setattr(self, k, v)
+            else:
+                self.set_attr(k, v)
         self.node_type: Optional[TypeDesc] = None
         self.node_ident: Optional[IdentDesc] = None
 
+    def set_attr(self, name: str, value: Any) -> None:
+        """Сохранение дополнительных данных узла
+        :param name: имя
+        :param value: значение
+        """
+
+        if self.attrs is None:
+            self.attrs = {}
+        self.attrs[name] = value
+
+    def get_attr(self, name: str, default: Any = None) -> Any:
+        """Дополнительные данные узла, сохраненные set_attr
+        :param name: имя
+        :param default: значение, если данных с таким именем нет
+        :return: значение
+        """
+
+        return self.attrs.get(name, default) if self.attrs is not None else default
+
+    def _location(self) -> Optional[Tuple[int, int]]:
+        # строка и столбец вычисляются по индексу позиций при обращении (индекс может смениться после правки текста)
+        if self.locations is None:
+            return None
+        return self.locations.row_col(self.loc)
+
+    @property
+    def row(self) -> Optional[int]:
+        if self._row is None:
+            location = self._location()
+            return location[0] if location else None
+        return self._row
+
+    @row.setter
+    def row(self, value: Optional[int]) -> None:
+        self._row = value
+
+    @property
+    def col(self) -> Optional[int]:
+        if self._col is None:
+            location = self._location()
+            return location[1] if location else None
+        return self._col
+
+    @col.setter
+    def col(self, value: Optional[int]) -> None:
+        self._col = value
+
     @abstractmethod
     def __str__(self) -> str:
         pass
@@ -42,31 +406,216 @@ class AstNode(ABC):
             r = str(self.node_type)
         return self.to_str() + (' : ' + r if r else '')
 
+    def semantic_exception(self, message: str) -> SemanticException:
+        return SemanticException(message, self.row, self.col)
+
     def semantic_error(self, message: str):
-        raise SemanticException(message, self.row, self.col)
+        raise self.semantic_exception(message)
+
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional['SemanticSteps']:
+        """Семантическая проверка узла по шагам: генератор, выдающий пары (дочерний узел, область видимости);
+           проверка выданного узла выполняется до продолжения генератора (код до первой выдачи - вход в узел,
+           после последней - выход). Для узлов без проверки дочерних узлов - обычный метод, возвращающий None.
+
+           Ошибку, после которой проверку узла можно продолжить, генератор выдает вместо узла
+           (пара (SemanticException, область видимости)): при обычной проверке она возбуждается в месте выдачи,
+           при сборе ошибок (Diagnostics) - записывается, и проверка узла продолжается
+        :param scope: область видимости
+        :param ann: куда записываются результаты анализа (по умолчанию - в узлы дерева)
+        """
+
+        return None
+
+    def semantic_check(self, scope: IdentScope, ann: Optional[NodeAnnotations] = None,
+                       diagnostics: Optional[Diagnostics] = None) -> None:
+        """Семантическая проверка поддерева без рекурсии (глубина дерева ограничена только памятью)
+        :param scope: область видимости
+        :param ann: куда записываются результаты анализа: по умолчанию - в узлы дерева (узлы изменяются),
+                    SideTable - в таблицу (дерево не изменяется)
+        :param diagnostics: сборщик ошибок: если задан, ошибки не прерывают проверку, а записываются в него
+                            (проверка прекращается только при превышении diagnostics.max_errors)
+        """
+
+        if ann is None:
+            ann = IN_PLACE
+        expand = None if ann is IN_PLACE else lambda node, scope_: node.semantic_steps(scope_, ann)
+        if diagnostics is None:
+            run_steps(self.semantic_steps(scope, ann), expand)
+            return
+
+        def on_error(node: AstNode, error: SemanticException) -> None:
+            diagnostics.report(error)
+            ann.set_type(node, TypeDesc.ERROR)
 
-    def semantic_check(self, scope: IdentScope) -> None:
-        pass
+        try:
+            run_steps(self.semantic_steps(scope, ann), expand, on_error, self)
+        except ErrorBudgetExceeded:
+            pass
+
+    def iter_tree(self, view: Optional[Callable[['AstNode'], 'AstNode']] = None) -> Iterator[str]:
+        """Строки дерева по одной: обход с явным стеком префиксов (строки потомков
+           не перестраиваются на каждом уровне, глубина дерева не ограничена стеком вызовов)
+        :param view: представление узла при выводе (например, SideTable.view)
+        """
+
+        # элементы стека: (узел, префикс его строки, префикс строк его потомков)
+        stack = [(self, '', '')]
+        while stack:
+            node, first, rest = stack.pop()
+            if view is not None:
+                node = view(node)
+            yield first + node.to_str_full()
+            childs = node.childs
+            last = len(childs) - 1
+            for i in range(last, -1, -1):
+                if i == last:
+                    stack.append((childs[i], rest + '└ ', rest + '  '))
+                else:
+                    stack.append((childs[i], rest + '├ ', rest + '│ '))
+
+    def write_tree(self, out: TextIO, view: Optional[Callable[['AstNode'], 'AstNode']] = None) -> None:
+        """Вывод дерева в поток построчно (без построения всех строк в памяти)
+        :param out: текстовый поток
+        :param view: представление узла при выводе
+        """
+
+        for line in self.iter_tree(view):
+            out.write(line)
+            out.write('\n')
 
     @property
-    def tree(self) -> [str, ...]:
-        r = [self.to_str_full()]
-        childs = self.childs
-        for i, child in enumerate(childs):
-            ch0, ch = '├', '│'
-            if i == len(childs) - 1:
-                ch0, ch = '└', ' '
-            r.extend(((ch0 if j == 0 else ch) + ' ' + s for j, s in enumerate(child.tree)))
-        return tuple(r)
+    def tree(self) -> Tuple[str, ...]:
+        return tuple(self.iter_tree())
 
     def __getitem__(self, index):
         return self.childs[index] if index < len(self.childs) else None
 
 
+# семантическая проверка узла по шагам (см. AstNode.semantic_steps)
+SemanticSteps = Generator[Tuple[AstNode, IdentScope], None, None]
+
+
+def run_steps(steps: Optional[Generator[Tuple[AstNode, Any], None, None]],
+              expand: Optional[Callable[[AstNode, Any], Optional[Generator[Tuple[AstNode, Any], None, None]]]] = None,
+              on_error: Optional[Callable[[AstNode, SemanticException], None]] = None,
+              root: Optional[AstNode] = None) -> None:
+    """Выполнение обработки узлов по шагам с явным стеком генераторов вместо рекурсии: генератор узла
+       выдает пары (дочерний узел, контекст), обработка дочернего узла (генератор от expand) выполняется
+       до продолжения генератора узла. Исключение при обработке дочернего узла передается в генератор
+       родительского узла (как при рекурсивном вызове)
+    :param steps: генератор корневого узла (None - обрабатывать нечего)
+    :param expand: генератор обработки дочернего узла в контексте (или None, если шагов нет);
+                   по умолчанию - семантическая проверка (semantic_steps)
+    :param on_error: обработчик ошибок семантического анализа (узел, ошибка): если задан, ошибка
+                     при обработке узла прекращает обработку только этого узла (родительский узел
+                     продолжает обработку), а выданная генератором ошибка не прерывает и его
+    :param root: корневой узел (передается в on_error)
+    """
+
+    # элементы стека: (узел, генератор его обработки)
+    stack = [(root, steps)] if steps is not None else []
+    error: Optional[BaseException] = None
+    while stack:
+        try:
+            if error is None:
+                node, context = next(stack[-1][1])
+            else:
+                node, context = stack[-1][1].throw(error)
+                error = None
+        except StopIteration:
+            stack.pop()
+            continue
+        except Exception as e:
+            failed, _ = stack.pop()
+            if on_error is not None and isinstance(e, SemanticException):
+                on_error(failed, e)
+                continue
+            if not stack:
+                raise
+            error = e
+            continue
+        if isinstance(node, SemanticException):
+            # ошибка, после которой обработку узла можно продолжить
+            if on_error is None:
+                error = node
+            else:
+                on_error(stack[-1][0], node)
+            continue
+        try:
+            node_steps = node.semantic_steps(context) if expand is None else expand(node, context)
+        except Exception as e:
+            # обработка узла без шагов (обычный метод) завершилась ошибкой
+            if on_error is not None and isinstance(e, SemanticException):
+                on_error(node, e)
+            else:
+                error = e
+            continue
+        if node_steps is not None:
+            stack.append((node, node_steps))
+
+
+def walk(root: AstNode, post_order: bool = False) -> Iterator[AstNode]:
+    """Обход узлов поддерева без рекурсии
+    :param root: корень поддерева
+    :param post_order: обратный порядок (дочерние узлы раньше родительского) вместо прямого
+    :return: генератор узлов
+    """
+
+    stack = [(root, False)]
+    while stack:
+        node, visited = stack.pop()
+        if visited:
+            yield node
+            continue
+        if not post_order:
+            yield node
+        else:
+            stack.append((node, True))
+        childs = node.childs
+        for i in range(len(childs) - 1, -1, -1):
+            if isinstance(childs[i], AstNode):
+                stack.append((childs[i], False))
+
+
+class AstVisitor:
+    """Обход AST-дерева с явным стеком (глубина ограничена только памятью): enter вызывается при входе
+       в узел до обхода дочерних узлов (прямой порядок), exit - после обхода дочерних узлов (обратный)
+    """
+
+    def enter(self, node: AstNode) -> bool:
+        """Вход в узел
+        :return: обходить ли дочерние узлы
+        """
+
+        return True
+
+    def exit(self, node: AstNode) -> None:
+        pass
+
+    def childs(self, node: AstNode) -> Sequence[AstNode]:
+        return node.childs
+
+    def visit(self, root: AstNode) -> None:
+        stack = [(root, False)]
+        while stack:
+            node, entered = stack.pop()
+            if entered:
+                self.exit(node)
+                continue
+            stack.append((node, True))
+            if self.enter(node):
+                childs = self.childs(node)
+                for i in range(len(childs) - 1, -1, -1):
+                    if isinstance(childs[i], AstNode):
+                        stack.append((childs[i], False))
+
+
 class _GroupNode(AstNode):
     """Класс для группировки других узлов (вспомогательный, в синтаксисе нет соотвествия)
     """
 
+    __slots__ = ('name', '_childs')
+
     def __init__(self, name: str, *childs: AstNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -85,35 +634,49 @@ class ExprNode(AstNode, ABC):
     """Абстракный класс для выражений в AST-дереве
     """
 
-    pass
+    __slots__ = ()
 
 
 class LiteralNode(ExprNode):
     """Класс для представления в AST-дереве литералов (числа, строки, логическое значение)
     """
 
-    def __init__(self, literal: str,
+    __slots__ = ('literal', 'constants', 'index')
+
+    def __init__(self, literal: str, constants: Optional[ConstantPool] = None,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
+        """
+        :param literal: текст литерала
+        :param constants: пул констант программы (если не задан, используется общий пул)
+        """
+
         super().__init__(row=row, col=col, **props)
         self.literal = literal
-        if literal in ('true', 'false'):
-            self.value = bool(literal)
+        if constants is None:
+            with _SHARED_CONSTANTS_LOCK:
+                self.constants = _SHARED_CONSTANTS
+                self.index = _SHARED_CONSTANTS.add(literal)
         else:
-            self.value = eval(literal)
+            self.constants = constants
+            self.index = constants.add(literal)
+
+    @property
+    def value(self) -> Any:
+        return self.constants[self.index]
 
     def __str__(self) -> str:
         return self.literal
 
-    def semantic_check(self, scope: IdentScope) -> None:
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
         if isinstance(self.value, bool):
-            self.node_type = TypeDesc.BOOL
+            ann.set_type(self, TypeDesc.BOOL)
         # проверка должна быть позже bool, т.к. bool наследник от int
         elif isinstance(self.value, int):
-            self.node_type = TypeDesc.INT
+            ann.set_type(self, TypeDesc.INT)
         elif isinstance(self.value, float):
-            self.node_type = TypeDesc.FLOAT
+            ann.set_type(self, TypeDesc.FLOAT)
         elif isinstance(self.value, str):
-            self.node_type = TypeDesc.STR
+            ann.set_type(self, TypeDesc.STR)
         else:
             self.semantic_error('Неизвестный тип {} для {}'.format(type(self.value), self.value))
 
@@ -122,6 +685,8 @@ class IdentNode(ExprNode):
     """Класс для представления в AST-дереве идентификаторов
     """
 
+    __slots__ = ('name',)
+
     def __init__(self, name: str,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -130,12 +695,12 @@ class IdentNode(ExprNode):
     def __str__(self) -> str:
         return str(self.name)
 
-    def semantic_check(self, scope: IdentScope) -> None:
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
         ident = scope.get_ident(self.name)
         if ident is None:
             self.semantic_error('Идентификатор {} не найден'.format(self.name))
-        self.node_type = ident.type
-        self.node_ident = ident
+        ann.set_type(self, ident.type)
+        ann.set_ident(self, ident)
 
 
 class TypeNode(IdentNode):
@@ -143,6 +708,9 @@ class TypeNode(IdentNode):
        (при появлении составных типов данных должен быть расширен)
     """
 
+    __slots__ = ('generic', 'type', '_childs_cache')
+    _CHILD_FIELDS = ('generic',)
+
     def __init__(self, name: str, generic=None,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(name, row=row, col=col, **props)
@@ -155,18 +723,29 @@ class TypeNode(IdentNode):
         return self.to_str()
 
     @property
-    def childs(self):
-        return (self.generic, ) if self.generic else []
+    def childs(self) -> Tuple[AstNode, ...]:
+        return (self.generic, ) if self.generic else ()
 
-    def semantic_check(self, scope: IdentScope) -> None:
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
         if self.type is None:
             self.semantic_error('Неизвестный тип {}'.format(self.name))
 
 
+def declared_type(type_node: TypeNode) -> TypeDesc:
+    """Тип, обозначенный узлом типа; для неизвестного типа (ошибка выдается при проверке узла,
+       а при сборе ошибок проверка объявления продолжается) - TypeDesc.ERROR
+    """
+
+    return type_node.type if type_node.type is not None else TypeDesc.ERROR
+
+
 class SinOpNode(ExprNode):
     """Класс для представления в AST-дереве бинарных операций
     """
 
+    __slots__ = ('op', 'arg', '_childs_cache')
+    _CHILD_FIELDS = ('arg',)
+
     def __init__(self, op: SinOp, arg: ExprNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -185,6 +764,9 @@ class SeqNode(ExprNode):
     """Класс для представления в AST-дереве бинарных операций
     """
 
+    __slots__ = ('startArg', 'seqOp', 'endArg', 'stepArg', '_childs_cache')
+    _CHILD_FIELDS = ('startArg', 'seqOp', 'endArg', 'stepArg')
+
     def __init__(self, startArg: ExprNode, seqOp: str, endArg: ExprNode,
                  stepArg: ExprNode = None,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
@@ -199,13 +781,16 @@ class SeqNode(ExprNode):
 
     @property
     def childs(self) -> Tuple[ExprNode, ExprNode]:
-        return [self.startArg, self.seqOp, self.endArg] + [self.stepArg] if self.stepArg is not None else []
+        return (self.startArg, self.seqOp, self.endArg, self.stepArg) if self.stepArg is not None else ()
 
 
 class BinOpNode(ExprNode):
     """Класс для представления в AST-дереве бинарных операций
     """
 
+    __slots__ = ('op', 'arg1', 'arg2', '_childs_cache')
+    _CHILD_FIELDS = ('arg1', 'arg2')
+
     def __init__(self, op: BinOp, arg1: ExprNode, arg2: ExprNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -220,34 +805,25 @@ class BinOpNode(ExprNode):
     def childs(self) -> Tuple[ExprNode, ExprNode]:
         return self.arg1, self.arg2
 
-    def semantic_check(self, scope: IdentScope) -> None:
-        self.arg1.semantic_check(scope)
-        self.arg2.semantic_check(scope)
-
-        if self.arg1.node_type.is_simple or self.arg2.node_type.is_simple:
-            compatibility = BIN_OP_TYPE_COMPATIBILITY[self.op]
-            args_types = (self.arg1.node_type.base_type, self.arg2.node_type.base_type)
-            if args_types in compatibility:
-                self.node_type = TypeDesc.from_base_type(compatibility[args_types])
-                return
-
-            if self.arg2.node_type.base_type in TYPE_CONVERTIBILITY:
-                for arg2_type in TYPE_CONVERTIBILITY[self.arg2.node_type.base_type]:
-                    args_types = (self.arg1.node_type.base_type, arg2_type)
-                    if args_types in compatibility:
-                        self.arg2 = type_convert(self.arg2, TypeDesc.from_base_type(arg2_type))
-                        self.node_type = TypeDesc.from_base_type(compatibility[args_types])
-                        return
-            if self.arg1.node_type.base_type in TYPE_CONVERTIBILITY:
-                for arg1_type in TYPE_CONVERTIBILITY[self.arg1.node_type.base_type]:
-                    args_types = (arg1_type, self.arg2.node_type.base_type)
-                    if args_types in compatibility:
-                        self.arg1 = type_convert(self.arg1, TypeDesc.from_base_type(arg1_type))
-                        self.node_type = TypeDesc.from_base_type(compatibility[args_types])
-                        return
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
+        yield self.arg1, scope
+        yield self.arg2, scope
+
+        arg1_type, arg2_type = ann.type(self.arg1), ann.type(self.arg2)
+        if arg1_type is TypeDesc.ERROR or arg2_type is TypeDesc.ERROR:
+            ann.set_type(self, TypeDesc.ERROR)
+            return
+        resolution = BIN_OP_RESOLUTION.get((self.op, arg1_type, arg2_type))
+        if resolution is not None and resolution.result is not None:
+            if resolution.arg1_type is not None:
+                ann.set_field(self, 'arg1', type_convert(self.arg1, resolution.arg1_type, ann=ann))
+            if resolution.arg2_type is not None:
+                ann.set_field(self, 'arg2', type_convert(self.arg2, resolution.arg2_type, ann=ann))
+            ann.set_type(self, resolution.result)
+            return
 
         self.semantic_error("Оператор {} не применим к типам ({}, {})".format(
-            self.op, self.arg1.node_type, self.arg2.node_type
+            self.op, arg1_type, arg2_type
         ))
 
 
@@ -256,6 +832,9 @@ class CallNode(ExprNode):
        (в языке программирования может быть как expression, так и statement)
     """
 
+    __slots__ = ('func', 'params', '_childs_cache')
+    _CHILD_FIELDS = ('func', 'params')
+
     def __init__(self, func: IdentNode, *params: ExprNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -269,30 +848,38 @@ class CallNode(ExprNode):
     def childs(self) -> Tuple[IdentNode, ...]:
         return (self.func, *self.params)
 
-    def semantic_check(self, scope: IdentScope) -> None:
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
         func = scope.get_ident(self.func.name)
+        message = None
         if func is None:
-            self.semantic_error('Функция {} не найдена'.format(self.func.name))
-        if not func.type.func:
-            self.semantic_error('Идентификатор {} не является функцией'.format(func.name))
-        if len(func.type.params) != len(self.params):
-            self.semantic_error('Кол-во аргументов {} не совпадает (ожидалось {}, передано {})'.format(
+            message = 'Функция {} не найдена'.format(self.func.name)
+        elif not func.type.func:
+            message = 'Идентификатор {} не является функцией'.format(func.name)
+        elif len(func.type.params) != len(self.params):
+            message = 'Кол-во аргументов {} не совпадает (ожидалось {}, передано {})'.format(
                 func.name, len(func.type.params), len(self.params)
-            ))
+            )
+        if message is not None:
+            yield self.semantic_exception(message), scope
+            # при сборе ошибок проверяются аргументы (в них могут быть свои ошибки)
+            for param in self.params:
+                yield param, scope
+            ann.set_type(self, TypeDesc.ERROR)
+            return
         params = []
         error = False
         decl_params_str = fact_params_str = ''
         for i in range(len(self.params)):
             param: ExprNode = self.params[i]
-            param.semantic_check(scope)
+            yield param, scope
             if (len(decl_params_str) > 0):
                 decl_params_str += ', '
             decl_params_str += str(func.type.params[i])
             if (len(fact_params_str) > 0):
                 fact_params_str += ', '
-            fact_params_str += str(param.node_type)
+            fact_params_str += str(ann.type(param))
             try:
-                params.append(type_convert(param, func.type.params[i]))
+                params.append(type_convert(param, func.type.params[i], ann=ann))
             except:
                 error = True
         if error:
@@ -301,10 +888,10 @@ class CallNode(ExprNode):
                 func.name, fact_params_str, decl_params_str
             ))
         else:
-            self.params = tuple(params)
-            self.func.node_type = func.type
-            self.func.node_ident = func
-            self.node_type = func.type.return_type
+            ann.set_field(self, 'params', tuple(params))
+            ann.set_type(self.func, func.type)
+            ann.set_ident(self.func, func)
+            ann.set_type(self, func.type.return_type)
 
 
 class TypeConvertNode(ExprNode):
@@ -312,6 +899,9 @@ class TypeConvertNode(ExprNode):
        (в языке программирования может быть как expression, так и statement)
     """
 
+    __slots__ = ('expr', 'type', '_childs_cache')
+    _CHILD_FIELDS = ('expr', 'type')
+
     def __init__(self, expr: ExprNode, type_: TypeDesc,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -324,32 +914,38 @@ class TypeConvertNode(ExprNode):
 
     @property
     def childs(self) -> Tuple[AstNode, ...]:
-        return (_GroupNode(str(self.type), self.expr), )
+        # вспомогательный узел группы строится один раз (до изменения полей, см. _CHILD_FIELDS)
+        return _GroupNode(str(self.type), self.expr),
 
 
-def type_convert(expr: ExprNode, type_: TypeDesc, except_node: Optional[AstNode] = None, comment: Optional[str] = None) -> ExprNode:
+def type_convert(expr: ExprNode, type_: TypeDesc, except_node: Optional[AstNode] = None, comment: Optional[str] = None,
+                 ann: NodeAnnotations = IN_PLACE) -> ExprNode:
     """Метод преобразования ExprNode узла AST-дерева к другому типу
     :param expr: узел AST-дерева
     :param type_: требуемый тип
     :param except_node: узел, о которого будет исключение
     :param comment: комментарий
+    :param ann: результаты анализа (тип выражения)
     :return: узел AST-дерева c операцией преобразования
     """
 
-    if expr.node_type is None:
+    expr_type = ann.type(expr)
+    if expr_type is None:
         except_node.semantic_error('Тип выражения не определен')
     if type_ is None:
-        except_node.node_type = expr.node_type
-        except_node.type = TypeNode(except_node.node_type.base_type)
+        ann.set_type(except_node, expr_type)
+        ann.set_field(except_node, 'type', TypeNode(expr_type.base_type))
         return expr
-    if expr.node_type == type_:
+    if expr_type is type_ or expr_type is TypeDesc.ERROR or type_ is TypeDesc.ERROR:
         return expr
-    if expr.node_type.is_simple and type_.is_simple and \
-            expr.node_type.base_type in TYPE_CONVERTIBILITY and type_.base_type in TYPE_CONVERTIBILITY[expr.node_type.base_type]:
-        return TypeConvertNode(expr, type_)
+    if expr_type.is_simple and type_.is_simple and \
+            expr_type.base_type in TYPE_CONVERTIBILITY and type_.base_type in TYPE_CONVERTIBILITY[expr_type.base_type]:
+        node = TypeConvertNode(expr, type_)
+        ann.set_type(node, type_)
+        return node
     else:
         (except_node if except_node else expr).semantic_error('Тип {0}{2} не конвертируется в {1}'.format(
-            expr.node_type, type_, ' ({})'.format(comment) if comment else ''
+            expr_type, type_, ' ({})'.format(comment) if comment else ''
         ))
 
 
@@ -357,6 +953,8 @@ class StmtNode(ExprNode, ABC):
     """Абстракный класс для деклараций или инструкций в AST-дереве
     """
 
+    __slots__ = ()
+
     def to_str_full(self):
         return self.to_str()
 
@@ -365,11 +963,16 @@ class StmtListNode(StmtNode):
     """Класс для представления в AST-дереве последовательности инструкций
     """
 
+    __slots__ = ('exprs', 'program', 'stmt_starts', 'constants')
+
     def __init__(self, *exprs: StmtNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
         self.exprs = exprs
         self.program = False
+        # границы инструкций верхнего уровня и пул констант (заполняются при разборе программы)
+        self.stmt_starts: Optional[array] = None
+        self.constants: Optional[ConstantPool] = None
 
     def __str__(self) -> str:
         return '...'
@@ -378,18 +981,21 @@ class StmtListNode(StmtNode):
     def childs(self) -> Tuple[StmtNode, ...]:
         return self.exprs
 
-    def semantic_check(self, scope: IdentScope) -> None:
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
         if not self.program:
             scope = IdentScope(scope)
         for expr in self.exprs:
-            expr.semantic_check(scope)
-        self.node_type = TypeDesc.VOID
+            yield expr, scope
+        ann.set_type(self, TypeDesc.VOID)
 
 
 class AssignNode(ExprNode):
     """Класс для представления в AST-дереве оператора присваивания
     """
 
+    __slots__ = ('var', 'val', '_childs_cache')
+    _CHILD_FIELDS = ('var', 'val')
+
     def __init__(self, var: IdentNode, val: ExprNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -403,17 +1009,19 @@ class AssignNode(ExprNode):
     def childs(self) -> Tuple[IdentNode, ExprNode]:
         return self.var, self.val
 
-    def semantic_check(self, scope: IdentScope) -> None:
-        self.var.semantic_check(scope)
-        self.val.semantic_check(scope)
-        self.val = type_convert(self.val, self.var.node_type, self, 'присваиваемое значение')
-        self.node_type = self.var.node_type
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
+        yield self.var, scope
+        yield self.val, scope
+        ann.set_field(self, 'val', type_convert(self.val, ann.type(self.var), self, 'присваиваемое значение', ann))
+        ann.set_type(self, ann.type(self.var))
 
 
 class VarsNode(StmtNode):
     """Класс для представления в AST-дереве объявления переменнных
     """
 
+    __slots__ = ('type', 'vars')
+
     def __init__(self, type_: TypeNode, *vars_: Union[IdentNode, 'AssignNode'],
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -427,70 +1035,86 @@ class VarsNode(StmtNode):
     def childs(self) -> Tuple[AstNode, ...]:
         return self.vars
 
-    def semantic_check(self, scope: IdentScope) -> None:
-        self.type.semantic_check(scope)
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
+        yield self.type, scope
         for var in self.vars:
             var_node: IdentNode = var.var if isinstance(var, AssignNode) else var
             try:
-                scope.add_ident(IdentDesc(var_node.name, self.type.type))
+                scope.add_ident(IdentDesc(var_node.name, declared_type(self.type)))
             except SemanticException as e:
-                var_node.semantic_error(e.message)
-            var.semantic_check(scope)
-        self.node_type = TypeDesc.VOID
+                yield var_node.semantic_exception(e.message), scope
+            yield var, scope
+        ann.set_type(self, TypeDesc.VOID)
 
 
 class VarNode(StmtNode):
     """Класс для представления в AST-дереве объявления переменнных
     """
 
+    __slots__ = ('declare', 'ident', 'type', 'var', '_childs_cache')
+    _CHILD_FIELDS = ('ident', 'type', 'var')
+
     def __init__(self, *params,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
         self.declare = params[0]
         params = params[1:]
-        sep = params[1]
         self.ident = params[0]
         self.type = None
         self.var = None
+        # объявление без типа и значения (var x) разбирается, ошибка о нем - при семантическом анализе
+        sep = params[1] if len(params) > 1 else None
         if isinstance(sep, str):
             self.type = params[2]
             if len(params) > 3:
                 self.var = params[3]
         else:
-            self.var = params[1]
+            self.var = sep
 
     def __str__(self) -> str:
         return self.declare
 
     @property
     def childs(self) -> Tuple[AstNode, ...]:
-        childs = []
-        if self.type is not None:
-            childs.append(self.type)
-        childs.append(self.ident)
-        if self.var is not None:
-            childs.append(self.var)
-        return childs
+        if self.type is None:
+            return (self.ident, self.var) if self.var is not None else (self.ident, )
+        return (self.type, self.ident, self.var) if self.var is not None else (self.type, self.ident)
 
-    def semantic_check(self, scope: IdentScope) -> None:
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
         if self.type is not None:
-            self.type.semantic_check(scope)
-        self.var.semantic_check(scope)
+            yield self.type, scope
         var = self.ident
         var_node: IdentNode = var if isinstance(var, AssignNode) else var
-        self.var = type_convert(self.var, self.type.type if self.type is not None else None, self, 'присваиваемое значение')
+        if self.var is not None:
+            yield self.var, scope
+            try:
+                ann.set_field(self, 'var', type_convert(self.var, declared_type(self.type) if self.type is not None else None,
+                                                        self, 'присваиваемое значение', ann))
+            except SemanticException as e:
+                # при сборе ошибок переменная объявляется (с явно указанным типом, иначе - с типом ERROR),
+                # чтобы ее использование не давало ошибок "не найден"
+                if self.type is None:
+                    ann.set_field(self, 'type', TypeNode(BaseType.ERROR))
+                yield e, scope
+        elif self.type is None:
+            ann.set_field(self, 'type', TypeNode(BaseType.ERROR))
+            yield var_node.semantic_exception('Не указан тип переменной {}'.format(var_node.name)), scope
         try:
-            scope.add_ident(IdentDesc(var_node.name, self.type.type))
+            # тип объявления без явного типа выводится по значению (type_convert записывает его в поле type)
+            scope.add_ident(IdentDesc(var_node.name, declared_type(ann.field(self, 'type'))))
         except SemanticException as e:
-            var_node.semantic_error(e.message)
-        var.semantic_check(scope)
-        self.node_type = TypeDesc.VOID
+            yield var_node.semantic_exception(e.message), scope
+        yield var, scope
+        ann.set_type(self, TypeDesc.VOID)
 
 
 class ReturnNode(StmtNode):
     """Класс для представления в AST-дереве оператора return
     """
 
+    __slots__ = ('val', '_childs_cache')
+    _CHILD_FIELDS = ('val',)
+
     def __init__(self, val: ExprNode = None,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -503,19 +1127,22 @@ class ReturnNode(StmtNode):
     def childs(self) -> Tuple[ExprNode]:
         return (self.val, ) if self.val is not None else ()
 
-    def semantic_check(self, scope: IdentScope) -> None:
-        self.val.semantic_check(IdentScope(scope))
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
+        yield self.val, IdentScope(scope)
         func = scope.curr_func
         if func is None:
             self.semantic_error('Оператор return применим только к функции')
-        self.val = type_convert(self.val, func.func.type.return_type, self, 'возвращаемое значение')
-        self.node_type = TypeDesc.VOID
+        ann.set_field(self, 'val', type_convert(self.val, func.func.type.return_type, self, 'возвращаемое значение', ann))
+        ann.set_type(self, TypeDesc.VOID)
 
 
 class IfNode(StmtNode):
     """Класс для представления в AST-дереве условного оператора
     """
 
+    __slots__ = ('cond', 'then_stmt', 'else_stmt', '_childs_cache')
+    _CHILD_FIELDS = ('cond', 'then_stmt', 'else_stmt')
+
     def __init__(self, cond: ExprNode, then_stmt: StmtNode, else_stmt: Optional[StmtNode] = None,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -530,19 +1157,25 @@ class IfNode(StmtNode):
     def childs(self) -> Tuple[ExprNode, StmtNode, Optional[StmtNode]]:
         return (self.cond, self.then_stmt, *((self.else_stmt,) if self.else_stmt else tuple()))
 
-    def semantic_check(self, scope: IdentScope) -> None:
-        self.cond.semantic_check(scope)
-        self.cond = type_convert(self.cond, TypeDesc.BOOL, None, 'условие')
-        self.then_stmt.semantic_check(IdentScope(scope))
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
+        yield self.cond, scope
+        try:
+            ann.set_field(self, 'cond', type_convert(self.cond, TypeDesc.BOOL, None, 'условие', ann))
+        except SemanticException as e:
+            yield e, scope
+        yield self.then_stmt, IdentScope(scope)
         if self.else_stmt:
-            self.else_stmt.semantic_check(IdentScope(scope))
-        self.node_type = TypeDesc.VOID
+            yield self.else_stmt, IdentScope(scope)
+        ann.set_type(self, TypeDesc.VOID)
 
 
 class ForNode(StmtNode):
     """Класс для представления в AST-дереве цикла for
     """
 
+    __slots__ = ('init', 'cond', 'body', '_childs_cache')
+    _CHILD_FIELDS = ('init', 'cond', 'body')
+
     def __init__(self, init: IdentNode, cond: ExprNode, body: StmtNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -557,21 +1190,29 @@ class ForNode(StmtNode):
     def childs(self) -> Tuple[AstNode, ...]:
         return self.init, self.cond, self.body
 
-    def semantic_check(self, scope: IdentScope) -> None:
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
         scope = IdentScope(scope)
-        self.init.semantic_check(scope)
-        if self.cond == EMPTY_STMT:
-            self.cond = LiteralNode('true')
-        self.cond.semantic_check(scope)
-        self.cond = type_convert(self.cond, TypeDesc.BOOL, None, 'условие')
-        self.body.semantic_check(IdentScope(scope))
-        self.node_type = TypeDesc.VOID
+        yield self.init, scope
+        cond = self.cond
+        if cond == EMPTY_STMT:
+            cond = LiteralNode('true')
+            ann.set_field(self, 'cond', cond)
+        yield cond, scope
+        try:
+            ann.set_field(self, 'cond', type_convert(cond, TypeDesc.BOOL, None, 'условие', ann))
+        except SemanticException as e:
+            yield e, scope
+        yield self.body, IdentScope(scope)
+        ann.set_type(self, TypeDesc.VOID)
 
 
 class WhileNode(StmtNode):
     """Класс для представления в AST-дереве цикла while
     """
 
+    __slots__ = ('condition', 'body', '_childs_cache')
+    _CHILD_FIELDS = ('condition', 'body')
+
     def __init__(self, condition: ExprNode, body: StmtNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -589,6 +1230,9 @@ class DoWhileNode(StmtNode):
     """Класс для представления в AST-дереве цикла while
     """
 
+    __slots__ = ('condition', 'body', '_childs_cache')
+    _CHILD_FIELDS = ('condition', 'body')
+
     def __init__(self, body: StmtNode, condition: ExprNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -608,6 +1252,9 @@ class ParamNode(StmtNode):
     """Класс для представления в AST-дереве объявления параметра функции
     """
 
+    __slots__ = ('type', 'name', 'value', '_childs_cache')
+    _CHILD_FIELDS = ('name', 'value')
+
     def __init__(self, name: IdentNode, type_: TypeNode, expr: ExprNode = None,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -619,26 +1266,27 @@ class ParamNode(StmtNode):
         return str(self.type)
 
     @property
-    def childs(self) -> Tuple[IdentNode]:
-        childs = [self.name]
-        if self.value is not None:
-            childs.append(self.value)
-        return childs
-
-    def semantic_check(self, scope: IdentScope) -> None:
-        self.type.semantic_check(scope)
-        self.name.node_type = self.type.type
+    def childs(self) -> Tuple[AstNode, ...]:
+        return (self.name, self.value) if self.value is not None else (self.name, )
+
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
+        yield self.type, scope
+        type_ = declared_type(self.type)
+        ann.set_type(self.name, type_)
         try:
-            self.name.node_ident = scope.add_ident(IdentDesc(self.name.name, self.type.type, ScopeType.PARAM))
+            ann.set_ident(self.name, scope.add_ident(IdentDesc(self.name.name, type_, ScopeType.PARAM)))
         except SemanticException:
             raise self.name.semantic_error('Параметр {} уже объявлен'.format(self.name.name))
-        self.node_type = TypeDesc.VOID
+        ann.set_type(self, TypeDesc.VOID)
 
 
 class FuncNode(StmtNode):
     """Класс для представления в AST-дереве объявления функции
     """
 
+    __slots__ = ('type', 'name', 'params', 'body', '_childs_cache')
+    _CHILD_FIELDS = ('type', 'name', 'params', 'body')
+
     def __init__(self, type_: TypeNode, name: IdentNode, params: Tuple[ParamNode], body: StmtNode,
                  row: Optional[int] = None, col: Optional[int] = None, **props) -> None:
         super().__init__(row=row, col=col, **props)
@@ -652,13 +1300,14 @@ class FuncNode(StmtNode):
 
     @property
     def childs(self) -> Tuple[AstNode, ...]:
+        # вспомогательные узлы групп строятся один раз (до изменения полей, см. _CHILD_FIELDS)
         return _GroupNode(str(self.type), self.name), _GroupNode('params', *self.params), self.body
 
-    def semantic_check(self, scope: IdentScope) -> None:
+    def semantic_steps(self, scope: IdentScope, ann: NodeAnnotations = IN_PLACE) -> Optional[SemanticSteps]:
         if scope.curr_func:
             self.semantic_error("Объявление функции ({}) внутри другой функции не поддерживается".format(self.name.name))
         parent_scope = scope
-        self.type.semantic_check(scope)
+        yield self.type, scope
         scope = IdentScope(scope)
 
         # временно хоть какое-то значение, чтобы при добавлении параметров находить scope функции
@@ -666,19 +1315,19 @@ class FuncNode(StmtNode):
         params = []
         for param in self.params:
             # при проверке параметров происходит их добавление в scope
-            param.semantic_check(scope)
-            params.append(param.type.type)
+            yield param, scope
+            params.append(declared_type(param.type))
 
-        type_ = TypeDesc(None, self.type.type, tuple(params))
+        type_ = TypeDesc(None, declared_type(self.type), tuple(params))
         func_ident = IdentDesc(self.name.name, type_)
         scope.func = func_ident
-        self.name.node_type = type_
+        ann.set_type(self.name, type_)
         try:
-            self.name.node_ident = parent_scope.curr_global.add_ident(func_ident)
+            ann.set_ident(self.name, parent_scope.curr_global.add_ident(func_ident))
         except SemanticException as e:
-            self.name.semantic_error("Повторное объявление функции {}".format(self.name.name))
-        self.body.semantic_check(scope)
-        self.node_type = TypeDesc.VOID
+            yield self.name.semantic_exception("Повторное объявление функции {}".format(self.name.name)), scope
+        yield self.body, scope
+        ann.set_type(self, TypeDesc.VOID)
 
 EMPTY_STMT = StmtListNode()
 EMPTY_IDENT = IdentDesc('', TypeDesc.VOID)
\ No newline at end of file
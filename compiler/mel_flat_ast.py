@@ -0,0 +1,621 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from contextlib import suppress
+from array import array
+from enum import IntEnum
+from typing import Optional, List, Dict, Tuple, Iterator, Union, Any, TextIO
+
+from .mel_ast import *
+from .mel_ast import _GroupNode
+
+
+class NodeKind(IntEnum):
+    """Перечисление видов узлов (значения хранятся в массиве видов как байты)
+    """
+
+    GROUP = 1
+    LITERAL = 2
+    IDENT = 3
+    TYPE = 4
+    SIN_OP = 5
+    SEQ = 6
+    BIN_OP = 7
+    CALL = 8
+    TYPE_CONVERT = 9
+    STMT_LIST = 10
+    ASSIGN = 11
+    VARS = 12
+    VAR = 13
+    RETURN = 14
+    IF = 15
+    FOR = 16
+    WHILE = 17
+    DO_WHILE = 18
+    PARAM = 19
+    FUNC = 20
+
+    def __str__(self):
+        return self.name.lower()
+
+
+_KINDS = {
+    _GroupNode: NodeKind.GROUP, LiteralNode: NodeKind.LITERAL, IdentNode: NodeKind.IDENT, TypeNode: NodeKind.TYPE,
+    SinOpNode: NodeKind.SIN_OP, SeqNode: NodeKind.SEQ, BinOpNode: NodeKind.BIN_OP, CallNode: NodeKind.CALL,
+    TypeConvertNode: NodeKind.TYPE_CONVERT, StmtListNode: NodeKind.STMT_LIST, AssignNode: NodeKind.ASSIGN,
+    VarsNode: NodeKind.VARS, VarNode: NodeKind.VAR, ReturnNode: NodeKind.RETURN, IfNode: NodeKind.IF,
+    ForNode: NodeKind.FOR, WhileNode: NodeKind.WHILE, DoWhileNode: NodeKind.DO_WHILE, ParamNode: NodeKind.PARAM,
+    FuncNode: NodeKind.FUNC,
+}
+
+# подписи узлов, не зависящие от данных узла
+_LABELS = {
+    NodeKind.SEQ: 'seq', NodeKind.CALL: 'call', NodeKind.TYPE_CONVERT: 'convert', NodeKind.STMT_LIST: '...',
+    NodeKind.ASSIGN: '=', NodeKind.RETURN: 'return', NodeKind.IF: 'if', NodeKind.FOR: 'for',
+    NodeKind.WHILE: 'while', NodeKind.DO_WHILE: 'do while', NodeKind.FUNC: 'function',
+}
+# виды узлов, в подписи которых (как в to_str_full) не выводится тип
+_NO_TYPE_KINDS = frozenset((
+    NodeKind.GROUP, NodeKind.TYPE, NodeKind.STMT_LIST, NodeKind.VARS, NodeKind.VAR, NodeKind.RETURN, NodeKind.IF,
+    NodeKind.FOR, NodeKind.WHILE, NodeKind.DO_WHILE, NodeKind.PARAM, NodeKind.FUNC,
+))
+
+_MAGIC = b'MELA'
+# версия формата to_bytes (увеличивается при любом несовместимом изменении)
+FORMAT_VERSION = 2
+# сигнатура, версия, число узлов, число строк, размер текста строк, размер таблиц в JSON
+_HEADER = struct.Struct('<4sHxxIIII')
+# массивы в порядке сериализации
+_ARRAYS = ('kinds', 'parents', 'first_childs', 'next_siblings', 'locs', 'type_ids', 'ident_ids', 'payloads')
+
+
+def _fields(node: AstNode) -> Tuple[Union[str, int, None], Tuple[AstNode, ...]]:
+    """Данные узла (строка или число) и все его дочерние узлы в порядке хранения
+       (в отличие от childs, включая узлы, которые в дереве не выводятся, и без вспомогательных групп)
+    """
+
+    if isinstance(node, LiteralNode):
+        return node.literal, ()
+    if isinstance(node, TypeNode):
+        return node.name, (node.generic, ) if node.generic else ()
+    if isinstance(node, IdentNode):
+        return node.name, ()
+    if isinstance(node, (SinOpNode, BinOpNode)):
+        return node.op.value, node.childs
+    if isinstance(node, SeqNode):
+        return node.seqOp, (node.startArg, node.endArg) + ((node.stepArg, ) if node.stepArg is not None else ())
+    if isinstance(node, StmtListNode):
+        return int(node.program), node.exprs
+    if isinstance(node, VarsNode):
+        return None, (node.type, *node.vars)
+    if isinstance(node, VarNode):
+        return node.declare, tuple(node.childs)
+    if isinstance(node, TypeConvertNode):
+        return None, (node.expr, )
+    if isinstance(node, DoWhileNode):
+        return None, (node.body, node.condition)
+    if isinstance(node, ParamNode):
+        return None, (node.type, *node.childs)
+    if isinstance(node, FuncNode):
+        return None, (node.type, node.name, *node.params, node.body)
+    if isinstance(node, _GroupNode):
+        return node.name, node.childs
+    return None, tuple(node.childs)
+
+
+def _type_from_str(str_decl: str) -> TypeDesc:
+    # функциональный тип записывается как "Int (Int, String)" (параметры - только простые типы)
+    if ' (' not in str_decl:
+        return TypeDesc.from_str(str_decl)
+    return_type, params = str_decl[:-1].split(' (', 1)
+    return TypeDesc(None, _type_from_str(return_type),
+                    tuple(TypeDesc.from_str(param) for param in params.split(', ') if param))
+
+
+class FlatAst:
+    """AST-дерево в виде параллельных типизированных массивов (struct of arrays): узел - целочисленный
+       дескриптор (handle), индекс в массивах. Узлы нумеруются в прямом порядке обхода, поэтому поддерево
+       узла - непрерывный отрезок дескрипторов, а обход всего дерева - перебор чисел без рекурсии.
+
+       Данные узла (payloads) зависят от вида: индекс строки (текст литерала, имя, оператор, объявление)
+       в strings, признак программы для STMT_LIST или -1. Типы и идентификаторы хранятся по индексам в
+       таблицах types и idents (-1 - нет), позиции (locs) - смещения в тексте программы (-1 - нет)
+    """
+
+    def __init__(self, prog: Optional[str] = None) -> None:
+        """
+        :param prog: текст программы, по которому вычисляются строка и столбец узлов
+        """
+
+        self.kinds = array('B')
+        self.parents = array('i')
+        self.first_childs = array('i')
+        self.next_siblings = array('i')
+        self.locs = array('q')
+        self.type_ids = array('i')
+        self.ident_ids = array('i')
+        self.payloads = array('i')
+        self.strings: Union[List[str], _StringTable] = []
+        self._types: List[TypeDesc] = []
+        self._idents: List[IdentDesc] = []
+        # таблицы типов и идентификаторов в JSON, еще не декодированные (для загруженного дерева)
+        self._tables: Optional[memoryview] = None
+        self.locations = SourceLocations(prog) if prog is not None else None
+        # строка и столбец узлов (для загруженного дерева, у которого нет текста программы; 0 - нет)
+        self.rows: Optional[Union[array, memoryview]] = None
+        self.cols: Optional[Union[array, memoryview]] = None
+        self._string_ids: Dict[str, int] = {}
+        self._type_ids: Dict[TypeDesc, int] = {}
+        self._ident_ids: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def types(self) -> List[TypeDesc]:
+        if self._tables is not None:
+            self._load_tables()
+        return self._types
+
+    @property
+    def idents(self) -> List[IdentDesc]:
+        if self._tables is not None:
+            self._load_tables()
+        return self._idents
+
+    # ---- построение ----
+
+    def _string_id(self, s: str) -> int:
+        index = self._string_ids.get(s)
+        if index is None:
+            index = self._string_ids[s] = len(self.strings)
+            self.strings.append(s)
+        return index
+
+    def _type_id(self, type_: Optional[TypeDesc]) -> int:
+        if type_ is None:
+            return -1
+        # типы интернированы: равные типы - один объект
+        index = self._type_ids.get(type_)
+        if index is None:
+            index = self._type_ids[type_] = len(self._types)
+            self._types.append(type_)
+        return index
+
+    def _ident_id(self, ident: Optional[IdentDesc]) -> int:
+        if ident is None:
+            return -1
+        # один и тот же объект описания переменной разделяется узлами и после обратного преобразования
+        index = self._ident_ids.get(id(ident))
+        if index is None:
+            index = self._ident_ids[id(ident)] = len(self._idents)
+            self._idents.append(ident)
+        return index
+
+    @staticmethod
+    def from_ast(root: AstNode) -> 'FlatAst':
+        """Преобразование AST-дерева из объектов в массивы (без рекурсии).
+           Позиции узлов пересчитываются в смещения текста, из которого разобран корень
+        :param root: корень AST-дерева
+        :return: дерево в виде массивов
+        """
+
+        locations = root.locations
+        if isinstance(locations, ShiftedLocations):
+            locations = locations.base
+        flat = FlatAst()
+        flat.locations = locations
+        kinds, parents, first_childs, next_siblings = flat.kinds, flat.parents, flat.first_childs, flat.next_siblings
+        locs, type_ids, ident_ids, payloads = flat.locs, flat.type_ids, flat.ident_ids, flat.payloads
+        last_childs = array('i')
+        # строка и столбец узлов без текста программы (заданные явно или восстановленные из загруженного дерева)
+        explicit: List[Tuple[int, int, int]] = []
+        stack: List[Tuple[AstNode, int]] = [(root, -1)]
+        while stack:
+            node, parent = stack.pop()
+            handle = len(kinds)
+            payload, childs = _fields(node)
+            kinds.append(_KINDS[type(node)])
+            parents.append(parent)
+            first_childs.append(-1)
+            next_siblings.append(-1)
+            last_childs.append(-1)
+            node_locations, loc = node.locations, node.loc
+            if loc is None or node_locations is None and locations is not None:
+                locs.append(-1)
+            else:
+                # у узлов дерева, восстановленного из загруженного (to_ast), смещения без текста программы
+                locs.append(loc + node_locations.delta if isinstance(node_locations, ShiftedLocations) else loc)
+            if node_locations is None and node.row is not None:
+                explicit.append((handle, node.row, node.col or 0))
+            type_ids.append(flat._type_id(node.node_type))
+            ident_ids.append(flat._ident_id(node.node_ident))
+            payloads.append(flat._string_id(payload) if isinstance(payload, str) else -1 if payload is None else payload)
+            if parent >= 0:
+                if last_childs[parent] < 0:
+                    first_childs[parent] = handle
+                else:
+                    next_siblings[last_childs[parent]] = handle
+                last_childs[parent] = handle
+            # дочерние узлы кладутся в стек в обратном порядке, чтобы нумерация была прямым обходом
+            for child in reversed(childs):
+                stack.append((child, handle))
+        if explicit:
+            flat._set_rows_cols(explicit)
+        return flat
+
+    def _set_rows_cols(self, explicit: List[Tuple[int, int, int]]) -> None:
+        """Заполнение строк и столбцов всех узлов (они используются вместо позиций в тексте программы)
+        :param explicit: дескрипторы, строки и столбцы узлов, позиции которых не вычисляются по тексту программы
+        """
+
+        n = len(self.kinds)
+        self.rows, self.cols = array('i', bytes(4 * n)), array('i', bytes(4 * n))
+        if self.locations is not None:
+            for handle in range(n):
+                loc = self.locs[handle]
+                if loc >= 0:
+                    self.rows[handle], self.cols[handle] = self.locations.row_col(loc)
+        for handle, row, col in explicit:
+            self.rows[handle], self.cols[handle] = row, col
+
+    # ---- доступ к узлам ----
+
+    def kind(self, handle: int) -> NodeKind:
+        return NodeKind(self.kinds[handle])
+
+    def parent(self, handle: int) -> int:
+        return self.parents[handle]
+
+    def childs(self, handle: int) -> Tuple[int, ...]:
+        """Дескрипторы всех дочерних узлов в порядке хранения (см. _fields)
+        """
+
+        childs = []
+        child = self.first_childs[handle]
+        while child >= 0:
+            childs.append(child)
+            child = self.next_siblings[child]
+        return tuple(childs)
+
+    def subtree_end(self, handle: int) -> int:
+        """Дескриптор, следующий за последним узлом поддерева
+        """
+
+        while handle >= 0:
+            if self.next_siblings[handle] >= 0:
+                return self.next_siblings[handle]
+            handle = self.parents[handle]
+        return len(self.kinds)
+
+    def walk(self, handle: int = 0) -> Iterator[int]:
+        """Обход поддерева в прямом порядке (перебор отрезка дескрипторов)
+        """
+
+        return iter(range(handle, self.subtree_end(handle)))
+
+    def text(self, handle: int) -> Optional[str]:
+        """Строковые данные узла (текст литерала, имя, оператор, объявление)
+        """
+
+        payload = self.payloads[handle]
+        if payload < 0 or self.kinds[handle] == NodeKind.STMT_LIST:
+            return None
+        return self.strings[payload]
+
+    def node_type(self, handle: int) -> Optional[TypeDesc]:
+        type_id = self.type_ids[handle]
+        return self.types[type_id] if type_id >= 0 else None
+
+    def node_ident(self, handle: int) -> Optional[IdentDesc]:
+        ident_id = self.ident_ids[handle]
+        return self.idents[ident_id] if ident_id >= 0 else None
+
+    def row_col(self, handle: int) -> Optional[Tuple[int, int]]:
+        if self.rows is not None:
+            return (self.rows[handle], self.cols[handle]) if self.rows[handle] > 0 else None
+        loc = self.locs[handle]
+        if loc < 0 or self.locations is None:
+            return None
+        return self.locations.row_col(loc)
+
+    # ---- вывод ----
+
+    def to_str_full(self, handle: int) -> str:
+        """Подпись узла в дереве (как AstNode.to_str_full)
+        """
+
+        kind = self.kinds[handle]
+        label = _LABELS.get(kind)
+        if label is None:
+            if kind in (NodeKind.VARS, NodeKind.PARAM):
+                label = self.strings[self.payloads[self.first_childs[handle]]]
+            else:
+                label = self.strings[self.payloads[handle]]
+        if kind in _NO_TYPE_KINDS:
+            return label
+        r = self.node_ident(handle) or self.node_type(handle)
+        return label + (' : ' + str(r) if r else '')
+
+    def _display_childs(self, handle: int) -> List[Union[int, Tuple[str, List[int]]]]:
+        # дочерние узлы в том виде, как их выводит AstNode.tree (с вспомогательными группами)
+        kind = self.kinds[handle]
+        childs = list(self.childs(handle))
+        if kind == NodeKind.TYPE_CONVERT:
+            return [(str(self.node_type(handle)), childs)]
+        if kind == NodeKind.FUNC:
+            type_name = self.strings[self.payloads[childs[0]]]
+            return [(type_name, [childs[1]]), ('params', childs[2:-1]), childs[-1]]
+        if kind in (NodeKind.VARS, NodeKind.PARAM):
+            return childs[1:]
+        if kind == NodeKind.DO_WHILE:
+            return childs[::-1]
+        if kind == NodeKind.SEQ and len(childs) < 3:
+            return []
+        return childs
+
+    def iter_tree(self, handle: int = 0) -> Iterator[str]:
+        """Строки дерева по одной (такие же, как AstNode.iter_tree), строятся без рекурсии
+        """
+
+        # элементы стека: (узел или группа, префикс первой строки, префикс остальных строк)
+        stack: List[Tuple[Union[int, Tuple[str, List[int]]], str, str]] = [(handle, '', '')]
+        while stack:
+            item, first, rest = stack.pop()
+            if isinstance(item, tuple):
+                label, childs = item
+            else:
+                label, childs = self.to_str_full(item), self._display_childs(item)
+            yield first + label
+            for i in range(len(childs) - 1, -1, -1):
+                if i == len(childs) - 1:
+                    stack.append((childs[i], rest + '└ ', rest + '  '))
+                else:
+                    stack.append((childs[i], rest + '├ ', rest + '│ '))
+
+    def write_tree(self, out: TextIO, handle: int = 0) -> None:
+        """Вывод дерева в поток построчно (как AstNode.write_tree)
+        """
+
+        for line in self.iter_tree(handle):
+            out.write(line)
+            out.write('\n')
+
+    def tree(self, handle: int = 0) -> Tuple[str, ...]:
+        return tuple(self.iter_tree(handle))
+
+    # ---- обратное преобразование ----
+
+    def _make_node(self, handle: int, childs: List[AstNode], constants: ConstantPool) -> AstNode:
+        kind = self.kinds[handle]
+        text = self.text(handle)
+        if kind == NodeKind.LITERAL:
+            return LiteralNode(text, constants)
+        if kind == NodeKind.IDENT:
+            return IdentNode(text)
+        if kind == NodeKind.TYPE:
+            return TypeNode(text, *childs)
+        if kind == NodeKind.SIN_OP:
+            return SinOpNode(SinOp(text), *childs)
+        if kind == NodeKind.SEQ:
+            return SeqNode(childs[0], text, *childs[1:])
+        if kind == NodeKind.BIN_OP:
+            return BinOpNode(BinOp(text), *childs)
+        if kind == NodeKind.CALL:
+            return CallNode(*childs)
+        if kind == NodeKind.TYPE_CONVERT:
+            return TypeConvertNode(childs[0], self.node_type(handle))
+        if kind == NodeKind.STMT_LIST:
+            node = StmtListNode(*childs)
+            node.program = bool(self.payloads[handle])
+            return node
+        if kind == NodeKind.ASSIGN:
+            return AssignNode(*childs)
+        if kind == NodeKind.VARS:
+            return VarsNode(*childs)
+        if kind == NodeKind.VAR:
+            if self.kinds[self.first_childs[handle]] == NodeKind.TYPE:
+                return VarNode(text, childs[1], ':', childs[0], *childs[2:])
+            if len(childs) > 1:
+                return VarNode(text, childs[0], childs[1])
+            return VarNode(text, childs[0], ':', None)
+        if kind == NodeKind.RETURN:
+            return ReturnNode(*childs)
+        if kind == NodeKind.IF:
+            return IfNode(*childs)
+        if kind == NodeKind.FOR:
+            return ForNode(*childs)
+        if kind == NodeKind.WHILE:
+            return WhileNode(*childs)
+        if kind == NodeKind.DO_WHILE:
+            return DoWhileNode(*childs)
+        if kind == NodeKind.PARAM:
+            return ParamNode(childs[1], childs[0], *childs[2:])
+        if kind == NodeKind.FUNC:
+            return FuncNode(childs[0], childs[1], tuple(childs[2:-1]), childs[-1])
+        return _GroupNode(text, *childs)
+
+    def to_ast(self, handle: int = 0) -> AstNode:
+        """Преобразование поддерева в AST-дерево из объектов (без рекурсии: при обходе дескрипторов
+           в обратном порядке дочерние узлы строятся раньше родительских)
+        :param handle: корень поддерева
+        :return: корень AST-дерева
+        """
+
+        end = self.subtree_end(handle)
+        constants = ConstantPool()
+        types, idents = self.types, self.idents
+        first_childs, next_siblings, locs, type_ids, ident_ids = \
+            self.first_childs, self.next_siblings, self.locs, self.type_ids, self.ident_ids
+        rows, cols, locations = self.rows, self.cols, self.locations
+        # построенные поддеревья: дочерние узлы очередного узла - на вершине стека (первый - сверху)
+        stack: List[AstNode] = []
+        for h in range(end - 1, handle - 1, -1):
+            childs = []
+            child = first_childs[h]
+            while child >= 0:
+                childs.append(stack.pop())
+                child = next_siblings[child]
+            node = self._make_node(h, childs, constants)
+            loc = locs[h]
+            if loc >= 0:
+                node.loc, node.locations = loc, locations
+            if rows is not None and rows[h] > 0:
+                node.row, node.col = rows[h], cols[h]
+            type_id, ident_id = type_ids[h], ident_ids[h]
+            node.node_type = types[type_id] if type_id >= 0 else None
+            node.node_ident = idents[ident_id] if ident_id >= 0 else None
+            stack.append(node)
+        root = stack.pop()
+        if isinstance(root, StmtListNode):
+            root.constants = constants
+        return root
+
+    # ---- сериализация ----
+
+    def to_bytes(self) -> bytes:
+        """Двоичное представление (формат версии FORMAT_VERSION): заголовок, массивы в порядке байтов little-endian
+           (каждый выровнен на 8 байт, поэтому при загрузке используется без копирования), таблица строк
+           (смещения и текст в UTF-8) и таблицы типов и идентификаторов в JSON. Вместо текста программы
+           сохраняются строка и столбец каждого узла. Не требует pickle и может передаваться между процессами
+        """
+
+        n = len(self.kinds)
+        rows, cols = array('i', bytes(4 * n)), array('i', bytes(4 * n))
+        for handle in range(n):
+            row_col = self.row_col(handle)
+            if row_col is not None:
+                rows[handle], cols[handle] = row_col
+        strings = [s.encode('utf-8') for s in self.strings]
+        string_offsets = array('I', [0])
+        for s in strings:
+            string_offsets.append(string_offsets[-1] + len(s))
+        # типы идентификаторов попадают в таблицу типов до ее записи
+        ident_type_ids = [self._type_id(ident.type) for ident in self.idents]
+        tables = json.dumps({
+            'types': [str(type_) for type_ in self.types],
+            'idents': [(ident.name, type_id, ident.scope.value, ident.index, ident.built_in)
+                       for ident, type_id in zip(self.idents, ident_type_ids)],
+        }, ensure_ascii=False).encode('utf-8')
+
+        sections = [getattr(self, name) for name in _ARRAYS] + [rows, cols, string_offsets]
+        parts = [_HEADER.pack(_MAGIC, FORMAT_VERSION, n, len(strings), string_offsets[-1], len(tables))]
+        size = _HEADER.size
+        for section in sections + [b''.join(strings), tables]:
+            parts.append(bytes(-size % 8))
+            size += -size % 8
+            if isinstance(section, array):
+                if sys.byteorder != 'little':
+                    section = array(section.typecode, section)
+                    section.byteswap()
+                section = section.tobytes()
+            elif isinstance(section, memoryview):
+                # массивы загруженного дерева
+                section = section.tobytes()
+            parts.append(section)
+            size += len(section)
+        return b''.join(parts)
+
+    @staticmethod
+    def from_bytes(data: Union[bytes, bytearray, memoryview, mmap.mmap]) -> 'FlatAst':
+        """Дерево поверх двоичного представления to_bytes: массивы - представления (memoryview) данных
+           без копирования, строки, типы и идентификаторы декодируются при первом обращении
+        :param data: данные (например, mmap файла); должны оставаться доступными, пока используется дерево
+        :return: дерево (только для чтения)
+        """
+
+        data = memoryview(data)
+        if len(data) < _HEADER.size or bytes(data[:len(_MAGIC)]) != _MAGIC:
+            raise ValueError('Данные не являются сериализованным AST-деревом')
+        magic, version, n, n_strings, strings_size, tables_size = _HEADER.unpack_from(data)
+        if version != FORMAT_VERSION:
+            raise ValueError('Неподдерживаемая версия формата AST-дерева: {} (ожидалась {})'.format(version, FORMAT_VERSION))
+
+        offset = _HEADER.size
+
+        def section(typecode: str, count: int) -> Union[memoryview, array]:
+            nonlocal offset
+            offset += -offset % 8
+            itemsize = array(typecode).itemsize
+            view = data[offset:offset + count * itemsize]
+            offset += count * itemsize
+            if len(view) != count * itemsize:
+                raise ValueError('Сериализованное AST-дерево обрезано')
+            if sys.byteorder != 'little':
+                arr = array(typecode, view)
+                arr.byteswap()
+                return arr
+            return view.cast(typecode)
+
+        flat = FlatAst()
+        for name in _ARRAYS:
+            setattr(flat, name, section(getattr(flat, name).typecode, n))
+        flat.rows = section('i', n)
+        flat.cols = section('i', n)
+        string_offsets = section('I', n_strings + 1)
+        flat.strings = _StringTable(string_offsets, section('B', strings_size))
+        flat._tables = section('B', tables_size)
+        return flat
+
+    def _load_tables(self) -> None:
+        tables = json.loads(bytes(self._tables).decode('utf-8'))
+        self._tables = None
+        for str_decl in tables['types']:
+            self._type_id(_type_from_str(str_decl))
+        for name, type_id, scope, index, built_in in tables['idents']:
+            ident = IdentDesc(name, self._types[type_id], ScopeType(scope), index)
+            ident.built_in = built_in
+            self._ident_id(ident)
+
+
+class _StringTable:
+    """Таблица строк сериализованного дерева: строка декодируется из UTF-8 при первом обращении
+    """
+
+    def __init__(self, offsets: Union[memoryview, array], data: memoryview) -> None:
+        self.offsets = offsets
+        self.data = data
+        self.cache: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        s = self.cache.get(index)
+        if s is None:
+            if not 0 <= index < len(self.offsets) - 1:
+                raise IndexError('Индекс строки {} за пределами таблицы'.format(index))
+            s = self.cache[index] = bytes(self.data[self.offsets[index]:self.offsets[index + 1]]).decode('utf-8')
+        return s
+
+
+def save(tree: Union[AstNode, FlatAst], path: str) -> None:
+    """Сохранение AST-дерева в файл (запись во временный файл и переименование, чтобы читатели
+       не видели частично записанный файл)
+    :param tree: корень AST-дерева или дерево в виде массивов
+    :param path: путь к файлу
+    """
+
+    flat = tree if isinstance(tree, FlatAst) else FlatAst.from_ast(tree)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(flat.to_bytes())
+        os.replace(tmp_path, path)
+    finally:
+        with suppress(FileNotFoundError):
+            os.remove(tmp_path)
+
+
+def load(path: str) -> FlatAst:
+    """Загрузка AST-дерева из файла через отображение в память (mmap): читаются только заголовок
+       и те части файла, к которым обращаются; узлы-объекты строятся по требованию (FlatAst.to_ast)
+    :param path: путь к файлу
+    :return: дерево в виде массивов (только для чтения)
+    """
+
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return FlatAst.from_bytes(data)
@@ -0,0 +1,118 @@
+import re
+from array import array
+from enum import IntEnum
+from typing import Iterator, Tuple
+
+
+class TokenKind(IntEnum):
+    """Перечисление видов лексем (значения хранятся в буфере лексем как байты)
+    """
+
+    IDENT = 1
+    KEYWORD = 2
+    NUMBER = 3
+    STRING = 4
+    BOOL = 5
+    OPERATOR = 6
+    PUNCTUATION = 7
+    COMMENT = 8
+
+    def __str__(self):
+        return self.name.lower()
+
+
+KEYWORDS = frozenset(('if', 'else', 'for', 'while', 'do', 'return', 'var', 'val', 'fun',
+                      'and', 'or', 'until', 'downTo', 'step', 'in'))
+
+_WHITESPACE = 'whitespace'
+_UNTERMINATED = 'unterminated'
+_ERROR = 'error'
+
+# альтернативы общего регулярного выражения в порядке приоритета
+_ALTERNATIVES = (
+    (r'/\*(?:[^*]|\*(?!/))*\*/|//(?:\\\n|[^\n])*', TokenKind.COMMENT),
+    (r'[A-Z_a-zªµºÀ-ÖØ-öø-ÿ][0-9A-Z_a-zªµ·ºÀ-ÖØ-öø-ÿ]*', TokenKind.IDENT),
+    (r'\d+\.?\d*(?:[eE][+-]?\d+)?', TokenKind.NUMBER),
+    (r'"(?:\\.|[^"\n\r\\])*"', TokenKind.STRING),
+    (r'/\*|"', _UNTERMINATED),
+    (r'\+=|-=|\*=|/=|%=|>=|<=|==|!=|&&|\|\||\.\.|[-+*/%<>=!]', TokenKind.OPERATOR),
+    (r'[(){}\[\],;:]', TokenKind.PUNCTUATION),
+    (r'[ \t\r\n]+', _WHITESPACE),
+    (r'.', _ERROR),
+)
+_MASTER = re.compile('|'.join('({})'.format(pattern) for pattern, _ in _ALTERNATIVES), re.DOTALL)
+# вид лексемы по номеру группы (m.lastindex)
+_GROUP_KINDS = (None, ) + tuple(kind for _, kind in _ALTERNATIVES)
+
+
+class LexError(Exception):
+    """Класс для ошибок лексического анализа
+    """
+
+    def __init__(self, message: str, prog: str, loc: int) -> None:
+        self.loc = loc
+        self.lineno = prog.count('\n', 0, loc) + 1
+        self.col = loc - prog.rfind('\n', 0, loc)
+        self.msg = message
+        super().__init__('{}  (at char {}), (line:{}, col:{})'.format(message, loc, self.lineno, self.col))
+
+
+class TokenBuffer:
+    """Буфер лексем: параллельные массивы вида, начала и длины (без отдельного объекта на каждую лексему)
+    """
+
+    def __init__(self, prog: str) -> None:
+        self.prog = prog
+        self.kinds = array('B')
+        self.starts = array('q')
+        self.lengths = array('I')
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def kind(self, index: int) -> TokenKind:
+        return TokenKind(self.kinds[index])
+
+    def text(self, index: int) -> str:
+        start = self.starts[index]
+        return self.prog[start:start + self.lengths[index]]
+
+    def __getitem__(self, index: int) -> Tuple[TokenKind, int, int]:
+        return TokenKind(self.kinds[index]), self.starts[index], self.lengths[index]
+
+    def __iter__(self) -> Iterator[Tuple[TokenKind, int, int]]:
+        for kind, start, length in zip(self.kinds, self.starts, self.lengths):
+            yield TokenKind(kind), start, length
+
+
+def tokenize(prog: str, comments: bool = False) -> TokenBuffer:
+    """Лексический анализ программы за один проход общим регулярным выражением
+    :param prog: текст программы
+    :param comments: сохранять ли комментарии (например, для подсветки синтаксиса)
+    :return: буфер лексем
+    """
+
+    tokens = TokenBuffer(prog)
+    kinds, starts, lengths = tokens.kinds, tokens.starts, tokens.lengths
+    ident, keyword, bool_, comment = TokenKind.IDENT, TokenKind.KEYWORD, TokenKind.BOOL, TokenKind.COMMENT
+    for m in _MASTER.finditer(prog):
+        kind = _GROUP_KINDS[m.lastindex]
+        if kind is _WHITESPACE:
+            continue
+        if kind is _UNTERMINATED:
+            raise LexError('Unterminated {}'.format('comment' if m.group() == '/*' else 'string'), prog, m.start())
+        if kind is _ERROR:
+            raise LexError('Unexpected character {!r}'.format(m.group()), prog, m.start())
+        if kind == ident:
+            word = m.group()
+            if word in KEYWORDS:
+                kind = keyword
+            elif word in ('true', 'false'):
+                kind = bool_
+        elif kind == comment and not comments:
+            continue
+        start, end = m.span()
+        kinds.append(kind)
+        starts.append(start)
+        lengths.append(end - start)
+    return tokens
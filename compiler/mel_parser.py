@@ -1,12 +1,23 @@
+import functools
 import inspect
-
-import pyparsing as pp
-from pyparsing import pyparsing_common as ppc
+import threading
+from collections import OrderedDict
+from enum import Enum
+from typing import Optional, Tuple, Dict, Any, Union, Iterator, BinaryIO, TextIO, TYPE_CHECKING
 
 from .mel_ast import *
+from . import mel_rd_parser
+from .mel_rd_parser import StmtDispatchStats
+
+if TYPE_CHECKING:
+    import pyparsing as pp
 
 
-def _make_parser():
+def _make_parser(owner: 'Parser'):
+    # pyparsing импортируется только при построении грамматики: сам импорт заметно увеличивает время запуска
+    import pyparsing as pp
+    from pyparsing import pyparsing_common as ppc
+
     IF = pp.Keyword('if')
     FOR = pp.Keyword('for')
     WHILE = pp.Keyword('while')
@@ -20,7 +31,7 @@ def _make_parser():
     UNTIL, DOWNTO, STEP = pp.Keyword('until'), pp.Keyword('downTo'), pp.Keyword('step').suppress()
     IN = pp.Keyword('in')
     keywords = IF | FOR | WHILE | DO | RETURN | VAR | VAL | FUN | BIT_AND | BIT_OR | UNTIL | DOWNTO | IN
-    SEMI, COMMA, COLON, DOTS = pp.Literal(';').suppress(), pp.Literal(',').suppress(), pp.Literal(':'), pp.Literal('..')
+    SEMI, COMMA, COLON = pp.Literal(';').suppress(), pp.Literal(',').suppress(), pp.Literal(':')
 
     # num = ppc.fnumber.copy().setParseAction(lambda s, loc, tocs: tocs[0])
     num = pp.Regex('[+-]?\\d+\\.?\\d*([eE][+-]?\\d+)?')
@@ -39,18 +50,11 @@ def _make_parser():
     type_ << (ident.copy() + pp.Optional(LANGLE + type_ + RANGLE)).setName('type')
     ASSIGN = pp.Literal('=')
 
-    ADD, SUB = pp.Literal('+'), pp.Literal('-')
     SADD, SSUB = pp.Literal('+='), pp.Literal('-=')
-    MUL, DIV, MOD = pp.Literal('*'), pp.Literal('/'), pp.Literal('%')
     SMUL, SDIV, SMOD = pp.Literal('*='), pp.Literal('/='), pp.Literal('%=')
-    AND = pp.Literal('&&')
-    OR = pp.Literal('||')
-    GE, LE, GT, LT = pp.Literal('>='), pp.Literal('<='), pp.Literal('>'), pp.Literal('<')
-    NEQUALS, EQUALS = pp.Literal('!='), pp.Literal('==')
 
     NE = pp.Literal('!').setName('sin_op')
 
-    add = pp.Forward()
     expr = pp.Forward()
     stmt = pp.Forward()
     stmt_list = pp.Forward()
@@ -63,18 +67,90 @@ def _make_parser():
         LPAR + expr + RPAR
     )
 
-    # обязательно везде pp.Group, иначе приоритет операций не будет работать (см. реализцию set_parse_action_magic);
-    # также можно воспользоваться pp.operatorPrecedence (должно быть проще, но не проверял)
+    class PrecedenceExpr(pp.ParseElementEnhance):
+        """Выражение с бинарными операциями, разбираемое методом "precedence climbing" по таблице
+           BIN_OP_PRIORITY (вместо каскада pp.Group по уровню приоритета на каждую операцию);
+           узлы BinOpNode создаются только там, где операция действительно есть.
+
+           Позиции узлов совпадают с теми, что давал каскад pp.Group: узел получает позицию начала
+           своего левого операнда с пропуском комментариев (но не пробелов), узлы '+' и '-' в правом
+           операнде '..' (until, downTo) - позицию всего выражения с '..'
+        """
+
+        def __init__(self, operand: pp.ParserElement, op: pp.ParserElement, step: pp.ParserElement) -> None:
+            super().__init__(operand)
+            self.op = op
+            self.step = step
+            # как pp.Group: перед выражением пропускаются только комментарии
+            self.skipWhitespace = False
+            self.mayReturnEmpty = False
+            # последняя найденная операция: после разбора правого операнда ее ищут на той же позиции все
+            # уровни рекурсии, которым она не подошла по приоритету
+            self._last_op: Tuple[Optional[str], int, Optional[Tuple[int, BinOp]]] = (None, -1, None)
+
+        def ignore(self, other: pp.ParserElement) -> pp.ParserElement:
+            super().ignore(other)
+            self.op.ignore(other)
+            self.step.ignore(other)
+            return self
+
+        def streamline(self) -> pp.ParserElement:
+            super().streamline()
+            self.op.streamline()
+            self.step.streamline()
+            return self
+
+        def _generateDefaultName(self) -> str:
+            return 'expr'
 
-    mult = pp.Group(group + pp.ZeroOrMore((MUL | DIV | MOD) + group)).setName('bin_op')
-    add << pp.Group(mult + pp.ZeroOrMore((ADD | SUB) + mult)).setName('bin_op')
-    seq = pp.Group(add + pp.Optional((DOTS | UNTIL | DOWNTO) + add + pp.Optional(STEP + expr))).setName('bin_op')
-    compare1 = pp.Group(seq + pp.Optional((GE | LE | GT | LT) + seq)).setName('bin_op')  # GE и LE первыми, т.к. приоритетный выбор
-    compare2 = pp.Group(compare1 + pp.Optional((EQUALS | NEQUALS) + compare1)).setName('bin_op')
-    logical_and = pp.Group(compare2 + pp.ZeroOrMore(AND | BIT_AND + compare2)).setName('bin_op')
-    logical_or = pp.Group(logical_and + pp.ZeroOrMore(OR | BIT_OR + logical_and)).setName('bin_op')
+        def parseImpl(self, instring: str, loc: int, doActions: bool = True) -> Tuple[int, AstNode]:
+            return self.climb(instring, loc, doActions, 1, None)
 
-    expr << (logical_or)
+        def next_op(self, instring: str, loc: int) -> Optional[Tuple[int, BinOp]]:
+            last_instring, last_loc, result = self._last_op
+            if last_instring is not instring or last_loc != loc:
+                try:
+                    op_loc, tokens = self.op._parse(instring, loc, False)
+                    result = op_loc, BinOp(tokens[0])
+                except pp.ParseException:
+                    result = None
+                self._last_op = instring, loc, result
+            return result
+
+        def climb(self, instring: str, loc: int, doActions: bool,
+                  min_priority: int, add_loc: Optional[int]) -> Tuple[int, AstNode]:
+            start = loc
+            # операнды '*', '/' и '%' разбираются без пропуска комментариев перед ними
+            loc, tokens = self.expr._parse(instring, loc, doActions, callPreParse=min_priority > MAX_PRIORITY)
+            node = tokens[0]
+            max_priority = MAX_PRIORITY
+            while True:
+                next_op = self.next_op(instring, loc)
+                if next_op is None:
+                    break
+                op_loc, op = next_op
+                priority, single = BIN_OP_PRIORITY[op]
+                if not min_priority <= priority <= max_priority:
+                    break
+                try:
+                    arg_loc = self.preParse(instring, op_loc) if priority < MAX_PRIORITY else op_loc
+                    op_loc, arg2 = self.climb(instring, arg_loc, doActions, priority + 1,
+                                              start if priority == SEQ_PRIORITY else None)
+                except pp.ParseException:
+                    break
+                loc = op_loc
+                if priority == SEQ_PRIORITY:
+                    with suppress(pp.ParseException):
+                        loc, _ = self.step._parse(instring, loc, doActions)
+                node_loc = add_loc if priority == ADD_PRIORITY and add_loc is not None else start
+                node = BinOpNode(op, node, arg2, loc=node_loc, locations=owner.locations)
+                # более приоритетные операции уже разобраны в arg2, а неассоциативная операция - не повторяется
+                max_priority = priority - 1 if single else priority
+            return loc, node
+
+    # одно регулярное выражение вместо перебора pp.Literal (GE и LE первыми, т.к. приоритетный выбор)
+    BIN_OP = pp.Regex(r'>=|<=|==|!=|&&|\|\||\.\.|[-+*/%<>]') | BIT_AND | BIT_OR | UNTIL | DOWNTO
+    expr << PrecedenceExpr(group, BIN_OP, STEP + expr)
 
     simple_assign = (ident + ASSIGN.suppress() + expr).setName('assign')
     var_ = (VAR | VAL) + ((ident + COLON + type_ + pp.Optional(ASSIGN.suppress() + expr)) |
@@ -95,26 +171,87 @@ def _make_parser():
     params = param + pp.ZeroOrMore(COMMA + param)
     func = FUN.suppress() + ident + LPAR + pp.Optional(params) + RPAR + pp.Optional(COLON.suppress() + type_) + LBRACE + stmt_list + RBRACE
 
-    stmt << (
-            if_ |
-            for_ |
-            do_while |
-            while_ |
-            return_ |
-            simple_stmt + pp.Optional(SEMI) |
-            # обязательно ниже if, for и т.п., иначе считает их за типы данных (сейчас уже не считает - см. грамматику)
-            #             # обязательно выше vars, иначе посчитает за два vars
-            var_ + pp.Optional(SEMI) |
-            composite |
-            func |
-            self_operators
-    )
+    simple_stmt_ = simple_stmt + pp.Optional(SEMI)
+    var_stmt = var_ + pp.Optional(SEMI)
+    stmt_alternatives = pp.MatchFirst([
+        if_,
+        for_,
+        do_while,
+        while_,
+        return_,
+        simple_stmt_,
+        # обязательно ниже if, for и т.п., иначе считает их за типы данных (сейчас уже не считает - см. грамматику)
+        #             # обязательно выше vars, иначе посчитает за два vars
+        var_stmt,
+        composite,
+        func,
+        self_operators
+    ])
+
+    class StmtDispatch(pp.ParseElementEnhance):
+        """Выбор альтернативы инструкции по первой лексеме (ключевое слово или '{') вместо перебора всех
+           альтернатив; перебор остается только для инструкций, начинающихся с идентификатора.
+
+           Остальные альтернативы на этой лексеме заведомо не разбираются, поэтому, если выбранные
+           не разобрались, полный приоритетный выбор не повторяется (перед '}' и концом текста
+           альтернативы не перебираются вовсе)
+        """
+
+        def __init__(self, alternatives: pp.MatchFirst, dispatch: Dict[str, Tuple[pp.ParserElement, ...]],
+                     default: Tuple[pp.ParserElement, ...]) -> None:
+            super().__init__(alternatives)
+            self.dispatch = dispatch
+            self.default = default
+            self.word = pp.Regex('[A-Za-z0-9_$]+')
+
+        def ignore(self, other: pp.ParserElement) -> pp.ParserElement:
+            super().ignore(other)
+            self.word.ignore(other)
+            return self
+
+        def _generateDefaultName(self) -> str:
+            return 'stmt'
+
+        def parseImpl(self, instring: str, loc: int, doActions: bool = True) -> Tuple[int, pp.ParseResults]:
+            start = self.word.preParse(instring, loc)
+            key = instring[start:start + 1]
+            if start == 0 or not self.word.re_match(instring, start - 1):
+                with suppress(pp.ParseException):
+                    key = self.word._parse(instring, start, False, callPreParse=False)[1][0]
+            attempts = 0
+            for alternative in self.dispatch.get(key, self.default):
+                attempts += 1
+                try:
+                    result = alternative._parse(instring, loc, doActions)
+                except pp.ParseException:
+                    continue
+                if owner.stats is not None:
+                    owner.stats.add(attempts)
+                return result
+            if owner.stats is not None:
+                owner.stats.add(attempts, False)
+            raise pp.ParseException(instring, start, self.errmsg, self)
+
+    stmt << StmtDispatch(stmt_alternatives, {
+        'if': (if_, ),
+        'for': (for_, ),
+        'do': (do_while, ),
+        'while': (while_, ),
+        'return': (return_, ),
+        'var': (var_stmt, ),
+        'val': (var_stmt, ),
+        '{': (composite, ),
+        'fun': (func, ),
+        '}': (),
+        '': (),
+    }, (simple_stmt_, self_operators))
 
     stmt_list << (pp.ZeroOrMore(stmt + pp.ZeroOrMore(SEMI)))
 
     program = stmt_list.ignore(pp.cStyleComment).ignore(pp.dblSlashComment) + pp.StringEnd()
 
-    start = program
+    # табуляции не заменяются пробелами, чтобы loc в parse action соответствовал исходному тексту
+    start = program.parseWithTabs()
 
     def set_parse_action_magic(rule_name: str, parser: pp.ParserElement) -> None:
         if rule_name == rule_name.upper():
@@ -130,7 +267,7 @@ def _make_parser():
                     secondNode = tocs[i + 1]
                     if not isinstance(secondNode, AstNode):
                         secondNode = bin_op_parse_action(s, loc, secondNode)
-                    node = BinOpNode(BinOp(tocs[i]), node, secondNode, loc=loc)
+                    node = BinOpNode(BinOp(tocs[i]), node, secondNode, loc=loc, locations=owner.locations)
                 return node
             parser.setParseAction(bin_op_parse_action)
         else:
@@ -141,48 +278,270 @@ def _make_parser():
                     def parse_action(s, loc, tocs):
                         if cls is FuncNode:
                             if isinstance(tocs[-2], TypeNode):
-                                return FuncNode(tocs[-2], tocs[0], tocs[1:-2], tocs[-1], loc=loc)
+                                return FuncNode(tocs[-2], tocs[0], tocs[1:-2], tocs[-1], loc=loc, locations=owner.locations)
                             else:
-                                return FuncNode(None, tocs[0], tocs[1:-1], tocs[-1], loc=loc)
+                                return FuncNode(None, tocs[0], tocs[1:-1], tocs[-1], loc=loc, locations=owner.locations)
+                        elif cls is LiteralNode:
+                            return LiteralNode(tocs[0], owner.constants, loc=loc, locations=owner.locations)
                         else:
-                            return cls(*tocs, loc=loc)
+                            return cls(*tocs, loc=loc, locations=owner.locations)
                     parser.setParseAction(parse_action)
 
     for var_name, value in locals().copy().items():
         if isinstance(value, pp.ParserElement):
             set_parse_action_magic(var_name, value)
 
-    return start
+    # правила, результаты разбора которых мемоизируются в режиме packrat. После выбора инструкции по первой
+    # лексеме и разбора выражений по приоритетам грамматика не разбирает правила повторно с той же позиции
+    # (кроме лексем, мемоизация которых дороже их разбора), поэтому мемоизация разбор не ускоряет;
+    # оставлены альтернативы инструкций, начинающихся с идентификатора, - единственный оставшийся перебор
+    return start, (simple_stmt_, self_operators)
+
 
+class PackratCache:
+    """Ограниченный кэш мемоизации (packrat) результатов разбора с вытеснением
+       давно не использованных записей (LRU) и статистикой попаданий/промахов/вытеснений.
 
-parser = _make_parser()
+       Мемоизация необязательна и по умолчанию выключена: кэш подключается только явно
+       (parse(prog, cache=PackratCache()) или Parser(cache=...)), компилятор его не использует.
+       Причина - на текущей грамматике попаданий почти нет, а ведение кэша (ключи, копии
+       исключений, вытеснение) делает разбор медленнее, чем без него. Кэш нужен для грамматик
+       с глубоким перебором альтернатив и для подсчета попаданий при их изменении
+    """
 
+    def __init__(self, max_size: int = 4096) -> None:
+        if max_size <= 0:
+            raise ValueError('Размер кэша должен быть положительным: {}'.format(max_size))
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
-def parse(prog: str) -> StmtListNode:
-    locs = []
-    row, col = 0, 0
-    for ch in prog:
-        if ch == '\n':
-            row += 1
-            col = 0
-        elif ch == '\r':
-            pass
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key) -> Optional[Any]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
         else:
-            col += 1
-        locs.append((row, col))
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value) -> None:
+        self._entries[key] = value
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Очистка записей (статистика накапливается между вызовами parse)
+        """
+        self._entries.clear()
+
+    def reset(self) -> None:
+        self.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def __str__(self) -> str:
+        return 'hits: {}, misses: {}, evictions: {}, size: {}/{}'.format(
+            self.hits, self.misses, self.evictions, len(self), self.max_size
+        )
+
+
+def _parse_memo(element: 'pp.ParserElement', owner: 'Parser',
+                instring: str, loc: int, do_actions: bool = True, callPreParse: bool = True) -> Tuple[int, 'pp.ParseResults']:
+    # аналог pp.ParserElement._parseCache, но с кэшем, заданным на один вызов parse, а не на весь pyparsing
+    import pyparsing as pp
+
+    cache = owner.cache
+    if cache is None:
+        return element._parseNoCache(instring, loc, do_actions, callPreParse)
+    key = (element, loc, callPreParse, do_actions)
+    value = cache.get(key)
+    if value is None:
+        try:
+            value = element._parseNoCache(instring, loc, do_actions, callPreParse)
+        except pp.ParseBaseException as pe:
+            cache.set(key, pe.__class__(*pe.args))
+            raise
+        cache.set(key, (value[0], value[1].copy()))
+        return value
+    if isinstance(value, Exception):
+        raise value
+    return value[0], value[1].copy()
+
 
-    old_init_action = AstNode.init_action
+class ParserBackend(Enum):
+    """Перечисление реализаций синтаксического анализатора
+    """
 
-    def init_action(node: AstNode) -> None:
-        loc = getattr(node, 'loc', None)
-        if isinstance(loc, int):
-            node.row = locs[loc][0] + 1
-            node.col = locs[loc][1] + 1
+    PYPARSING = 'pyparsing'
+    RECURSIVE_DESCENT = 'rd'
 
-    AstNode.init_action = init_action
+    def __str__(self):
+        return self.value
+
+
+class Parser:
+    """Синтаксический анализатор со своей грамматикой, кэшем мемоизации и индексом позиций.
+
+       Глобального изменяемого состояния нет: parse action грамматики обращаются к индексу позиций
+       своего экземпляра, поэтому разные экземпляры можно использовать одновременно из разных потоков
+       (вызовы parse одного экземпляра выполняются по очереди)
+    """
+
+    def __init__(self, backend: Union[ParserBackend, str] = ParserBackend.PYPARSING,
+                 cache: Optional[PackratCache] = None, stats: Optional[StmtDispatchStats] = None) -> None:
+        """
+        :param backend: реализация синтаксического анализатора (обе строят одинаковые AST-деревья)
+        :param cache: кэш мемоизации (packrat), очищается перед каждым разбором; если не задан,
+                      мемоизация не используется (грамматика строится без нее и кэш потом не подключить)
+        :param stats: счетчики выбора альтернатив инструкций (накапливаются между вызовами parse)
+        """
+
+        self.backend = ParserBackend(backend)
+        if cache is not None and self.backend != ParserBackend.PYPARSING:
+            raise ValueError('Мемоизация поддерживается только для {}'.format(ParserBackend.PYPARSING))
+        self.cache = cache
+        self.stats = stats
+        self.memo = cache is not None
+        self.locations: Optional[SourceLocations] = None
+        self.constants: Optional[ConstantPool] = None
+        self._grammar: Optional['pp.ParserElement'] = None
+        self._lock = threading.Lock()
+
+    @property
+    def grammar(self) -> 'pp.ParserElement':
+        """Грамматика на pyparsing (строится при первом обращении, а не при создании анализатора,
+           т.к. запуски, не доходящие до разбора или использующие рекурсивный парсер, в ней не нуждаются)
+        """
+
+        if self._grammar is None:
+            grammar, rules = _make_parser(self)
+            if self.memo:
+                # кэш берется из анализатора при каждом вызове, поэтому его можно заменить между разборами
+                for rule in rules:
+                    rule._parse = functools.partial(_parse_memo, rule, self)
+            self._grammar = grammar
+        return self._grammar
+
+    def parse(self, prog: str) -> StmtListNode:
+        """Синтаксический разбор программы
+        :param prog: текст программы
+        :return: корень AST-дерева
+        """
+
+        with self._lock:
+            self.locations = SourceLocations(prog)
+            try:
+                if self.backend == ParserBackend.RECURSIVE_DESCENT:
+                    prog: StmtListNode = mel_rd_parser.parse(str(prog), self.locations, self.stats)
+                else:
+                    grammar = self.grammar
+                    if self.cache is not None:
+                        self.cache.clear()
+                    self.constants = ConstantPool()
+                    prog: StmtListNode = grammar.parseString(str(prog))[0]
+                    prog.constants = self.constants
+                prog.program = True
+                return prog
+            finally:
+                self.locations = None
+                self.constants = None
+
+    def reparse(self, prog: StmtListNode, offset: int, removed: int, inserted: str) -> StmtListNode:
+        """Инкрементальный разбор программы после правки текста (рекурсивным парсером независимо от backend,
+           т.к. обе реализации строят одинаковые AST-деревья); переиспользуются инструкции верхнего уровня,
+           не затронутые правкой. Исходное дерево после вызова не используется
+        :param prog: корень AST-дерева, полученный parse или reparse
+        :param offset: позиция правки в тексте исходного дерева
+        :param removed: количество удаленных символов
+        :param inserted: вставленный текст
+        :return: корень AST-дерева для нового текста
+        """
+
+        with self._lock:
+            prog = mel_rd_parser.reparse(prog, offset, removed, inserted, stats=self.stats)
+            prog.program = True
+            return prog
+
+
+_default_parsers = threading.local()
+
+
+def _thread_parser(backend: ParserBackend, memo: bool) -> Parser:
+    parsers = getattr(_default_parsers, 'parsers', None)
+    if parsers is None:
+        parsers = _default_parsers.parsers = {}
+    key = backend, memo
+    if key not in parsers:
+        parsers[key] = Parser(backend, PackratCache() if memo else None)
+        parsers[key].cache = None
+    return parsers[key]
+
+
+def default_parser(backend: Union[ParserBackend, str] = ParserBackend.PYPARSING) -> Parser:
+    """Анализатор без мемоизации, общий для вызовов parse в пределах одного потока
+    :param backend: реализация синтаксического анализатора
+    :return: анализатор текущего потока
+    """
+
+    return _thread_parser(ParserBackend(backend), False)
+
+
+def get_parser() -> 'pp.ParserElement':
+    """Грамматика на pyparsing анализатора текущего потока (для совместимости: разбор через нее напрямую
+       не вычисляет позиции узлов, для разбора используется parse или Parser)
+    :return: стартовое правило грамматики
+    """
+
+    return default_parser().grammar
+
+
+def __getattr__(name: str) -> Any:
+    # mel_parser.parser остается доступен как атрибут модуля
+    if name == 'parser':
+        return get_parser()
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def parse(prog: str, cache: Optional[PackratCache] = None,
+          backend: Union[ParserBackend, str] = ParserBackend.PYPARSING,
+          stats: Optional[StmtDispatchStats] = None) -> StmtListNode:
+    """Синтаксический разбор программы
+    :param prog: текст программы
+    :param cache: кэш мемоизации (packrat) на время разбора; если не задан, мемоизация не используется
+    :param backend: реализация синтаксического анализатора (обе строят одинаковые AST-деревья)
+    :param stats: счетчики выбора альтернатив инструкций
+    :return: корень AST-дерева
+    """
+
+    backend = ParserBackend(backend)
+    if cache is not None and backend != ParserBackend.PYPARSING:
+        raise ValueError('Мемоизация поддерживается только для {}'.format(ParserBackend.PYPARSING))
+    # грамматика строится один раз на поток (отдельно - с мемоизацией), кэш и счетчики подключаются на вызов
+    parser = _thread_parser(backend, cache is not None)
+    parser.cache, parser.stats = cache, stats
     try:
-        prog: StmtListNode = parser.parseString(str(prog))[0]
-        prog.program = True
-        return prog
+        return parser.parse(prog)
     finally:
-        AstNode.init_action = old_init_action
+        parser.cache = parser.stats = None
+
+
+def parse_stream(stream: Union[TextIO, BinaryIO], chunk_size: int = 1 << 16) -> Iterator[StmtNode]:
+    """Потоковый разбор программы из файла или mmap по инструкциям верхнего уровня
+       (рекурсивным парсером, строящим те же узлы, что и parse)
+    :param stream: текстовый или двоичный (UTF-8) файл либо mmap
+    :param chunk_size: размер читаемой порции
+    :return: генератор инструкций верхнего уровня по мере их разбора
+    """
+
+    return mel_rd_parser.parse_stream(stream, chunk_size)
@@ -0,0 +1,727 @@
+import codecs
+import re
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Optional, List, Dict, Iterator, Union, BinaryIO, TextIO, Any
+
+from .mel_ast import *
+
+
+# лексемы (повторяют определения из грамматики в mel_parser, чтобы разбор совпадал до позиции)
+_KEYWORD_CHARS = 'A-Za-z0-9_$'
+_IGNORABLES = re.compile(r'(?:[ \t\r\n]*(?:/\*(?:[^*]|\*(?!/))*\*/|//(?:\\\n|[^\n])*))*')
+_WHITESPACES = re.compile(r'[ \t\r\n]*')
+_NUM = re.compile(r'[+-]?\d+\.?\d*([eE][+-]?\d+)?')
+_STR = re.compile(r'"(?:(?:\\.)|(?:[^"\n\r\\]))*"')
+_BOOL = re.compile(r'true|false')
+_IDENT = re.compile(r'[A-Z_a-zªµºÀ-ÖØ-öø-ÿ][0-9A-Z_a-zªµ·ºÀ-ÖØ-öø-ÿ]*')
+_WORD = re.compile(r'[{0}]+'.format(_KEYWORD_CHARS))
+_BIN_OP = re.compile(r'>=|<=|==|!=|&&|\|\||\.\.|[-+*/%<>]')
+_SELF_OP = re.compile(r'\+=|-=|\*=|/=|%=')
+
+KEYWORDS = frozenset(('if', 'for', 'while', 'do', 'return', 'var', 'val', 'fun', 'and', 'or', 'until', 'downTo', 'in'))
+
+
+_parse_error: Optional[type] = None
+_parse_error_lock = threading.Lock()
+
+
+def _parse_error_class() -> type:
+    # pyparsing импортируется только при первой синтаксической ошибке, чтобы рекурсивный парсер
+    # не увеличивал время запуска
+    global _parse_error
+    with _parse_error_lock:
+        if _parse_error is None:
+            import pyparsing as pp
+
+            class ParseError(pp.ParseException):
+                """Класс для синтаксических ошибок рекурсивного парсера (подкласс pp.ParseException,
+                   чтобы ошибки обеих реализаций перехватывались и выводились одинаково)
+                """
+
+            ParseError.__module__, ParseError.__qualname__ = __name__, 'ParseError'
+            _parse_error = ParseError
+        return _parse_error
+
+
+def __getattr__(name: str) -> Any:
+    if name == 'ParseError':
+        return _parse_error_class()
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+class StmtDispatchStats:
+    """Счетчики выбора альтернатив инструкций по первой лексеме: сколько инструкций разобрано
+       и сколько альтернатив при этом опробовано (распределение - в histogram); неудачные попытки
+       (в т.ч. проверка конца списка инструкций перед '}' и концом текста) считаются отдельно
+    """
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.attempts = 0
+        self.histogram: Dict[int, int] = {}
+        self.failures = 0
+        self.failed_attempts = 0
+
+    @property
+    def attempts_per_statement(self) -> float:
+        return self.attempts / self.statements if self.statements else 0.0
+
+    def add(self, attempts: int, matched: bool = True) -> None:
+        """
+        :param attempts: количество опробованных альтернатив
+        :param matched: разобрана ли инструкция
+        """
+
+        if not matched:
+            self.failures += 1
+            self.failed_attempts += attempts
+            return
+        self.statements += 1
+        self.attempts += attempts
+        self.histogram[attempts] = self.histogram.get(attempts, 0) + 1
+
+    def reset(self) -> None:
+        self.statements = self.attempts = self.failures = self.failed_attempts = 0
+        self.histogram.clear()
+
+    def __str__(self) -> str:
+        return 'statements: {}, attempts: {} ({:.2f} per statement), histogram: {}, ' \
+               'failures: {} ({} attempts)'.format(
+                   self.statements, self.attempts, self.attempts_per_statement, dict(sorted(self.histogram.items())),
+                   self.failures, self.failed_attempts)
+
+
+class _Parser:
+    """Рекурсивный нисходящий парсер (выражения разбираются методом "precedence climbing"),
+       строящий те же узлы AST-дерева, что и грамматика на pyparsing в mel_parser.
+
+       Позиции (loc) узлов вычисляются так же, как их передает pyparsing в parse action:
+       для инструкций, начинающихся с ключевого слова, - начало ключевого слова,
+       для остальных - позиция сразу после предыдущей лексемы (с пропуском комментариев, но не пробелов)
+    """
+
+    def __init__(self, prog: str, locations: Optional[SourceLocations] = None,
+                 stats: Optional[StmtDispatchStats] = None, constants: Optional[ConstantPool] = None) -> None:
+        self.prog = prog
+        self.locations = locations
+        self.stats = stats
+        self.constants = constants if constants is not None else ConstantPool()
+        self.pos = 0
+
+    # ---- лексемы ----
+
+    def skip(self, pos: int) -> int:
+        """Пропуск комментариев (но не пробелов после них), аналог pp.ParserElement._skipIgnorables
+        """
+        return _IGNORABLES.match(self.prog, pos).end()
+
+    def token_start(self, pos: int) -> int:
+        return _WHITESPACES.match(self.prog, self.skip(pos)).end()
+
+    def match(self, regex: re.Pattern) -> Optional[str]:
+        m = regex.match(self.prog, self.token_start(self.pos))
+        if m is None:
+            return None
+        self.pos = m.end()
+        return m.group()
+
+    def literal(self, s: str) -> bool:
+        start = self.token_start(self.pos)
+        if not self.prog.startswith(s, start):
+            return False
+        self.pos = start + len(s)
+        return True
+
+    def keyword(self, kw: str) -> bool:
+        start = self.token_start(self.pos)
+        end = start + len(kw)
+        if not self.prog.startswith(kw, start) or self._is_keyword_char(start - 1) or self._is_keyword_char(end):
+            return False
+        self.pos = end
+        return True
+
+    def _is_keyword_char(self, pos: int) -> bool:
+        return 0 <= pos < len(self.prog) and _WORD.match(self.prog, pos, pos + 1) is not None
+
+    def peek_bin_op(self) -> Optional[BinOp]:
+        start = self.token_start(self.pos)
+        m = _BIN_OP.match(self.prog, start)
+        if m is not None:
+            return BinOp(m.group())
+        m = _WORD.match(self.prog, start)
+        if m is not None and m.group() in ('and', 'or', 'until', 'downTo') and not self._is_keyword_char(start - 1):
+            return BinOp(m.group())
+        return None
+
+    # ---- выражения ----
+
+    def ident(self) -> Optional[IdentNode]:
+        loc = self.skip(self.pos)
+        start = self.token_start(loc)
+        word = _WORD.match(self.prog, start)
+        if word is not None and word.group() in KEYWORDS and not self._is_keyword_char(start - 1):
+            return None
+        m = _IDENT.match(self.prog, start)
+        if m is None:
+            return None
+        self.pos = m.end()
+        return IdentNode(m.group(), loc=loc, locations=self.locations)
+
+    def type_(self) -> Optional[TypeNode]:
+        loc = self.skip(self.pos)
+        ident = self.ident()
+        if ident is None:
+            return None
+        pos = self.pos
+        if self.literal('<'):
+            generic = self.type_()
+            if generic is not None and self.literal('>'):
+                return TypeNode(ident.name, generic, loc=loc, locations=self.locations)
+            self.pos = pos
+        return TypeNode(ident.name, loc=loc, locations=self.locations)
+
+    def call(self) -> Optional[CallNode]:
+        loc = self.skip(self.pos)
+        pos = self.pos
+        func = self.ident()
+        if func is None or not self.literal('('):
+            self.pos = pos
+            return None
+        params = []
+        # в отличие от остальных аргументов, позиция первого считается с начала лексемы
+        self.pos = self.token_start(self.pos)
+        param = self.expr()
+        if param is not None:
+            params.append(param)
+            while True:
+                param_pos = self.pos
+                if not self.literal(','):
+                    break
+                param = self.expr()
+                if param is None:
+                    self.pos = param_pos
+                    break
+                params.append(param)
+        if not self.literal(')'):
+            self.pos = pos
+            return None
+        return CallNode(func, *params, loc=loc, locations=self.locations)
+
+    def group(self) -> Optional[ExprNode]:
+        loc = self.pos
+        for regex in (_NUM, _STR, _BOOL):
+            literal = self.match(regex)
+            if literal is not None:
+                return LiteralNode(literal, self.constants, loc=loc, locations=self.locations)
+        node = self.call()
+        if node is not None:
+            return node
+        node = self.ident()
+        if node is not None:
+            return node
+        pos = self.pos
+        if self.literal('('):
+            node = self.expr()
+            if node is not None and self.literal(')'):
+                return node
+        self.pos = pos
+        return None
+
+    def expr(self, min_priority: int = 1, add_loc: Optional[int] = None) -> Optional[ExprNode]:
+        """Разбор выражения методом "precedence climbing"; узлы BinOpNode создаются только при наличии операции
+        :param min_priority: минимальный приоритет операций, разбираемых на этом уровне
+        :param add_loc: позиция для узлов сложения/вычитания (в грамматике их строит уровень seq, поэтому
+                        в правом операнде '..', until и downTo они получают позицию всего выражения seq)
+        """
+
+        if min_priority <= MAX_PRIORITY:
+            # операнды '*', '/' и '%' в грамматике не обернуты в pp.Group и комментарии перед ними не пропускают
+            self.pos = self.skip(self.pos)
+        loc = self.pos
+        node = self.group()
+        if node is None:
+            return None
+        max_priority = MAX_PRIORITY
+        while True:
+            op = self.peek_bin_op()
+            if op is None:
+                break
+            priority, single = BIN_OP_PRIORITY[op]
+            if not min_priority <= priority <= max_priority:
+                break
+            pos = self.pos
+            self.pos = self.token_start(self.pos) + len(op.value)
+            arg2 = self.expr(priority + 1, loc if priority == SEQ_PRIORITY else None)
+            if arg2 is None:
+                self.pos = pos
+                break
+            if priority == SEQ_PRIORITY:
+                step_pos = self.pos
+                if not self.keyword('step') or self.expr() is None:
+                    self.pos = step_pos
+            node_loc = add_loc if priority == ADD_PRIORITY and add_loc is not None else loc
+            node = BinOpNode(op, node, arg2, loc=node_loc, locations=self.locations)
+            # более приоритетные операции уже разобраны в arg2, а уровень с единственной операцией исчерпан
+            max_priority = priority - 1 if single else priority
+        return node
+
+    # ---- инструкции ----
+
+    def stmt(self) -> Optional[StmtNode]:
+        # альтернативы выбираются по первой лексеме (ключевое слово или '{'), перебор - только для
+        # начинающихся с идентификатора; остальные альтернативы на такой лексеме заведомо не разбираются
+        start = self.token_start(self.pos)
+        word = _WORD.match(self.prog, start)
+        if word is not None and not self._is_keyword_char(start - 1):
+            key = word.group()
+        else:
+            key = self.prog[start:start + 1]
+        node = None
+        attempts = 0
+        for alternative in _STMT_DISPATCH.get(key, _STMT_DEFAULT):
+            attempts += 1
+            pos = self.pos
+            node = alternative(self)
+            if node is not None:
+                break
+            self.pos = pos
+        if self.stats is not None:
+            self.stats.add(attempts, node is not None)
+        return node
+
+    def if_(self) -> Optional[IfNode]:
+        loc = self.token_start(self.pos)
+        if not self.keyword('if') or not self.literal('('):
+            return None
+        cond = self.expr()
+        if cond is None or not self.literal(')'):
+            return None
+        then_stmt = self.stmt()
+        if then_stmt is None:
+            return None
+        pos = self.pos
+        if self.keyword('else'):
+            else_stmt = self.stmt()
+            if else_stmt is not None:
+                return IfNode(cond, then_stmt, else_stmt, loc=loc, locations=self.locations)
+        self.pos = pos
+        return IfNode(cond, then_stmt, loc=loc, locations=self.locations)
+
+    def for_(self) -> Optional[ForNode]:
+        loc = self.token_start(self.pos)
+        if not self.keyword('for') or not self.literal('('):
+            return None
+        init = self.ident()
+        if init is None or not self.keyword('in'):
+            return None
+        cond = self.expr()
+        if cond is None or not self.literal(')'):
+            return None
+        body = self.stmt()
+        return ForNode(init, cond, body, loc=loc, locations=self.locations) if body is not None else None
+
+    def do_while(self) -> Optional[DoWhileNode]:
+        loc = self.token_start(self.pos)
+        if not self.keyword('do'):
+            return None
+        body = self.stmt()
+        if body is None or not self.keyword('while') or not self.literal('('):
+            return None
+        cond = self.expr()
+        if cond is None or not self.literal(')'):
+            return None
+        return DoWhileNode(body, cond, loc=loc, locations=self.locations)
+
+    def while_(self) -> Optional[WhileNode]:
+        loc = self.token_start(self.pos)
+        if not self.keyword('while') or not self.literal('('):
+            return None
+        cond = self.expr()
+        if cond is None or not self.literal(')'):
+            return None
+        body = self.stmt()
+        return WhileNode(cond, body, loc=loc, locations=self.locations) if body is not None else None
+
+    def return_(self) -> Optional[ReturnNode]:
+        loc = self.token_start(self.pos)
+        if not self.keyword('return'):
+            return None
+        pos = self.pos
+        val = self.expr()
+        if val is None:
+            self.pos = pos
+            return ReturnNode(loc=loc, locations=self.locations)
+        return ReturnNode(val, loc=loc, locations=self.locations)
+
+    def simple_stmt(self) -> Optional[StmtNode]:
+        loc = self.skip(self.pos)
+        pos = self.pos
+        var = self.ident()
+        if var is not None and self.literal('='):
+            val = self.expr()
+            if val is not None:
+                self.literal(';')
+                return AssignNode(var, val, loc=loc, locations=self.locations)
+        self.pos = pos
+        node = self.call()
+        if node is not None:
+            self.literal(';')
+        return node
+
+    def var_(self) -> Optional[VarNode]:
+        loc = self.token_start(self.pos)
+        if self.keyword('var'):
+            declare = 'var'
+        elif self.keyword('val'):
+            declare = 'val'
+        else:
+            return None
+        pos = self.pos
+        ident = self.ident()
+        if ident is None:
+            return None
+        params = [ident]
+        if self.literal(':'):
+            type_ = self.type_()
+            if type_ is not None:
+                params.extend((':', type_))
+            else:
+                self.pos = pos
+                ident = params[0] = self.ident()
+        val_pos = self.pos
+        if self.literal('='):
+            val = self.expr()
+            if val is not None:
+                params.append(val)
+            else:
+                self.pos = val_pos
+        else:
+            self.pos = val_pos
+        node = VarNode(declare, *params, loc=loc, locations=self.locations)
+        self.literal(';')
+        return node
+
+    def composite(self) -> Optional[StmtListNode]:
+        if not self.literal('{'):
+            return None
+        stmt_list = self.stmt_list()
+        return stmt_list if self.literal('}') else None
+
+    def param(self) -> Optional[ParamNode]:
+        loc = self.skip(self.pos)
+        name = self.ident()
+        if name is None or not self.literal(':'):
+            return None
+        type_ = self.type_()
+        return ParamNode(name, type_, loc=loc, locations=self.locations) if type_ is not None else None
+
+    def func(self) -> Optional[FuncNode]:
+        loc = self.token_start(self.pos)
+        if not self.keyword('fun'):
+            return None
+        name = self.ident()
+        if name is None or not self.literal('('):
+            return None
+        params: List[ParamNode] = []
+        pos = self.pos
+        param = self.param()
+        if param is None:
+            self.pos = pos
+        else:
+            params.append(param)
+            while True:
+                pos = self.pos
+                if not self.literal(','):
+                    break
+                param = self.param()
+                if param is None:
+                    self.pos = pos
+                    break
+                params.append(param)
+        if not self.literal(')'):
+            return None
+        type_ = None
+        pos = self.pos
+        if self.literal(':'):
+            type_ = self.type_()
+            if type_ is None:
+                self.pos = pos
+        if not self.literal('{'):
+            return None
+        body = self.stmt_list()
+        if not self.literal('}'):
+            return None
+        return FuncNode(type_, name, params, body, loc=loc, locations=self.locations)
+
+    def self_operators(self) -> Optional[ExprNode]:
+        loc = self.skip(self.pos)
+        ident = self.ident()
+        if ident is None:
+            return None
+        pos = self.pos
+        op = self.match(_SELF_OP)
+        if op is not None:
+            val = self.expr()
+            if val is not None:
+                return BinOpNode(BinOp(op), ident, val, loc=loc, locations=self.locations)
+        self.pos = pos
+        return ident
+
+    def semis(self) -> None:
+        # как pp.ZeroOrMore(SEMI): если ни одной ';' нет, пробелы и комментарии перед следующей лексемой
+        # считаются разобранными (это влияет на позицию следующей инструкции)
+        semi = False
+        while self.literal(';'):
+            semi = True
+        if not semi:
+            self.pos = self.token_start(self.pos)
+
+    def stmt_list(self, loc: Optional[int] = None) -> StmtListNode:
+        if loc is None:
+            loc = self.skip(self.pos)
+        stmts = []
+        while True:
+            stmt = self.stmt()
+            if stmt is None:
+                break
+            stmts.append(stmt)
+            self.semis()
+        return StmtListNode(*stmts, loc=loc, locations=self.locations)
+
+    def top_level_stmt(self) -> Optional[StmtNode]:
+        """Инструкция верхнего уровня; ее узлы получают собственное представление индекса позиций,
+           которое при инкрементальном разборе сдвигается без обхода узлов
+        """
+
+        locations = self.locations
+        if locations is not None:
+            self.locations = ShiftedLocations(locations)
+        try:
+            stmt = self.stmt()
+        finally:
+            self.locations = locations
+        if stmt is not None:
+            self.semis()
+        return stmt
+
+    def end(self) -> None:
+        # как pp.StringEnd: пропускаются только пробелы
+        end = _WHITESPACES.match(self.prog, self.pos).end()
+        if end < len(self.prog):
+            raise _parse_error_class()(self.prog, end, 'Expected end of text')
+
+    def program(self, stmts: Optional[List[StmtNode]] = None, starts: Optional[array] = None) -> StmtListNode:
+        """Разбор инструкций верхнего уровня до конца текста
+        :param stmts: уже разобранные инструкции (разбор продолжается с текущей позиции)
+        :param starts: позиции начала уже разобранных инструкций
+        :return: корень AST-дерева; в stmt_starts - позиции начала инструкций и позиция после последней
+        """
+
+        stmts = [] if stmts is None else stmts
+        starts = array('q') if starts is None else starts
+        while True:
+            starts.append(self.pos)
+            stmt = self.top_level_stmt()
+            if stmt is None:
+                break
+            stmts.append(stmt)
+        self.end()
+        return self.root(stmts, starts)
+
+    def root(self, stmts: List[StmtNode], starts: array) -> StmtListNode:
+        prog = StmtListNode(*stmts, loc=0, locations=self.locations)
+        prog.stmt_starts = starts
+        prog.constants = self.constants
+        return prog
+
+
+# альтернативы инструкции по первой лексеме (в порядке приоритетного выбора грамматики)
+_STMT_DISPATCH = {
+    'if': (_Parser.if_, ),
+    'for': (_Parser.for_, ),
+    'do': (_Parser.do_while, ),
+    'while': (_Parser.while_, ),
+    'return': (_Parser.return_, ),
+    'var': (_Parser.var_, ),
+    'val': (_Parser.var_, ),
+    '{': (_Parser.composite, ),
+    'fun': (_Parser.func, ),
+    # конец блока и текста: инструкция заведомо не начинается, альтернативы не перебираются
+    '}': (),
+    '': (),
+}
+_STMT_DEFAULT = (_Parser.simple_stmt, _Parser.self_operators)
+
+
+def parse(prog: str, locations: Optional[SourceLocations] = None,
+          stats: Optional[StmtDispatchStats] = None) -> StmtListNode:
+    """Разбор программы рекурсивным парсером
+    :param prog: текст программы
+    :param locations: индекс позиций, по которому узлы вычисляют row/col
+    :param stats: счетчики выбора альтернатив инструкций
+    :return: корень AST-дерева
+    """
+
+    return _Parser(prog, locations, stats).program()
+
+
+def reparse(prog: StmtListNode, offset: int, removed: int, inserted: str,
+            locations: Optional[SourceLocations] = None, stats: Optional[StmtDispatchStats] = None) -> StmtListNode:
+    """Инкрементальный разбор после правки текста: заново разбираются только инструкции верхнего уровня,
+       затронутые правкой (и одна перед ними, т.к. ее разбор мог заглядывать в измененный текст).
+       Разбор продолжается, пока граница очередной инструкции не совпадет с границей в исходном дереве
+       за пределами правки, после чего оставшиеся инструкции переиспользуются со сдвигом позиций.
+
+       Узлы исходного дерева переходят в новое дерево, поэтому исходное дерево после вызова не используется
+    :param prog: корень AST-дерева, полученный разбором (или предыдущим инкрементальным разбором)
+    :param offset: позиция правки в тексте исходного дерева
+    :param removed: количество удаленных символов
+    :param inserted: вставленный текст
+    :param locations: индекс позиций нового текста (по умолчанию строится)
+    :param stats: счетчики выбора альтернатив инструкций
+    :return: корень AST-дерева для нового текста
+    """
+
+    text = prog.locations.prog
+    if offset < 0 or removed < 0 or offset + removed > len(text):
+        raise ValueError('Правка ({}, {}) за пределами текста длины {}'.format(offset, removed, len(text)))
+    new_text = text[:offset] + inserted + text[offset + removed:]
+    if locations is None:
+        locations = SourceLocations(new_text)
+    # переиспользуемые инструкции ссылаются на пул констант исходного дерева
+    parser = _Parser(new_text, locations, stats, getattr(prog, 'constants', None))
+    starts = getattr(prog, 'stmt_starts', None)
+    if starts is None:
+        # дерево построено без границ инструкций (грамматикой на pyparsing)
+        return parser.program()
+
+    stmts = prog.exprs
+    delta = len(inserted) - removed
+    # правка может повлиять на разбор инструкции, в которую попадает символ перед ней, и на предыдущую
+    first = max(bisect_right(starts, offset - 1, 0, len(stmts)) - 2, 0)
+    new_stmts = list(stmts[:first])
+    new_starts = starts[:first]
+    parser.pos = starts[first]
+    i = first
+    while True:
+        # разбор с позиции зависит только от текста, начиная с предыдущего символа
+        while i < len(starts) and starts[i] + delta < parser.pos:
+            i += 1
+        if i < len(starts) and starts[i] + delta == parser.pos and starts[i] > offset + removed:
+            break
+        new_starts.append(parser.pos)
+        stmt = parser.top_level_stmt()
+        if stmt is None:
+            parser.end()
+            return parser.root(new_stmts, new_starts)
+        new_stmts.append(stmt)
+
+    for stmt in new_stmts[:first]:
+        stmt.locations.base = locations
+    for stmt in stmts[i:]:
+        stmt.locations.base = locations
+        stmt.locations.delta += delta
+    new_stmts.extend(stmts[i:])
+    new_starts.extend(start + delta for start in starts[i:])
+    return parser.root(new_stmts, new_starts)
+
+
+# слова, которыми может продолжаться уже разобранная инструкция: else (if), while (do ... while),
+# операции выражений и step; остальные продолжения начинаются не с идентификатора
+_CONTINUATIONS = frozenset(('else', 'while', 'step', 'in', 'and', 'or', 'until', 'downTo'))
+
+
+def _stmt_complete(parser: _Parser) -> bool:
+    """Завершена ли разобранная инструкция верхнего уровня независимо от текста после прочитанного:
+       следующая лексема (идентификатор или '{') прочитана полностью и не может ее продолжить.
+       Тогда при разборе инструкции (включая неудавшиеся альтернативы) текст дальше этой лексемы
+       не просматривался, и дочитанный текст не изменит ни инструкцию, ни ее границу
+    :param parser: парсер сразу после инструкции
+    """
+
+    prog = parser.prog
+    start = parser.token_start(parser.pos)
+    if not prog.startswith('{', start):
+        if _IDENT.match(prog, start) is None:
+            return False
+        word = _WORD.match(prog, start)
+        if word is not None and (word.end() >= len(prog) or word.group() in _CONTINUATIONS):
+            return False
+    return True
+
+
+def parse_stream(stream: Union[TextIO, BinaryIO], chunk_size: int = 1 << 16,
+                 encoding: str = 'utf-8') -> Iterator[StmtNode]:
+    """Потоковый разбор: инструкции верхнего уровня возвращаются по мере чтения текста порциями,
+       поэтому в памяти держится только текст, еще не разобранный в завершенные инструкции.
+
+       Инструкция считается завершенной, когда за ней прочитана лексема, которая не может ее продолжить
+       (см. _stmt_complete). Незавершенный текст разбирается заново, только когда его объем удвоится,
+       поэтому общее время разбора линейно. Позиции узлов (loc) отсчитываются от начала порции текста,
+       строка и столбец - от начала всего текста
+    :param stream: текстовый или двоичный файл либо mmap (все, у чего есть read)
+    :param chunk_size: размер читаемой порции
+    :param encoding: кодировка двоичных данных
+    :return: генератор инструкций верхнего уровня
+    """
+
+    if chunk_size <= 0:
+        raise ValueError('Размер порции должен быть положительным: {}'.format(chunk_size))
+    decoder = None
+    buffer = ''
+    # строка и столбец начала буфера в тексте
+    line_offset = col_offset = 0
+    pos = 0
+    # объем неразобранного текста, при котором имеет смысл повторить разбор
+    retry = 0
+    eof = False
+    # общий пул констант для всех инструкций потока
+    constants = ConstantPool()
+    while not eof:
+        chunk = stream.read(chunk_size)
+        if isinstance(chunk, (bytes, bytearray)):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            eof = not chunk
+            chunk = decoder.decode(chunk, final=eof)
+        else:
+            eof = not chunk
+        buffer += chunk
+        if not eof and len(buffer) - pos < retry:
+            continue
+
+        parser = _Parser(buffer, SourceLocations(buffer, line_offset, col_offset), constants=constants)
+        parser.pos = pos
+        stmts = []
+        while True:
+            try:
+                stmt = parser.top_level_stmt()
+            except Exception:
+                # узлы могут не строиться по оборванному на середине тексту (например, VarNode без типа)
+                if eof:
+                    raise
+                break
+            if stmt is None:
+                break
+            if not eof and not _stmt_complete(parser):
+                # эта и следующие инструкции могут измениться, когда текст будет дочитан
+                break
+            stmts.append(stmt)
+            pos = parser.pos
+        if eof:
+            parser.end()
+        yield from stmts
+        retry = 2 * (len(buffer) - pos)
+        if not stmts:
+            continue
+        # разобранный текст отбрасывается до конца последней завершенной инструкции (в том числе
+        # посередине строки), его строки и столбцы переносятся в смещения начала буфера
+        line_start = buffer.rfind('\n', 0, pos) + 1
+        if line_start:
+            line_offset += buffer.count('\n', 0, line_start)
+            col_offset = 0
+        col_offset += pos - line_start - buffer.count('\r', line_start, pos)
+        buffer = buffer[pos:]
+        pos = 0
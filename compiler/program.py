@@ -1,22 +1,147 @@
-import os
+import sys
+from typing import Optional, TextIO, Union
 
 from . import mel_parser
 from . import semantic
+from .compile_cache import CompileCache, ProgramCache, default_cache
+from .mel_ast import SideTable
+from .mel_flat_ast import FlatAst
 
 
-def execute(prog: str) -> None:
-    prog = mel_parser.parse(prog)
+class Compiler:
+    """Сеанс компиляции: владеет своим синтаксическим анализатором (с грамматикой и индексом позиций),
+       глобальной областью видимости со встроенными объектами и потоком вывода.
 
-    print('ast:')
-    print(*prog.tree, sep=os.linesep)
-    print()
+       Общего изменяемого состояния у сеансов нет, поэтому разные сеансы можно выполнять
+       одновременно в разных потоках
+    """
 
-    print('semantic_check:')
-    try:
-        scope = semantic.prepare_global_scope()
-        prog.semantic_check(scope)
-        print(*prog.tree, sep=os.linesep)
-    except semantic.SemanticException as e:
-        print('Ошибка: {}'.format(e.message))
-        return
-    print()
+    def __init__(self, backend: Union[mel_parser.ParserBackend, str] = mel_parser.ParserBackend.PYPARSING,
+                 out: Optional[TextIO] = None, parser: Optional[mel_parser.Parser] = None,
+                 quiet: bool = False, cache: Optional[CompileCache] = None,
+                 programs: Optional[ProgramCache] = None, max_errors: Optional[int] = 1) -> None:
+        """
+        :param backend: реализация синтаксического анализатора
+        :param out: поток вывода (по умолчанию - текущий sys.stdout)
+        :param parser: синтаксический анализатор (по умолчанию создается собственный для backend)
+        :param quiet: не выводить AST-деревья (выводятся только ошибки)
+        :param cache: кэш результатов компиляции (по умолчанию не используется)
+        :param programs: кэш скомпилированных программ в памяти (если задан, используется вместо cache)
+        :param max_errors: сколько ошибок семантического анализа выводить (None - все); при значении,
+                           отличном от 1, анализ продолжается после ошибок, а кэши не используются
+        """
+
+        self.parser = parser or mel_parser.Parser(backend)
+        self.out = out
+        self.quiet = quiet
+        self.cache = cache
+        self.programs = programs
+        self.max_errors = max_errors
+
+    def print(self, *values, **kwargs) -> None:
+        print(*values, file=self.out if self.out is not None else sys.stdout, **kwargs)
+
+    def print_tree(self, node: Union[mel_parser.AstNode, FlatAst], table: Optional[SideTable] = None) -> None:
+        out = self.out if self.out is not None else sys.stdout
+        if table is not None:
+            table.write_tree(node, out)
+        else:
+            node.write_tree(out)
+
+    def parse(self, prog: str) -> mel_parser.StmtListNode:
+        return self.parser.parse(prog)
+
+    def prepare_global_scope(self) -> semantic.IdentScope:
+        return semantic.prepare_global_scope(self.parser)
+
+    def execute(self, prog: str) -> None:
+        if self.max_errors != 1:
+            self._execute_collecting(prog)
+            return
+
+        if self.programs is not None:
+            program = self.programs.compile(prog, self.parser)
+            self._report(program.tree, program.tree, program.error, program.table)
+            return
+
+        entry = self.cache.get(prog) if self.cache is not None else None
+        if entry is not None:
+            self._report(entry.parsed, entry.checked, entry.error)
+            return
+
+        source, prog = prog, self.parse(prog)
+        # дерево разбора для кэша сохраняется до семантического анализа, который изменяет узлы
+        parsed = FlatAst.from_ast(prog) if self.cache is not None else prog
+        if not self.quiet:
+            self.print('ast:')
+            self.print_tree(prog)
+            self.print()
+            self.print('semantic_check:')
+        try:
+            scope = self.prepare_global_scope()
+            prog.semantic_check(scope)
+        except semantic.SemanticException as e:
+            if self.cache is not None:
+                self.cache.put(source, parsed, error=e.message)
+            self.print('Ошибка: {}'.format(e.message))
+            return
+        if self.cache is not None:
+            self.cache.put(source, parsed, prog)
+        if not self.quiet:
+            self.print_tree(prog)
+            self.print()
+
+    def _execute_collecting(self, prog: str) -> None:
+        """Компиляция с выводом всех ошибок семантического анализа (в пределах max_errors)
+        """
+
+        prog = self.parse(prog)
+        if not self.quiet:
+            self.print('ast:')
+            self.print_tree(prog)
+            self.print()
+            self.print('semantic_check:')
+        diagnostics = semantic.Diagnostics(self.max_errors)
+        try:
+            prog.semantic_check(self.prepare_global_scope(), diagnostics=diagnostics)
+        finally:
+            # собранные ошибки выводятся и при непредвиденном исключении (оно передается вызывающему)
+            for error in diagnostics:
+                self.print('Ошибка: {}'.format(error.message))
+        if diagnostics.truncated:
+            self.print('Анализ прекращен: более {} ошибок'.format(self.max_errors))
+        if not diagnostics.errors and not self.quiet:
+            self.print_tree(prog)
+            self.print()
+
+    def _report(self, parsed: Union[mel_parser.AstNode, FlatAst], checked: Union[mel_parser.AstNode, FlatAst, None],
+                error: Optional[str], table: Optional[SideTable] = None) -> None:
+        """Вывод сохраненного в кэше результата (так же, как при компиляции)
+        :param table: результаты семантического анализа для checked (если дерево не изменялось при анализе)
+        """
+
+        if not self.quiet:
+            self.print('ast:')
+            self.print_tree(parsed)
+            self.print()
+            self.print('semantic_check:')
+        if error is not None:
+            self.print('Ошибка: {}'.format(error))
+            return
+        if not self.quiet:
+            self.print_tree(checked, table)
+            self.print()
+
+
+def execute(prog: str, quiet: bool = False, cache: Optional[CompileCache] = None,
+            max_errors: Optional[int] = 1) -> None:
+    """Разбор, семантический анализ и вывод AST-дерева программы
+    :param prog: текст программы
+    :param quiet: не выводить AST-деревья (выводятся только ошибки)
+    :param max_errors: сколько ошибок семантического анализа выводить (None - все)
+    :param cache: кэш результатов компиляции (по умолчанию - кэш в каталоге из переменной окружения
+                  MEL_CACHE_DIR, если она задана)
+    """
+
+    Compiler(parser=mel_parser.default_parser(), quiet=quiet,
+             cache=cache if cache is not None else default_cache(), max_errors=max_errors).execute(prog)
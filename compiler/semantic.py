@@ -1,4 +1,6 @@
-from typing import Tuple, Any, Dict, Optional
+import threading
+from types import MappingProxyType
+from typing import Tuple, Any, Dict, List, Optional, Iterable, Iterator, Mapping, Union
 from enum import Enum
 
 
@@ -53,32 +55,69 @@ class BaseType(Enum):
     DOUBLE = 'Double'
     BOOL = 'Boolean'
     STR = 'String'
+    # тип выражения, при проверке которого обнаружена ошибка (при анализе с несколькими ошибками:
+    # операции над таким выражением не проверяются, чтобы не выдавать производные ошибки)
+    ERROR = '<error>'
 
     def __str__(self):
         return self.value
 
 
 VOID, INT, FLOAT, BOOL, STR = BaseType.VOID, BaseType.INT, BaseType.FLOAT, BaseType.BOOL, BaseType.STR
+LONG, DOUBLE = BaseType.LONG, BaseType.DOUBLE
 
 
 class TypeDesc:
     """Класс для описания типа данных.
 
        Сейчас поддерживаются только примитивные типы данных и функции.
-       При поддержки сложных типов (массивы и т.п.) должен быть рассширен
+       При поддержки сложных типов (массивы и т.п.) должен быть рассширен.
+
+       Описания типов неизменяемы и интернируются: конструктор для одинаковых аргументов возвращает
+       один и тот же объект, поэтому типы сравниваются по ссылке (==, is) за O(1) и могут быть
+       ключами словарей и элементами множеств. Ключ интернирования составлен из уже интернированных
+       частей (тип результата, типы параметров), поэтому его вычисление не рекурсивно; параметры
+       обобщенных типов (например, Array<Int>) при их появлении должны войти в этот ключ
     """
 
+    __slots__ = ('base_type', 'return_type', 'params')
+
     VOID: 'TypeDesc'
     INT: 'TypeDesc'
     FLOAT: 'TypeDesc'
     BOOL: 'TypeDesc'
     STR: 'TypeDesc'
-
-    def __init__(self, base_type_: Optional[BaseType] = None,
-                 return_type: Optional['TypeDesc'] = None, params: Optional[Tuple['TypeDesc']] = None) -> None:
-        self.base_type = base_type_
-        self.return_type = return_type
-        self.params = params
+    ERROR: 'TypeDesc'
+
+    # все созданные типы по ключу (базовый тип, тип результата, типы параметров)
+    _interned: Dict[Tuple[Any, ...], 'TypeDesc'] = {}
+
+    def __new__(cls, base_type_: Optional[BaseType] = None,
+                return_type: Optional['TypeDesc'] = None, params: Optional[Tuple['TypeDesc']] = None) -> 'TypeDesc':
+        if params is not None:
+            params = tuple(params)
+        key = (base_type_, return_type, params)
+        type_ = cls._interned.get(key)
+        if type_ is None:
+            type_ = object.__new__(cls)
+            object.__setattr__(type_, 'base_type', base_type_)
+            object.__setattr__(type_, 'return_type', return_type)
+            object.__setattr__(type_, 'params', params)
+            # при одновременном создании в нескольких потоках остается один объект
+            type_ = cls._interned.setdefault(key, type_)
+        return type_
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('Описание типа {} неизменяемо'.format(self))
+
+    def __copy__(self) -> 'TypeDesc':
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> 'TypeDesc':
+        return self
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return TypeDesc, (self.base_type, self.return_type, self.params)
 
     @property
     def func(self) -> bool:
@@ -88,21 +127,6 @@ class TypeDesc:
     def is_simple(self) -> bool:
         return not self.func
 
-    def __eq__(self, other: 'TypeDesc'):
-        if self.func != other.func:
-            return False
-        if not self.func:
-            return self.base_type == other.base_type
-        else:
-            if self.return_type != other.return_type:
-                return False
-            if len(self.params) != len(other.params):
-                return False
-            for i in range(len(self.params)):
-                if self.params[i] != other.params[i]:
-                    return False
-            return True
-
     @staticmethod
     def from_base_type(base_type_: BaseType) -> 'TypeDesc':
         return getattr(TypeDesc, base_type_.name)
@@ -147,9 +171,14 @@ class ScopeType(Enum):
 
 
 class IdentDesc:
-    """Класс для описания переменых
+    """Класс для описания переменых.
+
+       Описания встроенных объектов (built_in) разделяются всеми программами и потоками,
+       поэтому после пометки built_in их поля не изменяются (присваивание - AttributeError)
     """
 
+    __slots__ = ('name', 'type', 'scope', 'index', 'built_in')
+
     def __init__(self, name: str, type_: TypeDesc, scope: ScopeType = ScopeType.GLOBAL, index: int = 0) -> None:
         self.name = name
         self.type = type_
@@ -157,20 +186,131 @@ class IdentDesc:
         self.index = index
         self.built_in = False
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        if getattr(self, 'built_in', False):
+            raise AttributeError('Описание встроенного объекта {} неизменяемо'.format(self.name))
+        object.__setattr__(self, name, value)
+
     def __str__(self) -> str:
         return '{}, {}, {}'.format(self.type, self.scope, 'built-in' if self.built_in else self.index)
 
 
+class SymbolTable:
+    """Общая для всех областей видимости одного дерева таблица имен: для каждого имени - стек привязок
+       (глубина области, описание идентификатора), поэтому поиск не зависит от глубины вложенности.
+
+       Активные области (цепочка от глобальной до текущей) хранятся в стеке frames. При переходе
+       к области вне этой цепочки (например, к следующей ветке if) привязки вышедших областей снимаются
+       (журналом отмены служат словари idents этих областей), и области цепочки новой области
+       (если были сняты) восстанавливаются. В стеке привязок имени они упорядочены по глубине области
+    """
+
+    __slots__ = ('bindings', 'frames')
+
+    def __init__(self) -> None:
+        self.bindings: Dict[str, List[Tuple[int, IdentDesc]]] = {}
+        self.frames: List['IdentScope'] = []
+
+    def activate(self, scope: 'IdentScope') -> None:
+        """Переход к области видимости: после него цепочка активных областей до глубины области - ее предки
+        :param scope: область видимости
+        """
+
+        frames = self.frames
+        depth = scope.depth
+        if depth < len(frames) and frames[depth] is scope:
+            return
+        # области цепочки, которых нет среди активных (без рекурсии - вложенность не ограничена)
+        chain = []
+        while scope is not None and not (scope.depth < len(frames) and frames[scope.depth] is scope):
+            chain.append(scope)
+            scope = scope.parent
+        self._leave(chain[-1].depth)
+        bindings = self.bindings
+        for scope in reversed(chain):
+            frames.append(scope)
+            for name, ident in scope.idents.items():
+                stack = bindings.get(name)
+                if stack is None:
+                    bindings[name] = [(scope.depth, ident)]
+                else:
+                    stack.append((scope.depth, ident))
+
+    def _leave(self, depth: int) -> None:
+        frames, bindings = self.frames, self.bindings
+        while len(frames) > depth:
+            scope = frames.pop()
+            for name in scope.idents:
+                stack = bindings[name]
+                if stack[-1][0] == scope.depth:
+                    stack.pop()
+                    if not stack:
+                        del bindings[name]
+
+    def bind(self, scope: 'IdentScope', ident: IdentDesc) -> None:
+        """Привязка идентификатора в активной области (в том числе не последней в цепочке)
+        """
+
+        depth = scope.depth
+        stack = self.bindings.get(ident.name)
+        if stack is None:
+            self.bindings[ident.name] = [(depth, ident)]
+            return
+        i = len(stack)
+        while i > 0 and stack[i - 1][0] > depth:
+            i -= 1
+        if i > 0 and stack[i - 1][0] == depth:
+            stack[i - 1] = (depth, ident)
+        else:
+            stack.insert(i, (depth, ident))
+
+    def lookup(self, scope: 'IdentScope', name: str) -> Optional[IdentDesc]:
+        """Ближайшее описание идентификатора, видимое из активной области
+        """
+
+        stack = self.bindings.get(name)
+        if stack is None:
+            return None
+        depth = scope.depth
+        # привязки более глубоких областей (вложенных в scope) пропускаются
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i][0] <= depth:
+                return stack[i][1]
+        return None
+
+
 class IdentScope:
-    """Класс для представлений областей видимости переменных во время семантического анализа
+    """Класс для представлений областей видимости переменных во время семантического анализа.
+
+       Области одного дерева разделяют таблицу имен (SymbolTable), ссылки на глобальную область
+       и область функции сохраняются при создании, поэтому поиск идентификатора, curr_global
+       и curr_func выполняются за O(1) независимо от вложенности
     """
 
-    def __init__(self, parent: Optional['IdentScope'] = None) -> None:
+    def __init__(self, parent: Optional['IdentScope'] = None, builtins: Optional['BuiltinScope'] = None) -> None:
+        """
+        :param parent: внешняя область видимости (None - глобальная)
+        :param builtins: встроенные объекты, видимые из глобальной области (не изменяются: объявления
+                         программы добавляются в саму глобальную область поверх них)
+        """
+
         self.idents: Dict[str, IdentDesc] = {}
+        # задается сразу после создания области функции (до создания вложенных областей)
         self.func: Optional[IdentDesc] = None
         self.parent = parent
         self.var_index = 0
         self.param_index = 0
+        if parent is None:
+            self.depth = 0
+            self.symbols = SymbolTable()
+            self._global = self
+            self._outer_func = None
+            self.builtins = builtins
+        else:
+            self.depth = parent.depth + 1
+            self.symbols = parent.symbols
+            self._global = parent._global
+            self._outer_func = parent.curr_func
 
     @property
     def is_global(self) -> bool:
@@ -178,21 +318,15 @@ class IdentScope:
 
     @property
     def curr_global(self) -> 'IdentScope':
-        curr = self
-        while curr.parent:
-            curr = curr.parent
-        return curr
+        return self._global
 
     @property
     def curr_func(self) -> Optional['IdentScope']:
-        curr = self
-        while curr and not curr.func:
-            curr = curr.parent
-        return curr
+        return self if self.func else self._outer_func
 
     def add_ident(self, ident: IdentDesc) -> IdentDesc:
         func_scope = self.curr_func
-        global_scope = self.curr_global
+        global_scope = self._global
 
         if ident.scope != ScopeType.PARAM:
             ident.scope = ScopeType.LOCAL if func_scope else \
@@ -222,19 +356,103 @@ class IdentScope:
                 ident_scope.var_index += 1
 
         self.idents[ident.name] = ident
+        self.symbols.bind(self, ident)
         return ident
 
     def get_ident(self, name: str) -> Optional[IdentDesc]:
-        scope = self
-        ident = None
-        while scope:
-            ident = scope.idents.get(name)
-            if ident:
-                break
-            scope = scope.parent
+        self.symbols.activate(self)
+        ident = self.symbols.lookup(self, name)
+        if ident is None and self._global.builtins is not None:
+            ident = self._global.builtins.get(name)
         return ident
 
 
+class BuiltinScope:
+    """Неизменяемый набор встроенных объектов: строится один раз и разделяется всеми программами
+       (и потоками); глобальная область программы ссылается на него и не копирует (IdentScope(builtins=...)).
+       Встроенные объекты описываются либо текстом на языке (from_source), либо непосредственно
+       (builtin_func, builtin_var) без синтаксического анализа
+    """
+
+    __slots__ = ('_idents',)
+
+    def __init__(self, idents: Iterable[IdentDesc] = ()) -> None:
+        """
+        :param idents: описания встроенных объектов (в том числе builtin_func, builtin_var)
+        """
+
+        own: Dict[str, IdentDesc] = {}
+        for ident in idents:
+            if ident.name in own:
+                raise SemanticException('Встроенный объект {} уже объявлен'.format(ident.name))
+            if not ident.built_in:
+                # описание становится неизменяемым (в том числе при передаче в несколько наборов)
+                ident.built_in = True
+            own[ident.name] = ident
+        self._idents: Mapping[str, IdentDesc] = MappingProxyType(own)
+
+    def get(self, name: str) -> Optional[IdentDesc]:
+        return self._idents.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._idents
+
+    def __iter__(self) -> Iterator[IdentDesc]:
+        return iter(self._idents.values())
+
+    def __len__(self) -> int:
+        return len(self._idents)
+
+    def extend(self, *idents: IdentDesc) -> 'BuiltinScope':
+        """Новый набор: встроенные объекты этого набора и idents (этот набор не изменяется)
+        """
+
+        return BuiltinScope((*self._idents.values(), *idents))
+
+    @staticmethod
+    def from_source(src: str, parser: Optional['Parser'] = None) -> 'BuiltinScope':
+        """Встроенные объекты, описанные текстом на языке (объявления функций и переменных)
+        :param src: текст описаний
+        :param parser: синтаксический анализатор (по умолчанию - анализатор текущего потока)
+        """
+
+        from .mel_parser import default_parser
+
+        prog = (parser or default_parser()).parse(src)
+        scope = IdentScope()
+        prog.semantic_check(scope)
+        return BuiltinScope(scope.idents.values())
+
+
+def _type(type_: Union[TypeDesc, BaseType, str]) -> TypeDesc:
+    if isinstance(type_, TypeDesc):
+        return type_
+    if isinstance(type_, BaseType):
+        return TypeDesc.from_base_type(type_)
+    return TypeDesc.from_str(type_)
+
+
+def builtin_func(name: str, return_type: Union[TypeDesc, BaseType, str] = VOID,
+                 *params: Union[TypeDesc, BaseType, str]) -> IdentDesc:
+    """Описание встроенной функции (как при разборе fun name(p0: params[0], ...): return_type)
+    :param name: имя функции
+    :param return_type: тип результата (TypeDesc, BaseType или имя типа)
+    :param params: типы параметров
+    """
+
+    return IdentDesc(name, TypeDesc(None, _type(return_type), tuple(_type(param) for param in params)))
+
+
+def builtin_var(name: str, type_: Union[TypeDesc, BaseType, str], index: int = 0) -> IdentDesc:
+    """Описание встроенной переменной
+    :param name: имя переменной
+    :param type_: тип (TypeDesc, BaseType или имя типа)
+    :param index: индекс переменной
+    """
+
+    return IdentDesc(name, _type(type_), ScopeType.GLOBAL, index)
+
+
 class SemanticException(Exception):
     """Класс для исключений во время семантического анализа
     """
@@ -250,8 +468,49 @@ class SemanticException(Exception):
                 message += 'позиция: {}'.format(col)
             message += ")"
         self.message = message
+        self.row = row
+        self.col = col
 
 
+class ErrorBudgetExceeded(Exception):
+    """Исключение, прекращающее анализ при превышении допустимого числа ошибок (Diagnostics.max_errors)
+    """
+
+
+class Diagnostics:
+    """Сборщик ошибок семантического анализа: при анализе с ним (semantic_check(..., diagnostics=...))
+       ошибка не прерывает анализ, а записывается; узел с ошибкой получает тип TypeDesc.ERROR,
+       и ошибки, следующие из нее (операции над этим узлом), не выдаются
+    """
+
+    def __init__(self, max_errors: Optional[int] = 100) -> None:
+        """
+        :param max_errors: после скольких ошибок анализ прекращается (None - без ограничения)
+        """
+
+        self.max_errors = max_errors
+        self.errors: List[SemanticException] = []
+        # анализ прекращен из-за числа ошибок (найдены не все ошибки)
+        self.truncated = False
+
+    def report(self, error: SemanticException) -> None:
+        if self.max_errors is not None and len(self.errors) >= self.max_errors:
+            self.truncated = True
+            raise ErrorBudgetExceeded()
+        self.errors.append(error)
+
+    def __len__(self) -> int:
+        return len(self.errors)
+
+    def __iter__(self) -> Iterator[SemanticException]:
+        return iter(self.errors)
+
+    @property
+    def messages(self) -> List[str]:
+        return [error.message for error in self.errors]
+
+
+# неявные преобразования типов (в порядке, в котором они пробуются для аргументов бинарных операций)
 TYPE_CONVERTIBILITY = {
     INT: (FLOAT, BOOL, STR),
     FLOAT: (STR,),
@@ -268,62 +527,86 @@ def can_type_convert_to(from_type: TypeDesc, to_type: TypeDesc) -> bool:
 BIN_OP_TYPE_COMPATIBILITY = {
     BinOp.ADD: {
         (INT, INT): INT,
+        (LONG, LONG): LONG,
         (FLOAT, FLOAT): FLOAT,
+        (DOUBLE, DOUBLE): DOUBLE,
         (STR, STR): STR
     },
     BinOp.SUB: {
         (INT, INT): INT,
-        (FLOAT, FLOAT): FLOAT
+        (LONG, LONG): LONG,
+        (FLOAT, FLOAT): FLOAT,
+        (DOUBLE, DOUBLE): DOUBLE
     },
     BinOp.MUL: {
         (INT, INT): INT,
-        (FLOAT, FLOAT): FLOAT
+        (LONG, LONG): LONG,
+        (FLOAT, FLOAT): FLOAT,
+        (DOUBLE, DOUBLE): DOUBLE
     },
     BinOp.DIV: {
         (INT, INT): INT,
-        (FLOAT, FLOAT): FLOAT
+        (LONG, LONG): LONG,
+        (FLOAT, FLOAT): FLOAT,
+        (DOUBLE, DOUBLE): DOUBLE
     },
     BinOp.MOD: {
         (INT, INT): INT,
-        (FLOAT, FLOAT): FLOAT
+        (LONG, LONG): LONG,
+        (FLOAT, FLOAT): FLOAT,
+        (DOUBLE, DOUBLE): DOUBLE
     },
 
     BinOp.GT: {
         (INT, INT): BOOL,
+        (LONG, LONG): BOOL,
         (FLOAT, FLOAT): BOOL,
+        (DOUBLE, DOUBLE): BOOL,
         (STR, STR): BOOL,
     },
     BinOp.LT: {
         (INT, INT): BOOL,
+        (LONG, LONG): BOOL,
         (FLOAT, FLOAT): BOOL,
+        (DOUBLE, DOUBLE): BOOL,
         (STR, STR): BOOL,
     },
     BinOp.GE: {
         (INT, INT): BOOL,
+        (LONG, LONG): BOOL,
         (FLOAT, FLOAT): BOOL,
+        (DOUBLE, DOUBLE): BOOL,
         (STR, STR): BOOL,
     },
     BinOp.LE: {
         (INT, INT): BOOL,
+        (LONG, LONG): BOOL,
         (FLOAT, FLOAT): BOOL,
+        (DOUBLE, DOUBLE): BOOL,
         (STR, STR): BOOL,
     },
     BinOp.EQUALS: {
         (INT, INT): BOOL,
+        (LONG, LONG): BOOL,
         (FLOAT, FLOAT): BOOL,
+        (DOUBLE, DOUBLE): BOOL,
         (STR, STR): BOOL,
     },
     BinOp.NEQUALS: {
         (INT, INT): BOOL,
+        (LONG, LONG): BOOL,
         (FLOAT, FLOAT): BOOL,
+        (DOUBLE, DOUBLE): BOOL,
         (STR, STR): BOOL,
     },
 
     BinOp.BIT_AND: {
-        (INT, INT): INT
+        (INT, INT): INT,
+        (LONG, LONG): LONG
     },
     BinOp.BIT_OR: {
-        (INT, INT): INT
+        (INT, INT): INT,
+        (LONG, LONG): LONG
     },
 
     BinOp.LOGICAL_AND: {
@@ -335,6 +618,44 @@ BIN_OP_TYPE_COMPATIBILITY = {
 }
 
 
+class BinOpResolution:
+    """Разрешение бинарной операции для пары типов аргументов: тип результата и типы, к которым
+       неявно преобразуются аргументы (None - без преобразования); result = None - операция не применима
+    """
+
+    __slots__ = ('result', 'arg1_type', 'arg2_type')
+
+    def __init__(self, result: Optional[TypeDesc], arg1_type: Optional[TypeDesc] = None,
+                 arg2_type: Optional[TypeDesc] = None) -> None:
+        self.result = result
+        self.arg1_type = arg1_type
+        self.arg2_type = arg2_type
+
+
+def _resolve_bin_op(op: BinOp, arg1: BaseType, arg2: BaseType) -> BinOpResolution:
+    # сначала операция без преобразований, затем с преобразованием второго аргумента, затем первого
+    compatibility = BIN_OP_TYPE_COMPATIBILITY.get(op, {})
+    if (arg1, arg2) in compatibility:
+        return BinOpResolution(TypeDesc.from_base_type(compatibility[arg1, arg2]))
+    for arg2_type in TYPE_CONVERTIBILITY.get(arg2, ()):
+        if (arg1, arg2_type) in compatibility:
+            return BinOpResolution(TypeDesc.from_base_type(compatibility[arg1, arg2_type]),
+                                   arg2_type=TypeDesc.from_base_type(arg2_type))
+    for arg1_type in TYPE_CONVERTIBILITY.get(arg1, ()):
+        if (arg1_type, arg2) in compatibility:
+            return BinOpResolution(TypeDesc.from_base_type(compatibility[arg1_type, arg2]),
+                                   arg1_type=TypeDesc.from_base_type(arg1_type))
+    return BinOpResolution(None)
+
+
+# разрешение всех бинарных операций для всех пар простых типов: (операция, тип, тип) -> BinOpResolution
+# (типы интернированы, поэтому ключ - сами описания типов; для функциональных типов записей нет)
+BIN_OP_RESOLUTION: Dict[Tuple[BinOp, TypeDesc, TypeDesc], BinOpResolution] = {
+    (op, TypeDesc.from_base_type(arg1), TypeDesc.from_base_type(arg2)): _resolve_bin_op(op, arg1, arg2)
+    for op in BinOp for arg1 in BaseType for arg2 in BaseType
+}
+
+
 BUILT_IN_OBJECTS = '''
     fun readLine(): String { }
     fun print(p0: String) { }
@@ -342,13 +663,30 @@ BUILT_IN_OBJECTS = '''
 '''
 
 
-def prepare_global_scope() -> IdentScope:
-    from .mel_parser import parse
+_builtins: Optional[BuiltinScope] = None
+_builtins_lock = threading.Lock()
+
+
+def default_builtins(parser: Optional['Parser'] = None) -> BuiltinScope:
+    """Встроенные объекты BUILT_IN_OBJECTS (разбираются один раз на процесс)
+    :param parser: синтаксический анализатор для разбора описаний (используется только при первом вызове)
+    """
+
+    global _builtins
+
+    if _builtins is None:
+        with _builtins_lock:
+            if _builtins is None:
+                _builtins = BuiltinScope.from_source(BUILT_IN_OBJECTS, parser)
+    return _builtins
+
+
+def prepare_global_scope(parser: Optional['Parser'] = None, builtins: Optional[BuiltinScope] = None) -> IdentScope:
+    """Глобальная область видимости со встроенными объектами (встроенные объекты не копируются)
+    :param parser: синтаксический анализатор для разбора описаний встроенных объектов
+                   (по умолчанию - анализатор текущего потока; нужен только при первом вызове)
+    :param builtins: встроенные объекты (по умолчанию - default_builtins())
+    :return: новая область видимости
+    """
 
-    prog = parse(BUILT_IN_OBJECTS)
-    scope = IdentScope()
-    prog.semantic_check(scope)
-    for name, ident in scope.idents.items():
-        ident.built_in = True
-    scope.var_index = 0
-    return scope
+    return IdentScope(builtins=builtins if builtins is not None else default_builtins(parser))
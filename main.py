@@ -1,7 +1,45 @@
+import argparse
+import os
+import sys
+
 from compiler import program
+from compiler import mel_parser
+from compiler.compile_cache import CompileCache, CACHE_DIR_ENV, DEFAULT_MAX_SIZE
+
+
+def non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError('ожидается неотрицательное число: {}'.format(value))
+    return number
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError('ожидается положительное число: {}'.format(value))
+    return number
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Разбор и семантический анализ программ')
+    parser.add_argument('files', nargs='*', help='файлы программ (по умолчанию - встроенный пример)')
+    parser.add_argument('--backend', choices=[b.value for b in mel_parser.ParserBackend],
+                        default=mel_parser.ParserBackend.PYPARSING.value, help='синтаксический анализатор')
+    parser.add_argument('-q', '--quiet', action='store_true', help='не выводить AST-деревья')
+    parser.add_argument('--cache-dir', default=os.environ.get(CACHE_DIR_ENV) or None,
+                        help='каталог кэша результатов компиляции (по умолчанию - из переменной окружения {}; '
+                             'если каталог не задан, кэш не используется)'.format(CACHE_DIR_ENV))
+    parser.add_argument('--cache-size', type=positive_int, default=DEFAULT_MAX_SIZE,
+                        help='максимальный размер кэша в байтах')
+    parser.add_argument('--no-cache', action='store_true', help='не использовать кэш')
+    parser.add_argument('--max-errors', type=non_negative_int, default=1,
+                        help='сколько ошибок семантического анализа выводить (0 - все; кроме 1 - без кэша)')
+    return parser.parse_args()
 
 
 def main() -> None:
+    args = parse_args()
     prog1 = '''
         fun sample1() {
             println("Hello!")
@@ -45,7 +83,18 @@ def main() -> None:
 
         var funRet = sample(b, c)
     '''
-    program.execute(prog1)
+    progs = []
+    for file in args.files:
+        with open(file, encoding='utf-8') as f:
+            progs.append(f.read())
+
+    cache = CompileCache(args.cache_dir, args.cache_size) if args.cache_dir and not args.no_cache else None
+    compiler = program.Compiler(parser=mel_parser.default_parser(args.backend), quiet=args.quiet, cache=cache,
+                                max_errors=args.max_errors or None)
+    for prog in progs or [prog1]:
+        compiler.execute(prog)
+    if cache is not None:
+        print('cache: {}'.format(cache.stats), file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+"""Программы для тестов: примеры из main.py и случайные программы, покрывающие грамматику
+"""
+
+import random
+from typing import List, Tuple, Any
+
+from compiler.mel_ast import AstNode, walk
+
+
+PROGRAMS = {
+    'functions': '''
+        fun sample1() {
+            println("Hello!")
+        }
+        fun pow(num: Int, p: Int) : Int {
+            var t = num
+            for(num in p) {
+                num = num * t
+            }
+            return num
+        }
+        fun main() {
+            sample1()
+            val res = pow(1, 2)
+        }
+    ''',
+    'redeclaration': '''
+        var a : Int = 10
+        var a : String = "A"
+    ''',
+    'return_type': '''
+        fun sample() : Double {
+            return "AA"
+        }
+    ''',
+    'undeclared': '''
+            a = 4
+        ''',
+    'mixed': '''
+        val a: Int = 3
+        var b = 3
+        var c = 3
+        for(a in 3) {
+            var v = 3.2
+        }
+
+        fun sample(a: Int, b: Float) : Float {
+            var g = 3
+            return 43
+        }
+
+        var funRet = sample(b, c)
+    ''',
+    'statements': '''
+        /* comment */
+        var x = 1 + 2 * 3 - 4 / 2 % 5   // tail
+        var y: Float = 1.5e3
+        var s = "a\\"b" + "c"
+        var f = true
+        if (x > 2 && x < 10) { x = x + 1 } else { x = 0 }
+        if (x >= 2 || f) x = 3
+        while (x != 0) { x = x - 1 }
+        do { x = x + 1 } while (x == 3)
+        var r = x..10 step 2
+        var q = 1 until 10
+        var z = 10 downTo 1
+        var cmp = 1 + 2 > 3 - 1
+        var w = (1 + 2) * 3
+        fun foo(a: Int, b: String): String { return b + a }
+        var k = foo(1, "x");;
+        x += 1
+        x
+        var arr: Array<Int>
+        var t = -3 + 4
+    ''',
+}
+
+_IDENTS = ('a', 'b', 'x', 'foo', 'else', 'step', 'iff', 'trueish', 'in2', 'for_')
+_LITERALS = ('1', '42', '-3', '+7', '3.14', '1e5', '2.', '"s"', '"a\\"b"', 'true', 'false', '0')
+_BIN_OPS = ('+', '-', '*', '/', '%', '<', '>', '<=', '>=', '==', '!=', '&&', '||', 'and', 'or', '..', 'until', 'downTo')
+_SPACES = ('', ' ', ' ', '  ', '\n', '\t', ' /* c */ ', '// x\n', '\r\n', '\n  /* a\n b */\n')
+
+
+class ProgramGenerator:
+    """Генератор случайных программ (в т.ч. с комментариями и переводами строк в произвольных местах)
+    """
+
+    def __init__(self, seed: int, noise: bool = True) -> None:
+        self.r = random.Random(seed)
+        self.noise = noise
+
+    def w(self) -> str:
+        return self.r.choice(_SPACES) if self.noise else ' '
+
+    def ident(self) -> str:
+        return self.r.choice(_IDENTS)
+
+    def expr(self, depth: int = 0) -> str:
+        r, w = self.r, self.w
+        k = r.randrange(10 if depth < 4 else 3)
+        if k == 0:
+            return r.choice(_LITERALS)
+        if k == 1:
+            return self.ident()
+        if k == 2:
+            return self.ident() + w() + '(' + ', '.join(self.expr(depth + 1) for _ in range(r.randrange(3))) + ')'
+        if k == 3:
+            return '(' + w() + self.expr(depth + 1) + w() + ')'
+        op = r.choice(_BIN_OPS)
+        s = self.expr(depth + 1) + w() + op + w() + self.expr(depth + 1)
+        if op in ('..', 'until', 'downTo') and r.random() < 0.3:
+            s += ' step ' + self.expr(depth + 1)
+        return s
+
+    def type_(self, depth: int = 0) -> str:
+        t = self.r.choice(('Int', 'Float', 'String', 'Boolean', 'Double'))
+        if depth < 2 and self.r.random() < 0.2:
+            t = 'Array' + self.w() + '<' + self.type_(depth + 1) + '>'
+        return t
+
+    def stmt(self, depth: int = 0) -> str:
+        r, w = self.r, self.w
+        k = r.randrange(12 if depth < 3 else 7)
+        if k == 0:
+            return self.ident() + w() + '=' + w() + self.expr() + r.choice(('', ';'))
+        if k == 1:
+            return self.ident() + w() + '(' + ', '.join(self.expr() for _ in range(r.randrange(3))) + ')'
+        if k == 2:
+            s = r.choice(('var', 'val')) + ' ' + self.ident()
+            if r.random() < 0.5:
+                s += w() + ':' + w() + self.type_()
+                if r.random() < 0.5:
+                    s += w() + '=' + w() + self.expr()
+            else:
+                s += w() + '=' + w() + self.expr()
+            return s
+        if k == 3:
+            return 'return' + (' ' + self.expr() if r.random() < 0.7 else '')
+        if k == 4:
+            return self.ident() + w() + r.choice(('+=', '-=', '*=', '/=', '%=')) + w() + self.expr()
+        if k == 5:
+            return self.ident()
+        if k == 6:
+            return ';'
+        if k == 7:
+            s = 'if' + w() + '(' + self.expr() + ')' + w() + self.stmt(depth + 1)
+            return s + (w() + 'else ' + self.stmt(depth + 1) if r.random() < 0.5 else '')
+        if k == 8:
+            return 'for' + w() + '(' + self.ident() + ' in ' + self.expr() + ')' + w() + self.stmt(depth + 1)
+        if k == 9:
+            return 'while' + w() + '(' + self.expr() + ')' + w() + self.stmt(depth + 1)
+        if k == 10:
+            return 'do ' + self.stmt(depth + 1) + w() + ' while' + w() + '(' + self.expr() + ')'
+        if r.random() < 0.5:
+            return '{' + w() + self.stmts(depth + 1) + w() + '}'
+        params = ', '.join(self.ident() + w() + ':' + w() + self.type_() for _ in range(r.randrange(3)))
+        ret = w() + ':' + w() + self.type_() if r.random() < 0.5 else ''
+        return 'fun ' + self.ident() + w() + '(' + params + ')' + ret + w() + '{' + self.stmts(depth + 1) + '}'
+
+    def stmts(self, depth: int = 0, count: int = 0) -> str:
+        count = count or self.r.randrange(4)
+        return ''.join(self.w() + self.stmt(depth) + self.w() + '\n' for _ in range(count))
+
+
+def random_program(seed: int, count: int = 0, noise: bool = True, errors: bool = False) -> str:
+    """Случайная программа
+    :param seed: начальное значение генератора случайных чисел
+    :param count: количество инструкций верхнего уровня (0 - случайное, до 3)
+    :param noise: пробелы, переводы строк и комментарии в случайных местах
+    :param errors: с вероятностью 1/3 вставить в текст лишний символ (обычно - синтаксическая ошибка)
+    """
+
+    gen = ProgramGenerator(seed, noise)
+    prog = gen.stmts(count=count)
+    if errors and gen.r.random() < 1 / 3:
+        i = gen.r.randrange(len(prog) + 1)
+        prog = prog[:i] + gen.r.choice(('(', ')', '{', '}', ',', ':', '=', '$', '"', '/*')) + prog[i:]
+    return prog
+
+
+def signature(node: AstNode) -> Tuple[Tuple[str, ...], List[Tuple[Any, ...]]]:
+    """Описание AST-дерева для сравнения: строки дерева и узлы в порядке обхода с позициями
+    :param node: корень AST-дерева
+    """
+
+    return node.tree, [(type(n).__name__, str(n), n.row, n.col) for n in walk(node)]
@@ -0,0 +1,129 @@
+"""Компактность узлов AST-дерева: узлы не имеют __dict__, объем памяти на узел меньше, чем у узлов
+   с теми же полями в __dict__ (с выводом байт на узел и времени создания узла); кортежи дочерних
+   узлов строятся один раз и сбрасываются при присваивании полей
+"""
+
+import gc
+import time
+import tracemalloc
+from typing import Callable, List
+
+import pytest
+
+from compiler import mel_ast, mel_parser, semantic
+from compiler.mel_ast import AstNode, BinOp, BinOpNode, IdentNode, walk
+
+from samples import PROGRAMS
+
+NODES = 20000
+
+
+class DictNode:
+    """Узел с полями в __dict__ (размещение узлов до перехода на __slots__)
+    """
+
+    def __init__(self, node: AstNode) -> None:
+        for cls in type(node).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                setattr(self, name, getattr(node, name))
+
+
+def build(count: int) -> List[AstNode]:
+    """Узлы выражения a0 + a1 + ... (count узлов IdentNode и BinOpNode)
+    :param count: количество узлов
+    """
+
+    nodes: List[AstNode] = [IdentNode('a0', row=1, col=1)]
+    expr = nodes[0]
+    for i in range(1, count // 2 + 1):
+        ident = IdentNode('a{}'.format(i), row=1, col=i)
+        expr = BinOpNode(BinOp.ADD, expr, ident, row=1, col=i)
+        nodes += (ident, expr)
+    return nodes[:count]
+
+
+def retained_memory(create: Callable[[], object]) -> int:
+    """Объем памяти (байт), занятой результатом create после его завершения
+    :param create: функция, создающая объекты
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = create()
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+        del result
+
+
+def test_nodes_have_no_dict():
+    node = BinOpNode(BinOp.ADD, IdentNode('a'), IdentNode('b'))
+    assert all(not hasattr(n, '__dict__') for n in walk(node))
+    with pytest.raises(AttributeError):
+        node.extra = 1
+
+
+def test_extra_data_in_attrs():
+    node = IdentNode('a', info=1)
+    assert node.get_attr('info') == 1
+    assert IdentNode('b').attrs is None
+    node.set_attr('kind', 'local')
+    assert node.get_attr('kind') == 'local'
+    assert node.get_attr('missing', 0) == 0
+
+
+def test_bytes_per_node():
+    # в обоих замерах - те же имена и список узлов, различается только размещение полей узлов
+    slotted = retained_memory(lambda: build(NODES))
+    with_dict = retained_memory(lambda: [DictNode(node) for node in build(NODES)])
+    start = time.perf_counter()
+    build(NODES)
+    elapsed = time.perf_counter() - start
+    print('\n{} nodes: {} bytes per node with __slots__, {} bytes per node with __dict__, {:.2f} us per node'.format(
+        NODES, slotted // NODES, with_dict // NODES, elapsed / NODES * 1e6))
+    assert slotted < with_dict * 0.8
+
+
+def node_classes(cls=AstNode) -> List[type]:
+    return [c for sub in cls.__subclasses__() for c in (sub, *node_classes(sub))]
+
+
+def test_fixed_child_fields_declared():
+    # у узлов с дочерними узлами в отдельных полях кортеж childs сохраняется (не строится при каждом обращении)
+    for cls in node_classes():
+        if 'childs' in cls.__dict__ and cls not in (mel_ast._GroupNode, mel_ast.StmtListNode, mel_ast.VarsNode):
+            assert '_childs_cache' in cls.__slots__ and cls._CHILD_FIELDS, cls.__name__
+
+
+@pytest.mark.parametrize('name', list(PROGRAMS))
+def test_childs_cached(name):
+    tree = mel_parser.parse(PROGRAMS[name])
+    try:
+        tree.semantic_check(semantic.prepare_global_scope())
+    except semantic.SemanticException:
+        pass
+    first = {id(node): node.childs for node in walk(tree)}
+    # повторный обход не строит ни кортежей, ни вспомогательных узлов групп
+    assert all(node.childs is first[id(node)] for node in walk(tree))
+
+
+def test_field_assignment_resets_childs():
+    a, b, c = IdentNode('a'), IdentNode('b'), IdentNode('c')
+    node = BinOpNode(BinOp.ADD, a, b)
+    assert node.childs == (a, b) and node.childs is node.childs
+    node.arg2 = c
+    assert node.childs == (a, c)
+
+    func = mel_parser.parse('fun f(x: Int) { }').childs[0]
+    group = func.childs[0]
+    assert func.childs[0] is group
+    func.name = IdentNode('g')
+    assert func.childs[0] is not group and func.childs[0].childs[0].name == 'g'
+
+    # аргумент, замененный преобразованием типа при семантическом анализе
+    tree = mel_parser.parse('fun f(x: Float) { }\nf(1)')
+    call = tree.childs[1]
+    assert type(call.childs[1]) is mel_ast.LiteralNode
+    tree.semantic_check(semantic.prepare_global_scope())
+    assert type(call.childs[1]) is mel_ast.TypeConvertNode
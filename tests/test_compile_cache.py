@@ -0,0 +1,98 @@
+"""Кэш результатов компиляции на диске: используется только при явно заданном каталоге,
+   каталог просматривается только при превышении ограничения размера, отображения файлов
+   записей закрываются после чтения
+"""
+
+import mmap
+import os
+import subprocess
+import sys
+
+import pytest
+
+from compiler import compile_cache, mel_parser
+from compiler.compile_cache import CompileCache, CACHE_DIR_ENV
+from samples import PROGRAMS, signature
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_main(env: dict, *args: str) -> str:
+    env = {k: v for k, v in os.environ.items() if k != CACHE_DIR_ENV} | env
+    return subprocess.run([sys.executable, 'main.py', '-q', *args], cwd=ROOT, env=env, check=True,
+                          capture_output=True, text=True).stderr
+
+
+def files(directory) -> list:
+    return [os.path.join(d, f) for d, _, names in os.walk(directory) for f in names]
+
+
+def test_cache_is_opt_in(tmp_path):
+    home = tmp_path / 'home'
+    home.mkdir()
+    stderr = run_main({'HOME': str(home), 'XDG_CACHE_HOME': str(home / '.cache')})
+    assert 'cache:' not in stderr
+    assert not files(home)
+
+    cache_dir = tmp_path / 'cache'
+    assert 'stores: 1' in run_main({'HOME': str(home), CACHE_DIR_ENV: str(cache_dir)})
+    assert 'hits: 1' in run_main({'HOME': str(home)}, '--cache-dir', str(cache_dir))
+    assert len(files(cache_dir)) == 1
+
+
+def test_eviction_scans_only_over_limit(tmp_path, monkeypatch):
+    progs = ['var a{} = {}'.format(i, i) for i in range(100)]
+    entry_size = len(CompileCache._encode(mel_parser.parse(progs[0]), mel_parser.parse(progs[0]), None))
+    cache = CompileCache(str(tmp_path), max_size=entry_size * 20)
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, '_entries', lambda: scans.append(1) or entries())
+    for prog in progs:
+        tree = mel_parser.parse(prog)
+        cache.put(prog, tree, tree)
+    sizes = sum(os.path.getsize(f) for f in files(tmp_path))
+    assert sizes <= cache.max_size
+    assert cache.stats.evictions >= len(progs) - 20
+    # первый просмотр каталога и по одному при превышении ограничения (после вытеснения с запасом),
+    # а не при каждой записи
+    assert len(scans) <= len(progs) // 4
+
+
+def test_get_closes_mapping(tmp_path, monkeypatch):
+    mappings = []
+
+    class TrackedMmap(mmap.mmap):
+        def __init__(self, *args, **kwargs) -> None:
+            mappings.append(self)
+
+    monkeypatch.setattr(compile_cache.mmap, 'mmap', TrackedMmap)
+    cache = CompileCache(str(tmp_path))
+    prog = PROGRAMS['functions']
+    tree = mel_parser.parse(prog)
+    cache.put(prog, tree, tree)
+    entry = cache.get(prog)
+    assert len(mappings) == 1 and mappings[0].closed
+    # записи не ссылаются на закрытое отображение
+    assert signature(entry.parsed.to_ast()) == signature(entry.checked.to_ast()) == signature(tree)
+
+    # поврежденная запись - промах, отображение также закрывается
+    path, = files(tmp_path)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 1)
+    assert cache.get(prog) is None
+    assert len(mappings) == 2 and mappings[1].closed
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+@pytest.mark.parametrize('value', ['0', '-1', 'x'])
+def test_invalid_cache_size(value, tmp_path):
+    result = subprocess.run([sys.executable, 'main.py', '--cache-dir', str(tmp_path), '--cache-size', value],
+                            cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 2
+    assert '--cache-size' in result.stderr
+    assert not files(tmp_path)
+
+
+def test_non_positive_max_size(tmp_path):
+    with pytest.raises(ValueError):
+        CompileCache(str(tmp_path), max_size=0)
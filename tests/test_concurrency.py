@@ -0,0 +1,42 @@
+"""Одновременная компиляция в пуле потоков дает тот же вывод, что и последовательная
+"""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from compiler import mel_parser
+from compiler.compile_cache import ProgramCache
+from compiler.program import Compiler
+from samples import PROGRAMS, random_program
+
+SOURCES = list(PROGRAMS.values()) + [random_program(seed, count=3) for seed in range(20)]
+REPEATS = 4
+WORKERS = 16
+
+
+def compile_program(prog: str, backend: mel_parser.ParserBackend, max_errors=1,
+                    programs: ProgramCache = None) -> str:
+    out = io.StringIO()
+    # анализатор потока: грамматика строится один раз на поток, а не на каждую компиляцию
+    compiler = Compiler(out=out, parser=mel_parser.default_parser(backend), max_errors=max_errors,
+                        programs=programs)
+    try:
+        compiler.execute(prog)
+    except Exception as e:
+        out.write('{}: {}'.format(type(e).__name__, e))
+    return out.getvalue()
+
+
+@pytest.mark.parametrize('max_errors, shared_cache', [(1, False), (None, False), (1, True)],
+                         ids=['first-error', 'all-errors', 'program-cache'])
+def test_concurrent_compilation(max_errors, shared_cache):
+    jobs = [(prog, backend) for prog in SOURCES for backend in mel_parser.ParserBackend] * REPEATS
+    expected = [compile_program(prog, backend, max_errors) for prog, backend in jobs]
+    programs = ProgramCache() if shared_cache else None
+    with ThreadPoolExecutor(WORKERS) as executor:
+        actual = list(executor.map(lambda job: compile_program(*job, max_errors, programs), jobs))
+    assert actual == expected
+    if shared_cache:
+        assert programs.stats.hits > 0
@@ -0,0 +1,74 @@
+"""Значения литералов и пул констант: каждое значение хранится один раз, литералы, созданные
+   без пула программы, не создают собственных пулов
+"""
+
+import math
+
+import pytest
+
+from compiler import mel_parser, semantic
+from compiler.mel_ast import EMPTY_STMT, ConstantPool, ForNode, IdentNode, LiteralNode, StmtListNode, \
+    decode_literal, walk
+
+
+@pytest.mark.parametrize('literal, value', [
+    ('true', True),
+    ('false', False),
+    ('0', 0),
+    ('42', 42),
+    ('3.14', 3.14),
+    ('2.', 2.0),
+    ('1e5', 1e5),
+    ('"s"', 's'),
+    ('""', ''),
+    ('"a\\"b"', 'a"b'),
+    ('"\\t\\n\\$\\u0041"', '\t\n$A'),
+    ('"\\q"', '\\q'),
+])
+def test_decode_literal(literal, value):
+    decoded = decode_literal(literal)
+    assert decoded == value and type(decoded) is type(value)
+
+
+@pytest.mark.parametrize('literal', ['"abc', '"'])
+def test_decode_invalid_string(literal):
+    with pytest.raises(ValueError):
+        decode_literal(literal)
+
+
+def test_pool_stores_values_once():
+    pool = ConstantPool()
+    indexes = [pool.add(literal) for literal in ('1', '01', '1', '1.0', 'true', '"1"', '0.0', '-0.0', 'false')]
+    # 1 и 01 - одно значение; 1, 1.0, true и "1" - разные, как и 0.0 и -0.0
+    assert indexes[0] == indexes[1] == indexes[2]
+    assert len(set(indexes)) == 7 == len(pool)
+    assert pool[indexes[4]] is True and pool[indexes[8]] is False
+    assert math.copysign(1, pool[indexes[7]]) == -1
+
+
+def test_program_pool():
+    tree = mel_parser.parse('var a = 1\nvar b = 1\nvar c = "x" + "x"')
+    literals = [node for node in walk(tree) if isinstance(node, LiteralNode)]
+    assert all(node.constants is tree.constants for node in literals)
+    assert len(tree.constants) == 2
+
+
+def for_without_cond() -> ForNode:
+    prog = StmtListNode(mel_parser.parse('var i = true').childs[0],
+                        ForNode(IdentNode('i'), EMPTY_STMT, StmtListNode()))
+    prog.program = True
+    prog.semantic_check(semantic.prepare_global_scope())
+    return prog.childs[1]
+
+
+def test_literal_without_pool():
+    first, second = LiteralNode('true'), LiteralNode('true')
+    assert first.constants is second.constants
+    assert first.index == second.index and first.value is True
+    # условие цикла for без условия подставляется при анализе литералом без пула программы
+    cond = for_without_cond().cond
+    assert isinstance(cond, LiteralNode) and cond.constants is first.constants
+    size = len(first.constants)
+    for _ in range(100):
+        for_without_cond()
+    assert len(first.constants) == size
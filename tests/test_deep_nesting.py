@@ -0,0 +1,84 @@
+"""Обход и семантическая проверка AST-деревьев с глубиной 100000 и вывод дерева без RecursionError
+   (деревья строятся напрямую, без разбора текста)
+"""
+
+import sys
+
+import pytest
+
+from compiler import mel_parser, semantic
+from compiler.mel_ast import AstNode, AstVisitor, BinOp, BinOpNode, IdentNode, IfNode, StmtListNode, walk
+
+DEPTH = 100000
+# объем вывода дерева растет с квадратом глубины (отступы строк), поэтому вывод проверяется на меньшей глубине
+TREE_DEPTH = 3000
+
+
+def program(*stmts: AstNode) -> StmtListNode:
+    prog = StmtListNode(*stmts)
+    prog.program = True
+    return prog
+
+
+def nested_ifs(depth: int) -> StmtListNode:
+    """Программа var a = true; if (a) { if (a) { ... a = false } } с depth вложенными if
+    :param depth: глубина вложенности
+    """
+
+    stmt = mel_parser.parse('a = false').childs[0]
+    for _ in range(depth):
+        stmt = IfNode(IdentNode('a'), StmtListNode(stmt))
+    return program(mel_parser.parse('var a = true').childs[0], stmt)
+
+
+def plus_chain(depth: int) -> StmtListNode:
+    """Программа var a = 1; var b = a + a + ... + a с depth операциями сложения
+    :param depth: количество операций
+    """
+
+    expr = IdentNode('a')
+    for _ in range(depth):
+        expr = BinOpNode(BinOp.ADD, expr, IdentNode('a'))
+    var_b = mel_parser.parse('var b = a').childs[0]
+    var_b.var = expr
+    return program(mel_parser.parse('var a = 1').childs[0], var_b)
+
+
+class DepthVisitor(AstVisitor):
+    def __init__(self) -> None:
+        self.depth = self.max_depth = 0
+
+    def enter(self, node: AstNode) -> bool:
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        return True
+
+    def exit(self, node: AstNode) -> None:
+        self.depth -= 1
+
+
+@pytest.fixture(autouse=True)
+def recursion_limit():
+    # проверки выполняются при стандартном ограничении глубины рекурсии
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(1000)
+    yield
+    sys.setrecursionlimit(limit)
+
+
+@pytest.mark.parametrize('build', [nested_ifs, plus_chain])
+def test_deep_tree(build):
+    prog = build(DEPTH)
+    nodes = sum(1 for _ in walk(prog))
+    assert sum(1 for _ in walk(prog, post_order=True)) == nodes
+    visitor = DepthVisitor()
+    visitor.visit(prog)
+    assert visitor.depth == 0 and visitor.max_depth > DEPTH
+    prog.semantic_check(semantic.prepare_global_scope())
+    assert all(node.node_type is not None for node in walk(prog) if type(node) in (IdentNode, BinOpNode))
+
+
+@pytest.mark.parametrize('build', [nested_ifs, plus_chain])
+def test_deep_tree_output(build):
+    prog = build(TREE_DEPTH)
+    assert sum(1 for _ in prog.iter_tree()) == sum(1 for _ in walk(prog))
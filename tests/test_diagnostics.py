@@ -0,0 +1,59 @@
+"""Вывод всех ошибок семантического анализа: собранные ошибки выводятся и при непредвиденном
+   исключении, объявление без типа и значения - ошибка анализа, а не исключение
+"""
+
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from compiler import mel_parser
+from compiler.mel_ast import CallNode
+from compiler.program import Compiler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROG = 'a = b\nvar x\nx = 1\nc = 2\n'
+
+
+def compile_program(prog: str, backend: mel_parser.ParserBackend, max_errors=None) -> list:
+    out = io.StringIO()
+    Compiler(out=out, parser=mel_parser.default_parser(backend), quiet=True, max_errors=max_errors).execute(prog)
+    return out.getvalue().splitlines()
+
+
+@pytest.mark.parametrize('backend', list(mel_parser.ParserBackend))
+def test_var_without_type_and_value(backend):
+    assert compile_program(PROG, backend) == [
+        'Ошибка: Идентификатор a не найден (строка: 1, позиция: 2)',
+        'Ошибка: Идентификатор b не найден (строка: 1, позиция: 5)',
+        'Ошибка: Не указан тип переменной x (строка: 2, позиция: 5)',
+        'Ошибка: Идентификатор c не найден (строка: 4, позиция: 2)',
+    ]
+    assert compile_program(PROG, backend, max_errors=1) == compile_program(PROG, backend)[:1]
+    assert compile_program('var x: Int\nx = 1', backend) == []
+
+
+def test_errors_printed_on_unexpected_exception(monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('сбой анализа')
+
+    monkeypatch.setattr(CallNode, 'semantic_steps', fail)
+    out = io.StringIO()
+    compiler = Compiler(out=out, quiet=True, max_errors=None)
+    with pytest.raises(RuntimeError):
+        compiler.execute('a = b\nprintln(1)\n')
+    assert out.getvalue().splitlines() == [
+        'Ошибка: Идентификатор a не найден (строка: 1, позиция: 2)',
+        'Ошибка: Идентификатор b не найден (строка: 1, позиция: 5)',
+    ]
+
+
+@pytest.mark.parametrize('value', ['-1', 'x'])
+def test_invalid_max_errors(value):
+    result = subprocess.run([sys.executable, 'main.py', '--no-cache', '--max-errors', value], cwd=ROOT,
+                            capture_output=True, text=True)
+    assert result.returncode == 2
+    assert '--max-errors' in result.stderr
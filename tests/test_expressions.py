@@ -0,0 +1,60 @@
+"""Разбор выражений: узлы BinOpNode создаются только для операций, время разбора длинных цепочек
+   операций линейно (с выводом времени на операцию)
+"""
+
+import time
+from typing import List
+
+import pytest
+
+from compiler import mel_parser
+from compiler.mel_ast import AstNode, BinOpNode, LiteralNode
+
+TERMS = 500
+OPS = ('+', '*', '-', '/', '%')
+
+
+def chain(terms: int) -> str:
+    return 'x = ' + ' '.join('{} {}'.format(i, OPS[i % len(OPS)]) for i in range(1, terms)) + ' {}\n'.format(terms)
+
+
+def nodes(root: AstNode) -> List[AstNode]:
+    """Узлы поддерева (обход с явным стеком)
+    :param root: корень поддерева
+    """
+
+    result, stack = [], [root]
+    while stack:
+        node = stack.pop()
+        result.append(node)
+        stack.extend(node.childs)
+    return result
+
+
+def parse_time(prog: str, backend: mel_parser.ParserBackend) -> float:
+    mel_parser.parse('a = 1', backend=backend)
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        mel_parser.parse(prog, backend=backend)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.mark.parametrize('backend', list(mel_parser.ParserBackend))
+def test_nodes_only_for_operators(backend):
+    assign = mel_parser.parse('x = 1\n' + chain(TERMS), backend=backend).childs
+    # литерал без операций не оборачивается в узлы уровней приоритета
+    assert isinstance(assign[0].val, LiteralNode)
+    chain_nodes = nodes(assign[1].val)
+    assert sum(isinstance(node, BinOpNode) for node in chain_nodes) == TERMS - 1
+    assert sum(isinstance(node, LiteralNode) for node in chain_nodes) == TERMS
+
+
+@pytest.mark.parametrize('backend', list(mel_parser.ParserBackend))
+def test_chain_parse_time_is_linear(backend):
+    short = parse_time(chain(TERMS), backend)
+    long = parse_time(chain(4 * TERMS), backend)
+    print('\n{}: {:.1f} us per operation ({} terms), {:.1f} us ({} terms)'.format(
+        backend, short / TERMS * 1e6, TERMS, long / (4 * TERMS) * 1e6, 4 * TERMS))
+    assert long < short * 4 * 2
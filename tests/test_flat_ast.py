@@ -0,0 +1,44 @@
+"""Преобразования AST-дерева в массивы и обратно без потери позиций узлов: цепочка
+   load -> to_ast -> from_ast -> to_bytes сохраняет строку и столбец каждого узла
+"""
+
+import pytest
+
+from compiler import mel_flat_ast, mel_parser, semantic
+from compiler.mel_ast import walk
+from compiler.mel_flat_ast import FlatAst
+
+from samples import PROGRAMS, signature
+
+
+def checked(prog: str):
+    tree = mel_parser.parse(prog)
+    try:
+        tree.semantic_check(semantic.prepare_global_scope())
+    except semantic.SemanticException:
+        pass
+    return tree
+
+
+@pytest.mark.parametrize('name', list(PROGRAMS))
+def test_round_trip_keeps_locations(name, tmp_path):
+    tree = checked(PROGRAMS[name])
+    expected = signature(tree)
+    assert any(row is not None for *_, row, _ in expected[1])
+    path = str(tmp_path / 'tree.mast')
+    mel_flat_ast.save(tree, path)
+    restored = mel_flat_ast.load(path).to_ast()
+    assert signature(restored) == expected
+    # повторное сохранение дерева, восстановленного без текста программы
+    again = FlatAst.from_bytes(FlatAst.from_ast(restored).to_bytes()).to_ast()
+    assert signature(again) == expected
+
+
+def test_explicit_locations():
+    tree = mel_parser.parse('a = b + 1')
+    flat = FlatAst.from_ast(tree)
+    restored = FlatAst.from_bytes(flat.to_bytes()).to_ast()
+    for node in walk(restored):
+        # позиции, заданные явно, а не смещениями в тексте программы
+        node.loc = node.locations = None
+    assert signature(FlatAst.from_ast(restored).to_ast()) == signature(tree)
@@ -0,0 +1,81 @@
+"""Лексический анализ в буфер лексем: виды и позиции лексем примеров программ согласованы с узлами,
+   которые строит грамматика, и позиции (строка, столбец) лексических ошибок
+"""
+
+from bisect import bisect_left
+
+import pytest
+
+from compiler import mel_lexer, mel_parser
+from compiler.mel_ast import IdentNode, LiteralNode, TypeNode, walk
+from compiler.mel_lexer import KEYWORDS, LexError, TokenKind
+from samples import PROGRAMS
+
+LITERAL_KINDS = (TokenKind.NUMBER, TokenKind.STRING, TokenKind.BOOL)
+
+
+def test_tokens():
+    prog = 'var x: Int = 1.5e3 // c\nif (x >= 2 && "s\\"") {}'
+    tokens = mel_lexer.tokenize(prog)
+    assert [(str(kind), tokens.text(i)) for i, (kind, _, _) in enumerate(tokens)] == [
+        ('keyword', 'var'), ('ident', 'x'), ('punctuation', ':'), ('ident', 'Int'), ('operator', '='),
+        ('number', '1.5e3'), ('keyword', 'if'), ('punctuation', '('), ('ident', 'x'), ('operator', '>='),
+        ('number', '2'), ('operator', '&&'), ('string', '"s\\""'), ('punctuation', ')'),
+        ('punctuation', '{'), ('punctuation', '}'),
+    ]
+    assert tokens[6] == (TokenKind.KEYWORD, prog.index('if'), 2)
+    with_comments = mel_lexer.tokenize(prog, comments=True)
+    assert len(with_comments) == len(tokens) + 1
+    assert with_comments.kind(6) == TokenKind.COMMENT and with_comments.text(6) == '// c'
+
+
+@pytest.mark.parametrize('name', list(PROGRAMS))
+def test_tokens_cover_program(name):
+    prog = PROGRAMS[name]
+    tokens = mel_lexer.tokenize(prog, comments=True)
+    end = 0
+    for kind, start, length in tokens:
+        # между лексемами - только пробельные символы
+        assert start >= end and not prog[end:start].strip()
+        end = start + length
+        text = prog[start:end]
+        assert (kind == TokenKind.KEYWORD) == (text in KEYWORDS)
+        assert (kind == TokenKind.BOOL) == (text in ('true', 'false'))
+    assert not prog[end:].strip()
+
+
+@pytest.mark.parametrize('backend', list(mel_parser.ParserBackend))
+@pytest.mark.parametrize('name', list(PROGRAMS))
+def test_tokens_match_grammar(name, backend):
+    # узлы идентификаторов и литералов, построенные грамматикой, начинаются с лексемы того же вида и текста
+    # (позиция узла - до пробелов перед лексемой)
+    prog = PROGRAMS[name]
+    tokens = mel_lexer.tokenize(prog)
+    nodes = [node for node in walk(mel_parser.parse(prog, backend=backend))
+             if type(node) in (IdentNode, TypeNode, LiteralNode) and node.loc is not None]
+    assert nodes
+    for node in nodes:
+        i = bisect_left(tokens.starts, node.loc)
+        assert not prog[node.loc:tokens.starts[i]].strip()
+        if isinstance(node, LiteralNode):
+            if tokens.kind(i) == TokenKind.OPERATOR:
+                # знак числа - отдельная лексема
+                assert tokens.text(i) in '+-' and tokens.kind(i + 1) == TokenKind.NUMBER
+                assert tokens.text(i) + tokens.text(i + 1) == node.literal
+            else:
+                assert tokens.kind(i) in LITERAL_KINDS and tokens.text(i) == node.literal
+        else:
+            assert tokens.kind(i) == TokenKind.IDENT and tokens.text(i) == node.name
+
+
+@pytest.mark.parametrize('prog, message, loc, lineno, col', [
+    ('a = 1\nb = "abc', 'Unterminated string', 10, 2, 5),
+    ('a = "ab\ncd"', 'Unterminated string', 4, 1, 5),
+    ('a = 1 /* x', 'Unterminated comment', 6, 1, 7),
+    ('x = 1\n  y @ 2', "Unexpected character '@'", 10, 2, 5),
+    ('\n\n#', "Unexpected character '#'", 2, 3, 1),
+])
+def test_lex_error_position(prog, message, loc, lineno, col):
+    with pytest.raises(LexError) as e:
+        mel_lexer.tokenize(prog)
+    assert (e.value.msg, e.value.loc, e.value.lineno, e.value.col) == (message, loc, lineno, col)
@@ -0,0 +1,28 @@
+"""Операции && и || разбираются как бинарные операции с правым операндом (в исходной грамматике
+   правый операнд && и || не разбирался: a || b давало две инструкции или синтаксическую ошибку)
+"""
+
+import pyparsing as pp
+import pytest
+
+from compiler import mel_parser, mel_rd_parser
+
+
+@pytest.mark.parametrize('backend', list(mel_parser.ParserBackend))
+@pytest.mark.parametrize('prog, tree', [
+    ('x = a || b', ('...', '└ =', '  ├ x', '  └ ||', '    ├ a', '    └ b')),
+    ('x = a && b', ('...', '└ =', '  ├ x', '  └ &&', '    ├ a', '    └ b')),
+    ('x = a && b || c', ('...', '└ =', '  ├ x', '  └ ||', '    ├ &&', '    │ ├ a', '    │ └ b', '    └ c')),
+    ('x = a || b && c', ('...', '└ =', '  ├ x', '  └ ||', '    ├ a', '    └ &&', '      ├ b', '      └ c')),
+    ('if (a || b) c()', ('...', '└ if', '  ├ ||', '  │ ├ a', '  │ └ b', '  └ call', '    └ c')),
+])
+def test_right_operand(prog, tree, backend):
+    assert tuple(mel_parser.parse(prog, backend=backend).tree) == tree
+
+
+@pytest.mark.parametrize('backend', list(mel_parser.ParserBackend))
+def test_error_location(backend):
+    # раньше '||' завершал выражение, и ошибка находилась в следующей "инструкции" (строка 2, столбец 3)
+    with pytest.raises((pp.ParseException, mel_rd_parser.ParseError)) as e:
+        mel_parser.parse('x = a ||\n  (1 +)', backend=backend)
+    assert (e.value.lineno, e.value.col) == (1, 7)
@@ -0,0 +1,45 @@
+"""Пиковая память разбора растет с числом строк программы, а не с числом символов
+   (индекс позиций хранит только начала строк)
+"""
+
+import gc
+import tracemalloc
+
+import pytest
+
+from compiler import mel_parser
+
+LINES = 500
+
+
+def peak_memory(lines: int, width: int, backend: mel_parser.ParserBackend) -> int:
+    """Пик памяти (байт), выделенной при разборе программы из одинаковых строк (без текста программы)
+    :param lines: количество строк
+    :param width: длина комментария в конце каждой строки
+    :param backend: реализация синтаксического анализатора
+    """
+
+    prog = ('a = b + 1 // ' + 'x' * width + '\n') * lines
+    # счетчики сборщика мусора сбрасываются, чтобы замер не зависел от выполненных ранее тестов
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tree = mel_parser.parse(prog, backend=backend)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('backend', list(mel_parser.ParserBackend))
+def test_peak_memory_scales_with_lines(backend):
+    # грамматика строится и разовые выделения памяти выполняются до замеров
+    peak_memory(LINES, 10, backend)
+    short = peak_memory(LINES, 10, backend)
+    wide = peak_memory(LINES, 1000, backend)
+    tall = peak_memory(2 * LINES, 10, backend)
+    print('\n{}: {} lines: {} KB, 1000-character lines: {} KB, twice the lines: {} KB'.format(
+        backend, LINES, short >> 10, wide >> 10, tall >> 10))
+    # на каждый дополнительный символ - меньше байта (список позиций по символам занимал десятки байт),
+    # вдвое больше строк - почти вдвое больше памяти
+    assert wide - short < LINES * (1000 - 10)
+    assert tall > short * 1.5
@@ -0,0 +1,58 @@
+"""Кэш мемоизации (packrat): учет попаданий, вытеснение давно не использованных записей (LRU)
+   при достижении ограничения, разбор с кэшем дает то же дерево, что и без него
+"""
+
+import pytest
+
+from compiler import mel_parser
+from compiler.mel_parser import PackratCache, Parser, ParserBackend
+from samples import PROGRAMS, signature
+
+
+def test_hits_and_misses():
+    cache = PackratCache()
+    assert cache.get('a') is None
+    cache.set('a', 1)
+    assert cache.get('a') == 1 and cache.get('a') == 1
+    assert (cache.hits, cache.misses, cache.hit_rate) == (2, 1, 2 / 3)
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == 2
+    cache.reset()
+    assert (cache.hits, cache.misses, cache.hit_rate) == (0, 0, 0.0)
+
+
+def test_lru_eviction():
+    cache = PackratCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    # обращение к 'a' делает давно не использованной запись 'b'
+    cache.get('a')
+    cache.set('c', 3)
+    assert len(cache) == 2 and cache.evictions == 1
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        PackratCache(max_size=0)
+    with pytest.raises(ValueError):
+        Parser(ParserBackend.RECURSIVE_DESCENT, PackratCache())
+
+
+@pytest.mark.parametrize('max_size', [1, 4096])
+@pytest.mark.parametrize('name', list(PROGRAMS))
+def test_same_tree_as_uncached(name, max_size):
+    cache = PackratCache(max_size)
+    tree = mel_parser.parse(PROGRAMS[name], cache=cache)
+    assert signature(tree) == signature(mel_parser.parse(PROGRAMS[name]))
+    assert len(cache) <= max_size
+
+
+def test_bounded_during_parse():
+    # мемоизируются инструкции, начинающиеся с идентификатора
+    prog = 'x += 1\nf(x)\ny = x\n' * 20
+    cache = PackratCache(max_size=16)
+    tree = mel_parser.parse(prog, cache=cache)
+    assert signature(tree) == signature(mel_parser.parse(prog))
+    assert cache.misses >= 60 and cache.evictions > 0 and len(cache) == 16
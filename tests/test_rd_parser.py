@@ -0,0 +1,75 @@
+"""Соответствие рекурсивного парсера грамматике на pyparsing: одинаковые AST-деревья с теми же позициями
+   узлов и одинаковые синтаксические ошибки
+"""
+
+import pyparsing as pp
+import pytest
+
+from compiler import mel_parser
+from compiler import mel_rd_parser
+from samples import PROGRAMS, random_program, signature
+
+
+def parse(prog: str, backend: mel_parser.ParserBackend):
+    try:
+        return 'tree', signature(mel_parser.parse(prog, backend=backend))
+    except pp.ParseException as e:
+        return 'syntax', (str(e), e.loc, e.lineno, e.col)
+    except IndexError:
+        # ошибка при построении узла (VarNode для 'var x' без типа и значения)
+        return 'node', None
+
+
+def assert_same(prog: str) -> None:
+    expected = parse(prog, mel_parser.ParserBackend.PYPARSING)
+    actual = parse(prog, mel_parser.ParserBackend.RECURSIVE_DESCENT)
+    if 'node' in (expected[0], actual[0]):
+        # pyparsing после первого вызова parse action считает IndexError в нем несовпадением правила,
+        # поэтому ошибка построения узла может выглядеть и как синтаксическая
+        assert 'tree' not in (expected[0], actual[0])
+    else:
+        assert actual == expected
+
+
+@pytest.mark.parametrize('name', sorted(PROGRAMS))
+def test_programs(name):
+    assert_same(PROGRAMS[name])
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_random_programs(seed):
+    assert_same(random_program(seed))
+
+
+@pytest.mark.parametrize('seed', range(300, 400))
+def test_random_syntax_errors(seed):
+    assert_same(random_program(seed, errors=True))
+
+
+def test_parse_error_is_pyparsing_exception():
+    with pytest.raises(pp.ParseException) as e:
+        mel_parser.parse('a = 1 +', backend=mel_parser.ParserBackend.RECURSIVE_DESCENT)
+    assert isinstance(e.value, mel_rd_parser.ParseError)
+    assert (e.value.loc, e.value.lineno, e.value.col) == (6, 1, 7)
+
+
+@pytest.mark.parametrize('backend', list(mel_parser.ParserBackend))
+def test_dispatch_stats(backend):
+    stats = mel_parser.StmtDispatchStats()
+    mel_parser.parse('a = 1\nb = 2\nif (a) { f(b) }\n', backend=backend, stats=stats)
+    # проверки конца текста и конца блока перед '}' не считаются инструкциями и не перебирают альтернативы
+    assert (stats.statements, stats.attempts, stats.failures, stats.failed_attempts) == (5, 5, 2, 0)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_dispatch_stats_match(seed):
+    prog = random_program(seed)
+    results = []
+    for backend in mel_parser.ParserBackend:
+        stats = mel_parser.StmtDispatchStats()
+        try:
+            mel_parser.parse(prog, backend=backend, stats=stats)
+        except Exception:
+            pass
+        results.append((stats.statements, stats.attempts, stats.histogram))
+    assert results[0] == results[1]
@@ -0,0 +1,99 @@
+"""Инкрементальный разбор после правки текста дает то же дерево, что и разбор всего нового текста,
+   переиспользует инструкции, не затронутые правкой, и быстрее полного разбора большой программы
+"""
+
+import time
+
+import pytest
+
+from compiler import mel_parser
+from compiler.mel_parser import Parser, ParserBackend
+from samples import PROGRAMS, signature
+
+PROG = PROGRAMS['statements']
+
+# правки (позиция, количество удаленных символов, вставленный текст) программы PROG
+EDITS = {
+    'start': (0, 0, 'var n = 0\n'),
+    'middle': (PROG.index('1.5e3'), len('1.5e3'), '2.5'),
+    'end': (len(PROG), 0, '\nvar e = x + 1'),
+    # правка, объединяющая две инструкции, и правка, удаляющая инструкцию целиком
+    'join': (PROG.index('1\n        x\n'), len('1\n        '), ''),
+    'remove': (PROG.index('\n        var q'), len('\n        var q = 1 until 10'), ''),
+    'split': (PROG.index('* 3\n'), 0, '\n'),
+    'string': (PROG.index('a\\"b'), 1, 'a; x = 1 }'),
+    'comment': (PROG.index('comment'), 0, '*/ var c = 1 /*'),
+}
+
+
+def full_parse(prog: str) -> list:
+    return signature(mel_parser.parse(prog, backend=ParserBackend.RECURSIVE_DESCENT))
+
+
+def apply(prog: str, offset: int, removed: int, inserted: str) -> str:
+    return prog[:offset] + inserted + prog[offset + removed:]
+
+
+@pytest.mark.parametrize('backend', list(ParserBackend))
+@pytest.mark.parametrize('edit', list(EDITS))
+def test_same_as_full_parse(edit, backend):
+    parser = Parser(backend)
+    tree = parser.parse(PROG)
+    new_tree = parser.reparse(tree, *EDITS[edit])
+    assert signature(new_tree) == full_parse(apply(PROG, *EDITS[edit]))
+
+
+def test_edit_sequence():
+    # каждая следующая правка применяется к дереву, полученному предыдущей
+    parser = Parser(ParserBackend.RECURSIVE_DESCENT)
+    prog = PROG
+    tree = parser.parse(prog)
+    for edit in ('end', 'middle', 'start'):
+        tree = parser.reparse(tree, *EDITS[edit])
+        prog = apply(prog, *EDITS[edit])
+        assert signature(tree) == full_parse(prog)
+
+
+def test_unaffected_statements_reused():
+    parser = Parser(ParserBackend.RECURSIVE_DESCENT)
+    tree = parser.parse(PROG)
+    stmts = tree.childs
+    offset, removed, inserted = EDITS['middle']
+    new_stmts = parser.reparse(tree, offset, removed, inserted).childs
+    assert len(new_stmts) == len(stmts)
+    changed = [i for i, stmt in enumerate(new_stmts) if stmt is not stmts[i]]
+    # заново разбираются инструкция с правкой и одна перед ней
+    assert changed == [0, 1]
+
+
+@pytest.mark.parametrize('inserted', ['"', ')', '(1 +'])
+def test_syntax_error(inserted):
+    parser = Parser(ParserBackend.RECURSIVE_DESCENT)
+    tree = parser.parse(PROG)
+    offset = PROG.index('var w')
+    with pytest.raises(Exception) as full:
+        full_parse(apply(PROG, offset, 0, inserted))
+    with pytest.raises(type(full.value)):
+        parser.reparse(tree, offset, 0, inserted)
+
+
+def test_edit_out_of_range():
+    parser = Parser(ParserBackend.RECURSIVE_DESCENT)
+    with pytest.raises(ValueError):
+        parser.reparse(parser.parse(PROG), len(PROG), 1, '')
+
+
+def test_latency():
+    # правка одной инструкции в большой программе разбирается не дольше небольшой доли полного разбора
+    prog = ''.join('var a{0} = {0} + b * (c - {0})\n'.format(i) for i in range(5000))
+    parser = Parser(ParserBackend.RECURSIVE_DESCENT)
+    offset = prog.index('var a2500 =')
+    start = time.perf_counter()
+    tree = parser.parse(prog)
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    tree = parser.reparse(tree, offset, len('var a2500'), 'var z')
+    incremental = time.perf_counter() - start
+    print('\nfull parse {:.1f} ms, reparse {:.2f} ms'.format(full * 1e3, incremental * 1e3))
+    assert incremental < full / 20
+    assert tree.childs[2500].childs[0].name == 'z'
@@ -0,0 +1,201 @@
+"""Таблицы и структуры семантического анализа: разрешение бинарных операций (BIN_OP_RESOLUTION),
+   таблица имен областей видимости (SymbolTable), неизменяемые встроенные объекты (BuiltinScope)
+   и интернированные описания типов (TypeDesc)
+"""
+
+import copy
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from compiler import mel_parser, semantic
+from compiler.semantic import BIN_OP_RESOLUTION, BaseType, BinOp, BuiltinScope, IdentDesc, IdentScope, ScopeType, \
+    SemanticException, TypeDesc, builtin_func, builtin_var
+from samples import PROGRAMS
+
+INT, LONG, FLOAT, DOUBLE, BOOL, STR = (TypeDesc.from_base_type(t) for t in (
+    BaseType.INT, BaseType.LONG, BaseType.FLOAT, BaseType.DOUBLE, BaseType.BOOL, BaseType.STR))
+
+
+def errors(prog: str) -> list:
+    diagnostics = semantic.Diagnostics(None)
+    mel_parser.parse(prog).semantic_check(semantic.prepare_global_scope(), diagnostics=diagnostics)
+    return diagnostics.messages
+
+
+@pytest.mark.parametrize('op, arg1, arg2, result, arg1_type, arg2_type', [
+    (BinOp.ADD, INT, INT, INT, None, None),
+    (BinOp.ADD, INT, FLOAT, FLOAT, FLOAT, None),
+    (BinOp.ADD, FLOAT, INT, FLOAT, None, FLOAT),
+    (BinOp.ADD, STR, INT, STR, None, STR),
+    (BinOp.ADD, LONG, LONG, LONG, None, None),
+    (BinOp.MUL, DOUBLE, DOUBLE, DOUBLE, None, None),
+    (BinOp.LT, DOUBLE, DOUBLE, BOOL, None, None),
+    (BinOp.BIT_AND, LONG, LONG, LONG, None, None),
+    (BinOp.LOGICAL_AND, BOOL, INT, BOOL, None, BOOL),
+    # неявных расширяющих преобразований Int -> Long -> Float -> Double нет
+    (BinOp.ADD, INT, LONG, None, None, None),
+    (BinOp.ADD, FLOAT, DOUBLE, None, None, None),
+    (BinOp.SUB, STR, STR, None, None, None),
+    # операции, которых нет в таблице совместимости
+    (BinOp.DOTS, INT, INT, None, None, None),
+])
+def test_bin_op_resolution(op, arg1, arg2, result, arg1_type, arg2_type):
+    resolution = BIN_OP_RESOLUTION[op, arg1, arg2]
+    assert (resolution.result, resolution.arg1_type, resolution.arg2_type) == (result, arg1_type, arg2_type)
+
+
+def test_bin_op_resolution_covers_all_simple_types():
+    types = [TypeDesc.from_base_type(t) for t in BaseType]
+    assert all((op, arg1, arg2) in BIN_OP_RESOLUTION for op in BinOp for arg1 in types for arg2 in types)
+
+
+@pytest.mark.parametrize('prog', [
+    'var x: Double = 1.5',
+    'fun g(a: Double) { }\ng(1.5)',
+    'var a: Long\nvar b = a * 2',
+])
+def test_no_implicit_widening(prog):
+    assert len(errors(prog)) == 1
+
+
+def test_long_and_double_arithmetic():
+    assert errors('var a: Long\nvar b = a + a\nvar d: Double\nvar e = d * d < d') == []
+
+
+def func_scope(parent: IdentScope) -> IdentScope:
+    scope = IdentScope(parent)
+    scope.func = IdentDesc('f', TypeDesc(None, TypeDesc.VOID, ()))
+    return scope
+
+
+def test_symbol_table_activate_and_leave():
+    glob = IdentScope()
+    a = glob.add_ident(IdentDesc('a', INT))
+    then_scope, else_scope = IdentScope(glob), IdentScope(glob)
+    b = then_scope.add_ident(IdentDesc('b', INT))
+    assert then_scope.get_ident('b') is b and then_scope.get_ident('a') is a
+    assert glob.symbols.frames == [glob, then_scope]
+    # переход к соседней области снимает привязки вышедшей области
+    assert else_scope.get_ident('b') is None and else_scope.get_ident('a') is a
+    assert glob.symbols.frames == [glob, else_scope] and 'b' not in glob.symbols.bindings
+    # и восстанавливает их при возврате в нее
+    assert then_scope.get_ident('b') is b
+    # из внешней области цепочки привязки вложенных областей не видны (без выхода из них)
+    assert glob.get_ident('b') is None
+
+
+def test_symbol_table_shadowing():
+    glob = IdentScope()
+    outer = glob.add_ident(IdentDesc('x', INT))
+    func = func_scope(glob)
+    body = IdentScope(func)
+    inner = body.add_ident(IdentDesc('x', STR))
+    assert body.get_ident('x') is inner
+    # привязки более глубоких областей не видны из внешних областей цепочки
+    assert func.get_ident('x') is outer and glob.get_ident('x') is outer
+    assert body.get_ident('x') is inner
+    # после выхода из области восстанавливается скрытая ей привязка
+    assert IdentScope(func).get_ident('x') is outer
+    assert glob.symbols.bindings['x'] == [(0, outer)]
+
+
+def declare(scope: IdentScope, name: str, type_: TypeDesc) -> IdentDesc:
+    # объявление в обход проверок add_ident (таблица имен допускает скрытие на любой глубине);
+    # как и в add_ident, привязка добавляется в активную область
+    scope.symbols.activate(scope)
+    ident = scope.idents[name] = IdentDesc(name, type_)
+    scope.symbols.bind(scope, ident)
+    return ident
+
+
+def test_symbol_table_deep_shadowing():
+    glob = IdentScope()
+    idents = {0: declare(glob, 'x', INT)}
+    scopes = [glob]
+    for depth in range(1, 60):
+        scopes.append(IdentScope(scopes[-1]))
+        if depth % 10 == 0:
+            idents[depth] = declare(scopes[-1], 'x', FLOAT)
+    # из каждой области виден ближайший объявленный выше по цепочке идентификатор (обход вниз и вверх)
+    for scope in scopes + scopes[::-1]:
+        assert scope.get_ident('x') is idents[max(d for d in idents if d <= scope.depth)]
+    assert [depth for depth, _ in glob.symbols.bindings['x']] == sorted(idents)
+    # выход из вложенных областей в соседнюю ветку на глубине 25 снимает привязки глубже нее
+    assert IdentScope(scopes[24]).get_ident('x') is idents[20]
+    assert glob.symbols.bindings['x'] == [(0, idents[0]), (10, idents[10]), (20, idents[20])]
+
+
+def test_builtin_func_and_var():
+    func = builtin_func('f', 'Int', BaseType.FLOAT, STR)
+    assert (func.name, func.type, func.scope) == ('f', TypeDesc(None, INT, (FLOAT, STR)), ScopeType.GLOBAL)
+    assert builtin_func('g').type == TypeDesc(None, TypeDesc.VOID, ())
+    var = builtin_var('pi', 'Double', 3)
+    assert (var.type, var.index) == (DOUBLE, 3)
+    with pytest.raises(SemanticException):
+        builtin_var('x', 'Unknown')
+
+
+def test_builtins_immutable():
+    func, var = builtin_func('f', INT), builtin_var('pi', DOUBLE)
+    func.index = 1
+    builtins = BuiltinScope((func, var))
+    assert func.built_in and var.built_in
+    for ident in builtins:
+        for name in IdentDesc.__slots__:
+            with pytest.raises(AttributeError):
+                setattr(ident, name, getattr(ident, name))
+    # описания переходят в расширенный набор без изменений
+    extended = builtins.extend(builtin_var('e', DOUBLE))
+    assert extended.get('f') is func and len(extended) == 3 and len(builtins) == 2
+    with pytest.raises(SemanticException):
+        builtins.extend(builtin_var('pi', INT))
+
+
+def check(prog: str, builtins: BuiltinScope) -> list:
+    diagnostics = semantic.Diagnostics(None)
+    mel_parser.parse(prog).semantic_check(semantic.prepare_global_scope(builtins=builtins), diagnostics=diagnostics)
+    return diagnostics.messages
+
+
+def test_builtins_shared_between_sessions():
+    builtins = semantic.default_builtins()
+    assert semantic.default_builtins() is builtins
+    before = [(ident.name, str(ident)) for ident in builtins]
+    progs = [*PROGRAMS.values(), 'var readLine = 1', 'fun println(s: String) { }', 'println(readLine())']
+    # анализ программ одновременно в нескольких потоках с общими встроенными объектами
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(check, progs * 4, [builtins] * len(progs) * 4))
+    assert results == [check(prog, builtins) for prog in progs] * 4
+    assert [(ident.name, str(ident)) for ident in builtins] == before
+    assert results[len(PROGRAMS)] and results[len(PROGRAMS) + 1] and not results[len(PROGRAMS) + 2]
+
+
+def test_type_desc_interned():
+    assert TypeDesc(BaseType.INT) is INT
+    func = TypeDesc(None, INT, (FLOAT, STR))
+    assert TypeDesc(None, INT, [FLOAT, STR]) is func
+    assert TypeDesc(None, TypeDesc(BaseType.INT), (TypeDesc.from_str('Float'), STR)) is func
+    assert TypeDesc(None, INT, (STR, FLOAT)) is not func and TypeDesc(None, INT, ()) is not TypeDesc(None, INT)
+    assert len({func, TypeDesc(None, INT, (FLOAT, STR)), INT, TypeDesc(BaseType.INT)}) == 2
+    # одновременное создание в нескольких потоках дает один объект
+    with ThreadPoolExecutor(8) as executor:
+        types = list(executor.map(lambda i: TypeDesc(None, LONG, (DOUBLE,) * (i % 3)), range(300)))
+    assert len({id(type_) for type_ in types}) == 3
+
+
+def test_type_desc_immutable():
+    func = TypeDesc(None, INT, (FLOAT,))
+    for name in TypeDesc.__slots__:
+        with pytest.raises(AttributeError):
+            setattr(func, name, None)
+    assert func.params == (FLOAT,) and str(func) == 'Int (Float)'
+
+
+@pytest.mark.parametrize('type_', [INT, TypeDesc.VOID, TypeDesc.ERROR, TypeDesc(None, STR, (INT, BOOL)),
+                                   TypeDesc(None, TypeDesc(None, INT, ()), (TypeDesc(None, BOOL, (DOUBLE,)),))])
+def test_type_desc_pickle_and_copy(type_):
+    assert pickle.loads(pickle.dumps(type_)) is type_
+    assert pickle.loads(pickle.dumps([type_, {type_: 1}]))[1] == {type_: 1}
+    assert copy.copy(type_) is type_ and copy.deepcopy(type_) is type_
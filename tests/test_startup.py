@@ -0,0 +1,52 @@
+"""Время запуска: python main.py без разбора программы не строит грамматику и не импортирует pyparsing
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# бюджет на холодный запуск без разбора (интерпретатор и импорт пакета compiler), с большим запасом
+STARTUP_BUDGET = 1.0
+RUNS = 5
+
+
+def run(*args: str) -> float:
+    """Лучшее время из RUNS запусков
+    :param args: аргументы интерпретатора
+    """
+
+    best = float('inf')
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, check=True, stdout=subprocess.DEVNULL,
+                       env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def imported_modules(code: str) -> set:
+    out = subprocess.run([sys.executable, '-c', code + '\nimport sys\nprint(*sys.modules)'],
+                         cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return set(out.split())
+
+
+@pytest.mark.parametrize('code', [
+    'import main',
+    'from compiler import program, compile_cache, mel_flat_ast',
+    'from compiler import mel_parser\nmel_parser.parse("a = 1", backend="rd")',
+])
+def test_pyparsing_not_imported(code):
+    assert 'pyparsing' not in imported_modules(code)
+
+
+def test_startup_budget():
+    untouched = run('main.py', '--help')
+    parsed = run('main.py', '--no-cache', '-q')
+    print('\nmain.py --help: {:.3f}s, main.py (parse and check): {:.3f}s'.format(untouched, parsed))
+    assert untouched < STARTUP_BUDGET
+    assert untouched < parsed
@@ -0,0 +1,78 @@
+"""Потоковый разбор возвращает те же инструкции верхнего уровня, что и разбор всего текста,
+   при любом размере порции
+"""
+
+import io
+
+import pytest
+
+from compiler import mel_parser
+from samples import PROGRAMS, random_program, signature
+
+CHUNK_SIZES = (1, 3, 17, 256)
+
+IF_ELSE = 'if (a) {\n b = 1\n} else {\n' + ''.join(' c = {}\n'.format(i) for i in range(50)) + '\n}\nd = 3\ne = 4\n'
+CONTINUED = 'a = b\n+ 1\nc = d\n(e)\nf = a..2\nstep 3\nx\n+= 2\nreturn\ny\n' * 20
+
+
+def assert_same(prog: str, chunk_size: int) -> None:
+    tree = mel_parser.parse(prog, backend=mel_parser.ParserBackend.RECURSIVE_DESCENT)
+    expected = [signature(stmt) for stmt in tree.childs]
+    assert [signature(stmt) for stmt in mel_parser.parse_stream(io.StringIO(prog), chunk_size)] == expected
+    stream = io.BytesIO(prog.encode('utf-8'))
+    assert [signature(stmt) for stmt in mel_parser.parse_stream(stream, chunk_size)] == expected
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('prog', [IF_ELSE, CONTINUED], ids=['if-else', 'continued'])
+def test_split_statements(prog, chunk_size):
+    assert_same(prog, chunk_size)
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+def test_programs(chunk_size):
+    for prog in PROGRAMS.values():
+        assert_same(prog, chunk_size)
+
+
+def valid_program(seed: int, count: int) -> str:
+    """Случайная программа без синтаксических ошибок: инструкции добавляются, пока программа разбирается
+    :param seed: начальное значение генератора случайных чисел
+    :param count: количество добавляемых инструкций
+    """
+
+    prog = ''
+    for i in range(count * 10):
+        stmt = random_program(seed * count * 10 + i, count=1)
+        try:
+            mel_parser.parse(prog + stmt, backend=mel_parser.ParserBackend.RECURSIVE_DESCENT)
+        except Exception:
+            continue
+        prog += stmt
+        count -= 1
+        if not count:
+            break
+    return prog
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_random_programs(seed):
+    prog = valid_program(seed, 8)
+    for chunk_size in CHUNK_SIZES:
+        assert_same(prog, chunk_size)
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+def test_one_line_program(chunk_size):
+    assert_same('a = f(1); b = c + 2; if (a) { b = 3 } else b = 4; ' * 20 + '\r\nd = 5; e = 6\r\n', chunk_size)
+
+
+def test_one_line_buffer_bounded():
+    # разобранный текст отбрасывается и посередине строки: буфер, по которому разбираются инструкции,
+    # не растет с объемом текста
+    prog = 'a = f(1); b = c + 2; ' * 20000
+    stmts = list(mel_parser.parse_stream(io.StringIO(prog), 256))
+    assert len(stmts) == 40000
+    assert max(len(stmt.locations.base.prog) for stmt in stmts) < 4 * 256
+    last = mel_parser.parse(prog, backend=mel_parser.ParserBackend.RECURSIVE_DESCENT).childs[-1]
+    assert (stmts[-1].row, stmts[-1].col) == (last.row, last.col)